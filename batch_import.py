@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import argparse
+
+# Dodanie katalogu głównego projektu do ścieżki Pythona
+# Aby moduły mogły być importowane prawidłowo
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+import config
+from database.db_manager import DatabaseManager
+from controllers.batch_importer import BatchImporter, collect_pdf_files, format_summary
+from utils.metrics import get_metrics, format_metrics_summary
+
+
+def parse_stage(text):
+    """Parsowanie ustawienia etapu potoku w postaci ETAP=RODZAJ:N."""
+    try:
+        name, setting = text.split("=", 1)
+        kind, workers = setting.split(":", 1)
+        workers = int(workers)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"oczekiwano ETAP=RODZAJ:N, otrzymano '{text}'")
+    if name not in config.PIPELINE_STAGES:
+        raise argparse.ArgumentTypeError(f"nieznany etap '{name}'")
+    if kind not in ("thread", "process") or workers < 1:
+        raise argparse.ArgumentTypeError(f"nieprawidłowe ustawienie etapu '{text}'")
+    return name, (kind, workers)
+
+
+def parse_args(argv=None):
+    """Parsowanie argumentów linii poleceń."""
+    parser = argparse.ArgumentParser(
+        description="Wsadowy import raportów klejenia z plików PDF (bez interfejsu graficznego)."
+    )
+    parser.add_argument(
+        "paths", nargs="+",
+        help="Katalogi, wzorce glob (np. 'skany/**/*.pdf') lub pojedyncze pliki PDF"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count() or 1,
+        help="Liczba procesów roboczych (domyślnie: liczba rdzeni)"
+    )
+    parser.add_argument(
+        "-b", "--ocr-batch", type=int, default=config.BATCH_OCR_DOCUMENTS,
+        help=f"Liczba dokumentów rozpoznawanych jednym wsadowym wywołaniem OCR (domyślnie: {config.BATCH_OCR_DOCUMENTS})"
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true",
+        help="Przeszukiwanie katalogów rekurencyjnie"
+    )
+    parser.add_argument(
+        "--db", default=config.DB_NAME,
+        help=f"Ścieżka do bazy danych (domyślnie: {config.DB_NAME})"
+    )
+    parser.add_argument(
+        "--save-uncertain", action="store_true",
+        help="Zapisz także raporty z nierozpoznanym numerem zlecenia"
+    )
+    parser.add_argument(
+        "--duplicates", choices=["skip", "link"], default=config.DUPLICATE_POLICY,
+        help="Pliki już zaimportowane (ta sama zawartość): pomiń lub przypisz nową ścieżkę "
+             f"istniejącemu raportowi (domyślnie: {config.DUPLICATE_POLICY})"
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="Przetwarzanie potokiem etapów w jednym procesie (zamiast puli procesów) "
+             "z podsumowaniem obciążenia etapów"
+    )
+    parser.add_argument(
+        "--stage", action="append", default=[], metavar="ETAP=RODZAJ:N", type=parse_stage,
+        help="Ustawienie etapu potoku, np. 'preprocess=process:4' lub 'render=thread:3' "
+             f"(etapy: {', '.join(config.PIPELINE_STAGES)})"
+    )
+    parser.add_argument(
+        "--metrics", choices=["off", "basic", "detailed"], default=config.METRICS_LEVEL,
+        help="Pomiar czasu etapów: 'basic' - etapy dokumentu i liczniki, 'detailed' - także każde ROI "
+             f"i wywołanie OCR (domyślnie: {config.METRICS_LEVEL})"
+    )
+    parser.add_argument(
+        "--metrics-dir", default=config.METRICS_DIR,
+        help="Katalog pliku Prometheus (metrics.prom) i podsumowania JSON (metrics.json) "
+             f"(domyślnie: {config.METRICS_DIR})"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Pokaż komunikaty diagnostyczne procesów roboczych"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Główna funkcja importu wsadowego."""
+    args = parse_args(argv)
+
+    pdf_files = collect_pdf_files(args.paths, recursive=args.recursive)
+    if not pdf_files:
+        print("Nie znaleziono plików PDF.")
+        return 1
+
+    print(f"Znaleziono {len(pdf_files)} plików PDF, procesów roboczych: {args.workers}")
+
+    metrics = get_metrics()
+    metrics.set_level(args.metrics)
+
+    db_manager = DatabaseManager(args.db)
+    try:
+        importer = BatchImporter(
+            db_manager,
+            db_name=args.db,
+            workers=args.workers,
+            save_uncertain=args.save_uncertain,
+            quiet=not args.verbose,
+            ocr_batch=args.ocr_batch,
+            duplicates=args.duplicates,
+            pipeline_stages=dict(config.PIPELINE_STAGES, **dict(args.stage)) if args.pipeline else None
+        )
+        summary = importer.run(pdf_files)
+    except (RuntimeError, ValueError) as e:
+        print(f"Błąd: {e}")
+        return 1
+    finally:
+        db_manager.close()
+
+    print(format_summary(summary))
+    if metrics.enabled():
+        print(format_metrics_summary(metrics.summary()))
+        print(f"Metryki zapisano w katalogu {metrics.export(args.metrics_dir)}")
+    return 0 if not summary['bledow'] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Kontrola planów zapytań bazy raportów.
+
+Tworzy tymczasową bazę z zadaną liczbą raportów (domyślnie milion),
+wywołuje metody DatabaseManager używane przez interfejs, przechwytuje
+wykonane instrukcje SQL i sprawdza ich plany (EXPLAIN QUERY PLAN):
+żadne zapytanie nie może przeglądać całej tabeli raporty, a zapytania
+oznaczone jako posortowane nie mogą sortować wyników w pamięci.
+Kod wyjścia 1 oznacza, że któryś plan przestał korzystać z indeksu.
+
+Przykład:
+    python benchmarks/query_plan_check.py --rows 1000000
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from database.db_manager import DatabaseManager, INSERT_REPORT_SQL, QUERY_SEARCH, QUERY_SEGMENT  # noqa: E402
+
+
+def generate_reports(count, seed=0):
+    """Losowe raporty o budowie zbliżonej do rzeczywistych (numer zlecenia z czterema segmentami)."""
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    for i in range(count):
+        numer_zlecenia = (f"{rng.randint(1000, 9999)}-{rng.randint(1, 999):03d}-"
+                          f"{rng.randint(1, 99):02d}-{rng.randint(1, 9)}")
+        data_importu = start + timedelta(seconds=i * 300 + rng.randint(0, 299))
+        data_raportu = (data_importu - timedelta(days=rng.randint(0, 30))).strftime("%d.%m.%Y")
+        yield numer_zlecenia, str(rng.randint(100, 999)), data_raportu, f"/archiwum/{i}.pdf", \
+            data_importu.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def fill_database(db_manager, count):
+    """Wypełnienie bazy raportami jedną transakcją."""
+    rows = (
+        db_manager._report_values(numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu)
+        for numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu in generate_reports(count)
+    )
+    with db_manager.conn:
+        db_manager.cursor.executemany(INSERT_REPORT_SQL, rows)
+    db_manager.cursor.execute("ANALYZE")
+
+
+# Ścieżki dostępu używane przez interfejs: (nazwa, wywołanie, czy wynik musi być posortowany indeksem)
+ACCESS_PATHS = [
+    ("get_all_reports", lambda db: db.get_all_reports(), True),
+    # Kolejna strona tabeli - musi zaczynać się od klucza w indeksie, bez sortowania całej tabeli
+    ("fetch_reports_page", lambda db: db.fetch_reports_page(after=("2015-06-01 00:00:00", 1 << 62)), True),
+    ("filter_by_segment(1)", lambda db: db.filter_by_segment(1, "12"), False),
+    ("filter_by_segment(2)", lambda db: db.filter_by_segment(2, "05"), False),
+    ("filter_by_segment(3)", lambda db: db.filter_by_segment(3, "4"), False),
+    ("filter_by_segment(4)", lambda db: db.filter_by_segment(4, "7"), False),
+    # Sortowanie po kolumnach tabeli (pierwsza i kolejna strona) - ORDER BY z indeksu
+    ("sort(numer_zlecenia)", lambda db: db.fetch_reports_page(sort=(1, False)), True),
+    ("sort(numer_operatora)", lambda db: db.fetch_reports_page(sort=(2, True)), True),
+    ("sort(data_raportu)", lambda db: db.fetch_reports_page(sort=(3, False)), True),
+    ("sort(data_raportu) strona",
+     lambda db: db.fetch_reports_page(sort=(3, True), after=("2015-06-01", 1 << 62)), True),
+    # Pierwsza strona po id to przejście tabeli w kolejności rowid - sprawdzana jest strona kolejna
+    ("sort(id) strona", lambda db: db.fetch_reports_page(sort=(0, True), after=(10000, 10000)), True),
+    # Zakres dat raportu (np. audyt miesięczny) - przeglądanie zakresu indeksu daty ISO
+    ("get_reports_by_date_range",
+     lambda db: db.get_reports_by_date_range(date(2015, 3, 1), date(2015, 3, 31)), True),
+    # Sortowanie połączone z filtrem - jedno zapytanie, filtr z indeksu
+    ("filtr + sort(data_raportu)",
+     lambda db: db.fetch_reports_page((QUERY_SEGMENT, (1, "12")), sort=(3, False)), False),
+    ("szukanie + sort(operator)",
+     lambda db: db.fetch_reports_page((QUERY_SEARCH, ("123-",)), sort=(2, True)), False),
+    # Sprawdzenie skrótu pliku przed rozpoznawaniem - przy każdym imporcie
+    ("find_report_by_hash", lambda db: [db.find_report_by_hash("0" * 64)], False),
+    # Teksty krótsze niż FTS_MIN_QUERY_LENGTH celowo przeszukują tabelę (LIKE) - nie są sprawdzane
+    ("search_reports(zlecenie)", lambda db: db.search_reports("123-04"), False),
+    ("search_reports(data)", lambda db: db.search_reports("03.2015"), False),
+]
+
+
+def capture_queries(db_manager, call):
+    """Wywołanie metody DatabaseManager z zapisaniem wykonanych instrukcji SELECT (z wartościami parametrów)."""
+    statements = []
+    db_manager.conn.set_trace_callback(
+        lambda sql: statements.append(sql) if sql.lstrip().upper().startswith("SELECT") else None
+    )
+    try:
+        start = time.perf_counter()
+        rows = call(db_manager)
+        elapsed = time.perf_counter() - start
+    finally:
+        db_manager.conn.set_trace_callback(None)
+    return statements, len(rows), elapsed
+
+
+def check_plan(conn, sql, require_ordered):
+    """Plan zapytania i lista problemów (pełne przeglądanie tabeli, sortowanie w pamięci)."""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and "USING" not in detail and "VIRTUAL TABLE" not in detail:
+            problems.append(f"pełne przeglądanie tabeli: {detail}")
+        if require_ordered and "USE TEMP B-TREE FOR ORDER BY" in detail:
+            problems.append(f"sortowanie w pamięci: {detail}")
+    return plan, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kontrola planów zapytań bazy raportów.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Liczba raportów w bazie testowej")
+    parser.add_argument("--db", help="Użyj istniejącej bazy zamiast tworzenia tymczasowej")
+    parser.add_argument("--json", action="store_true", help="Wypisz wynik w formacie JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_name = args.db or os.path.join(work_dir, "plan_check.db")
+        db_manager = DatabaseManager(db_name)
+        try:
+            if not args.db:
+                start = time.perf_counter()
+                fill_database(db_manager, args.rows)
+                if not args.json:
+                    print(f"Utworzono {args.rows} raportów w {time.perf_counter() - start:.1f}s")
+
+            results = []
+            for name, call, require_ordered in ACCESS_PATHS:
+                statements, row_count, elapsed = capture_queries(db_manager, call)
+                for sql in statements:
+                    plan, problems = check_plan(db_manager.conn, sql, require_ordered)
+                    results.append({"path": name, "sql": " ".join(sql.split()), "plan": plan,
+                                    "rows": row_count, "seconds": elapsed, "problems": problems})
+        finally:
+            db_manager.close()
+
+    failures = [result for result in results if result["problems"]]
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        for result in results:
+            status = "BŁĄD" if result["problems"] else "OK"
+            print(f"{status:<5} {result['path']:<24} {result['seconds'] * 1000:9.1f} ms  "
+                  f"{result['rows']:>8} wierszy  {' | '.join(result['plan'])}")
+
+    for result in failures:
+        for problem in result["problems"]:
+            print(f"REGRESJA: {result['path']}: {problem}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Pomiar czasu uruchomienia aplikacji.
+
+Mierzy czas importu modułów okna głównego (python -X importtime) oraz czas
+do pojawienia się pierwszego okna, sprawdza, czy przy starcie nie są
+ładowane ciężkie biblioteki OCR, i porównuje wyniki z progami lub z
+zapisanym wcześniej wynikiem bazowym. Kod wyjścia 1 oznacza regresję.
+
+Przykład:
+    python benchmarks/startup_benchmark.py --runs 5 --save-baseline startup.json
+    python benchmarks/startup_benchmark.py --runs 5 --baseline startup.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduły, które nie mogą być ładowane przed pierwszym użyciem OCR
+HEAVY_MODULES = ['paddleocr', 'paddle', 'torch', 'easyocr', 'cv2', 'numpy', 'pymupdf', 'fitz', 'pytesseract', 'pdf2image']
+
+# Skrypt uruchamiany w osobnym procesie - wypisuje znacznik czasu po pokazaniu okna
+FIRST_WINDOW_SCRIPT = r'''
+import sys, time, json
+sys.path.insert(0, {project_dir!r})
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+from views.main_window import MainWindow
+
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+
+def done():
+    heavy = [name for name in {heavy!r} if name in sys.modules]
+    print(json.dumps({{"shown_at": time.time(), "heavy_modules": heavy}}))
+    app.quit()
+
+QTimer.singleShot(0, done)
+app.exec_()
+'''
+
+
+def measure_import_time(module="views.main_window"):
+    """Czas importu modułu (mikrosekundy) i lista najdroższych importów według python -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import {module} nie powiódł się:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        entries.append((int(cumulative_us), int(self_us), name))
+
+    total = next((cumulative for cumulative, _, name in entries if name == module), 0)
+    top = sorted(entries, reverse=True)[:15]
+    return total, top
+
+
+def measure_first_window():
+    """Czas od uruchomienia procesu do pokazania okna głównego (sekundy)."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    script = FIRST_WINDOW_SCRIPT.format(project_dir=PROJECT_DIR, heavy=HEAVY_MODULES)
+
+    # Osobny katalog roboczy - aplikacja tworzy w nim pustą bazę danych
+    with tempfile.TemporaryDirectory() as work_dir:
+        start = time.time()
+        result = subprocess.run([sys.executable, "-c", script], cwd=work_dir, env=env,
+                                capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Uruchomienie okna nie powiodło się:\n{result.stderr}")
+
+    payload = json.loads(result.stdout.strip().splitlines()[-1])
+    return payload["shown_at"] - start, payload["heavy_modules"]
+
+
+def run_benchmark(runs):
+    """Wielokrotny pomiar - zwraca słownik z medianami."""
+    import_times = []
+    window_times = []
+    heavy_modules = set()
+    top_imports = []
+
+    for _ in range(runs):
+        total, top_imports = measure_import_time()
+        import_times.append(total / 1e6)
+        window_time, heavy = measure_first_window()
+        window_times.append(window_time)
+        heavy_modules.update(heavy)
+
+    return {
+        "runs": runs,
+        "import_seconds": statistics.median(import_times),
+        "first_window_seconds": statistics.median(window_times),
+        "heavy_modules": sorted(heavy_modules),
+        "top_imports": [
+            {"module": name, "cumulative_us": cumulative, "self_us": self_us}
+            for cumulative, self_us, name in top_imports
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pomiar czasu uruchomienia aplikacji.")
+    parser.add_argument("--runs", type=int, default=3, help="Liczba powtórzeń (wynikiem jest mediana)")
+    parser.add_argument("--max-first-window", type=float, default=3.0,
+                        help="Maksymalny dopuszczalny czas do pokazania okna (s)")
+    parser.add_argument("--baseline", help="Plik JSON z wynikiem bazowym do porównania")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Dopuszczalny względny wzrost względem wyniku bazowego (domyślnie 25%%)")
+    parser.add_argument("--save-baseline", help="Zapisz wynik jako nowy wynik bazowy")
+    parser.add_argument("--json", action="store_true", help="Wypisz wynik w formacie JSON")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.runs)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print(f"Import views.main_window: {result['import_seconds'] * 1000:.1f} ms")
+        print(f"Czas do pierwszego okna: {result['first_window_seconds'] * 1000:.1f} ms")
+        print("Najdroższe importy (łącznie):")
+        for entry in result["top_imports"][:10]:
+            print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    failures = []
+    if result["heavy_modules"]:
+        failures.append(f"Przy starcie załadowano ciężkie moduły: {', '.join(result['heavy_modules'])}")
+    if result["first_window_seconds"] > args.max_first_window:
+        failures.append(f"Czas do pierwszego okna {result['first_window_seconds']:.2f}s "
+                        f"przekracza limit {args.max_first_window:.2f}s")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("import_seconds", "first_window_seconds"):
+            limit = baseline[key] * (1 + args.tolerance)
+            if result[key] > limit:
+                failures.append(f"{key}: {result[key]:.3f}s > {limit:.3f}s (bazowo {baseline[key]:.3f}s)")
+
+    for failure in failures:
+        print(f"REGRESJA: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Syntetyczny zbiór raportów klejenia ze znanymi wartościami pól.
+
+Generuje pliki PDF przypominające zeskanowane formularze: pola numeru
+zlecenia, numeru operatora i daty wypełnione "odręcznie" (cyfry o losowej
+wielkości i położeniu) w miejscach odpowiadających obszarom ROI szablonu,
+z szumem skanera, rozmyciem, kompresją JPEG, niewielkim obrotem i
+przesunięciem strony oraz dodatkowymi stronami. Ten sam `seed` daje
+identyczny zbiór, więc wyniki benchmarku można porównywać między wersjami.
+
+Obok plików zapisywany jest manifest (corpus.json) z wartościami pól
+każdego dokumentu i współrzędnymi ROI szablonu (w pikselach przy
+config.PDF_RENDER_DPI).
+
+Przykład:
+    python benchmarks/synthetic_corpus.py /tmp/korpus --documents 100 --seed 1
+"""
+
+import io
+import functools
+import os
+import sys
+import json
+import random
+import argparse
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import config  # noqa: E402
+from utils.pdf_renderer import _import_fitz  # noqa: E402
+
+MANIFEST_NAME = "corpus.json"
+
+# Strona A4 w rozdzielczości, w której zapisywane są współrzędne ROI szablonu
+PAGE_POINTS = (595, 842)
+PAGE_SIZE = tuple(round(points * config.PDF_RENDER_DPI / 72) for points in PAGE_POINTS)
+
+# Ramki pól formularza (x1, y1, x2, y2) przy PDF_RENDER_DPI
+FIELD_BOXES = {
+    'numer_zlecenia': (900, 480, 2250, 640),
+    'numer_operatora': (900, 720, 1500, 880),
+    'data': (900, 960, 1750, 1120),
+}
+FIELD_LABELS = {
+    'numer_zlecenia': "Numer zlecenia:",
+    'numer_operatora': "Operator:",
+    'data': "Data:",
+}
+# Odsunięcie ROI szablonu od ramki pola - obrót i przesunięcie skanu nie wprowadzają ramki do ROI
+ROI_INSET = 16
+
+# Domyślne parametry zniekształceń
+DEFAULT_NOISE = 12.0       # odchylenie standardowe szumu (poziomy jasności)
+DEFAULT_ROTATION = 0.6     # maksymalny obrót strony (stopnie)
+DEFAULT_SHIFT = 10         # maksymalne przesunięcie strony (piksele)
+DEFAULT_MAX_PAGES = 3      # maksymalna liczba stron dokumentu
+DEFAULT_JPEG_QUALITY = 70
+DEFAULT_SCAN_DPI = 200      # rozdzielczość obrazu zapisanego w PDF (typowa dla skanerów biurowych)
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size, mono=False):
+    """Czcionka TrueType (DejaVu) lub wbudowana czcionka PIL, gdy jej brak."""
+    from PIL import ImageFont
+
+    for name in (("DejaVuSansMono.ttf", "LiberationMono-Regular.ttf", "cour.ttf") if mono
+                 else ("DejaVuSans.ttf", "LiberationSans-Regular.ttf", "arial.ttf")):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def template_rois():
+    """Współrzędne ROI szablonu w formacie zapisywanym w bazie ('x1,y1,x2,y2')."""
+    return {
+        roi_name: ",".join(str(value) for value in (x1 + ROI_INSET, y1 + ROI_INSET, x2 - ROI_INSET, y2 - ROI_INSET))
+        for roi_name, (x1, y1, x2, y2) in FIELD_BOXES.items()
+    }
+
+
+def random_values(rng):
+    """Losowe wartości pól raportu i tekst wpisany w formularz."""
+    digits = "".join(str(rng.randint(0, 9)) for _ in range(14))
+    numer_zlecenia = f"{digits[0:3]}-{digits[3:7]}-{digits[7:11]}-{digits[11:14]}"
+    numer_operatora = str(rng.randint(10, 9999))
+    data_raportu = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2018, 2026)}"
+    return {'numer_zlecenia': numer_zlecenia, 'numer_operatora': numer_operatora, 'data': data_raportu}
+
+
+def _draw_handwritten(draw, box, text, rng):
+    """Wpisanie tekstu w ramkę - każdy znak z losową wielkością, wysokością i odstępem."""
+    x1, y1, x2, y2 = box
+    height = y2 - y1
+    x = x1 + 30 + rng.randint(0, 20)
+    for char in text:
+        font = _font(int(height * rng.uniform(0.5, 0.62)))
+        y = y1 + height * 0.18 + rng.uniform(-6, 6)
+        ink = (rng.randint(10, 40), rng.randint(20, 50), rng.randint(90, 140))
+        draw.text((x, y), char, font=font, fill=ink)
+        x += font.getlength(char) + rng.uniform(2, 10)
+        if x > x2 - 20:
+            break
+
+
+def _draw_form(values, rng):
+    """Pierwsza strona raportu: nagłówek, pola z wartościami i tabela parametrów procesu."""
+    from PIL import Image, ImageDraw
+
+    page = Image.new("RGB", PAGE_SIZE, "white")
+    draw = ImageDraw.Draw(page)
+    draw.text((150, 150), "RAPORT KLEJENIA", font=_font(90), fill="black")
+    draw.line((150, 300, PAGE_SIZE[0] - 150, 300), fill="black", width=4)
+
+    label_font = _font(55)
+    for roi_name, box in FIELD_BOXES.items():
+        draw.text((150, box[1] + 45), FIELD_LABELS[roi_name], font=label_font, fill="black")
+        draw.rectangle(box, outline="black", width=4)
+        _draw_handwritten(draw, box, values[roi_name], rng)
+
+    # Tabela parametrów - drukowany tekst poza ROI, zbliżony do rzeczywistego formularza
+    table_font = _font(40, mono=True)
+    top = 1350
+    for row in range(14):
+        y = top + row * 110
+        draw.line((150, y, PAGE_SIZE[0] - 150, y), fill="black", width=2)
+        cells = [f"Pomiar {row + 1:02d}", f"{rng.uniform(10, 99):6.2f} N", f"{rng.uniform(100, 250):6.1f} C",
+                 f"{rng.randint(1, 60):3d} s"]
+        for column, cell in enumerate(cells):
+            draw.text((180 + column * 520, y + 30), cell, font=table_font, fill="black")
+    return page
+
+
+def _draw_extra_page(number, rng):
+    """Kolejna strona raportu (załącznik) - drukowany tekst bez pól szablonu."""
+    from PIL import Image, ImageDraw
+
+    page = Image.new("RGB", PAGE_SIZE, "white")
+    draw = ImageDraw.Draw(page)
+    draw.text((150, 150), f"Załącznik {number}", font=_font(70), fill="black")
+    font = _font(40, mono=True)
+    for line in range(40):
+        text = " ".join(f"{rng.randint(0, 99999):05d}" for _ in range(8))
+        draw.text((150, 350 + line * 75), text, font=font, fill="black")
+    return page
+
+
+def _scan(page, rng, noise, rotation, shift, scan_dpi):
+    """Zniekształcenia skanera: skala szarości, obrót, przesunięcie, rozmycie, tło i szum.
+
+    Zwraca obraz w rozdzielczości `scan_dpi` oraz zastosowany obrót i przesunięcie.
+    """
+    import numpy as np
+    from PIL import Image, ImageFilter
+
+    page = page.convert("L")
+    angle = rng.uniform(-rotation, rotation)
+    offset = (rng.randint(-shift, shift), rng.randint(-shift, shift))
+    page = page.rotate(angle, resample=Image.BILINEAR, translate=offset, fillcolor=255)
+    if scan_dpi != config.PDF_RENDER_DPI:
+        page = page.resize((round(PAGE_POINTS[0] * scan_dpi / 72), round(PAGE_POINTS[1] * scan_dpi / 72)),
+                           Image.BILINEAR)
+    if rng.random() < 0.5:
+        page = page.filter(ImageFilter.GaussianBlur(rng.uniform(0.3, 0.8)))
+
+    np_rng = np.random.default_rng(rng.getrandbits(32))
+    pixels = np.asarray(page, dtype=np.float32)
+    # Szare tło papieru, szum czujnika i pojedyncze plamki
+    pixels = pixels * rng.uniform(0.9, 0.97) + np_rng.normal(0, noise, pixels.shape).astype(np.float32)
+    specks = np_rng.random(pixels.shape) < 0.0005
+    pixels[specks] = rng.uniform(0, 80)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)), angle, offset
+
+
+def _jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def generate_document(path, rng, noise=DEFAULT_NOISE, rotation=DEFAULT_ROTATION, shift=DEFAULT_SHIFT,
+                      max_pages=DEFAULT_MAX_PAGES, jpeg_quality=DEFAULT_JPEG_QUALITY, scan_dpi=DEFAULT_SCAN_DPI):
+    """Zapisanie jednego raportu PDF. Zwraca wpis manifestu z wartościami pól."""
+    fitz = _import_fitz()
+
+    values = random_values(rng)
+    pages = rng.randint(1, max(1, max_pages))
+    first_page, angle, offset = _scan(_draw_form(values, rng), rng, noise, rotation, shift, scan_dpi)
+
+    document = fitz.open()
+    try:
+        for number in range(pages):
+            if number == 0:
+                image = first_page
+            else:
+                image = _scan(_draw_extra_page(number, rng), rng, noise, rotation, shift, scan_dpi)[0]
+            page = document.new_page(width=PAGE_POINTS[0], height=PAGE_POINTS[1])
+            page.insert_image(page.rect, stream=_jpeg(image, jpeg_quality))
+        document.save(path, garbage=3, deflate=True)
+    finally:
+        document.close()
+
+    return {
+        'file': os.path.basename(path),
+        'numer_zlecenia': values['numer_zlecenia'],
+        'numer_operatora': values['numer_operatora'],
+        'data_raportu': values['data'],
+        'pages': pages,
+        'rotation': round(angle, 3),
+        'shift': list(offset),
+    }
+
+
+def generate_corpus(directory, documents, seed=0, noise=DEFAULT_NOISE, rotation=DEFAULT_ROTATION,
+                    shift=DEFAULT_SHIFT, max_pages=DEFAULT_MAX_PAGES, jpeg_quality=DEFAULT_JPEG_QUALITY,
+                    scan_dpi=DEFAULT_SCAN_DPI):
+    """Wygenerowanie zbioru raportów i manifestu w katalogu. Zwraca manifest."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    parameters = {'documents': documents, 'seed': seed, 'noise': noise, 'rotation': rotation, 'shift': shift,
+                  'max_pages': max_pages, 'jpeg_quality': jpeg_quality, 'scan_dpi': scan_dpi,
+                  'dpi': config.PDF_RENDER_DPI}
+
+    entries = []
+    for index in range(documents):
+        path = os.path.join(directory, f"raport_{index:05d}.pdf")
+        entries.append(generate_document(path, rng, noise, rotation, shift, max_pages, jpeg_quality, scan_dpi))
+
+    manifest = {'parameters': parameters, 'template': template_rois(), 'documents': entries}
+    with open(os.path.join(directory, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def load_manifest(directory):
+    """Manifest zbioru wygenerowanego wcześniej przez generate_corpus."""
+    with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Syntetyczny zbiór raportów klejenia ze znanymi wartościami pól.")
+    parser.add_argument("directory", help="Katalog docelowy")
+    parser.add_argument("--documents", type=int, default=50, help="Liczba raportów")
+    parser.add_argument("--seed", type=int, default=0, help="Ziarno losowania (ten sam seed - ten sam zbiór)")
+    parser.add_argument("--noise", type=float, default=DEFAULT_NOISE, help="Odchylenie standardowe szumu")
+    parser.add_argument("--rotation", type=float, default=DEFAULT_ROTATION, help="Maksymalny obrót strony (stopnie)")
+    parser.add_argument("--shift", type=int, default=DEFAULT_SHIFT, help="Maksymalne przesunięcie strony (piksele)")
+    parser.add_argument("--max-pages", type=int, default=DEFAULT_MAX_PAGES, help="Maksymalna liczba stron")
+    parser.add_argument("--scan-dpi", type=int, default=DEFAULT_SCAN_DPI, help="Rozdzielczość skanu w PDF")
+    args = parser.parse_args(argv)
+
+    manifest = generate_corpus(args.directory, args.documents, args.seed, args.noise, args.rotation,
+                               args.shift, args.max_pages, scan_dpi=args.scan_dpi)
+    print(f"Wygenerowano {len(manifest['documents'])} raportów w {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Pomiar przepustowości i dokładności rozpoznawania raportów.
+
+Generuje (lub wczytuje) syntetyczny zbiór raportów o znanych wartościach
+pól (benchmarks/synthetic_corpus.py) i dla każdego silnika OCR uruchamia
+w osobnym procesie bezinterfejsowy import przez potok dokumentów
+(skrót -> renderowanie -> przetwarzanie wstępne -> OCR -> formatowanie)
+z zapisem do tymczasowej bazy. Dla każdego silnika podaje czas na dokument
+w każdym etapie (także zapisu), liczbę dokumentów na sekundę, szczytowe
+zużycie pamięci (RSS procesu importu, bez procesów tesseract) oraz dokładność
+rozpoznania każdego pola. Wynik w JSON można zapisać i porównać z wynikiem
+poprzedniej wersji - kod wyjścia 1 oznacza regresję. Pamięć podręczna stron
+i zapis artefaktów diagnostycznych są wyłączone.
+
+Silniki: paddle (PaddleOCR z detekcją - tryb domyślny), paddle-rec (PaddleOCR
+tylko z modelem rozpoznawania), tesseract (mozaika ROI), tesseract-roi
+(osobne wywołanie dla każdego ROI - tryb domyślny). Niedostępne silniki są
+pomijane.
+
+Przykład:
+    python benchmarks/throughput_benchmark.py --documents 100 --output wynik.json
+    python benchmarks/throughput_benchmark.py --documents 100 --baseline wynik.json
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import contextlib
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import config  # noqa: E402
+from benchmarks.synthetic_corpus import generate_corpus, load_manifest, MANIFEST_NAME  # noqa: E402
+
+# Warianty silników OCR: nazwa -> ustawienia config
+ENGINE_VARIANTS = {
+    'paddle': {'OCR_ENGINE': 'paddle', 'PADDLE_RECOGNITION_ONLY': False},
+    'paddle-rec': {'OCR_ENGINE': 'paddle', 'PADDLE_RECOGNITION_ONLY': True},
+    'tesseract': {'OCR_ENGINE': 'tesseract', 'TESSERACT_MOSAIC': True},
+    'tesseract-roi': {'OCR_ENGINE': 'tesseract', 'TESSERACT_MOSAIC': False},
+}
+
+# Pola porównywane z manifestem zbioru
+FIELDS = ('numer_zlecenia', 'numer_operatora', 'data_raportu')
+
+
+def _peak_rss_mb():
+    """Szczytowe RSS bieżącego procesu (MB) - None, gdy system tego nie podaje (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux podaje ru_maxrss w kilobajtach, macOS w bajtach
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _engine_unavailable(engine):
+    """Powód niedostępności silnika w tym środowisku lub None."""
+    if ENGINE_VARIANTS[engine]['OCR_ENGINE'] == 'paddle':
+        from controllers.pdf_processor import PADDLE_AVAILABLE
+        if not PADDLE_AVAILABLE:
+            return "brak pakietu paddleocr"
+    elif shutil.which(config.TESSERACT_PATH) is None:
+        return f"brak programu tesseract ({config.TESSERACT_PATH})"
+    return None
+
+
+def measure_accuracy(results, manifest):
+    """Odsetek poprawnie rozpoznanych pól (i całych dokumentów) względem manifestu zbioru."""
+    expected = {entry['file']: entry for entry in manifest['documents']}
+    correct = dict.fromkeys(FIELDS + ('dokument',), 0)
+    for result in results:
+        entry = expected[os.path.basename(result['sciezka_pdf'])]
+        matches = [result.get(field) == entry[field] for field in FIELDS]
+        for field, match in zip(FIELDS, matches):
+            correct[field] += match
+        correct['dokument'] += all(matches)
+    total = len(manifest['documents'])
+    return {field: count / total if total else 0.0 for field, count in correct.items()}
+
+
+def run_worker(engine, corpus_dir, ocr_batch):
+    """Import zbioru jednym silnikiem (w procesie uruchomionym przez run_engine). Zwraca słownik wyników."""
+    for name, value in ENGINE_VARIANTS[engine].items():
+        setattr(config, name, value)
+    config.PAGE_CACHE_ENABLED = False
+    config.DEBUG_MODE = 'off'
+
+    reason = _engine_unavailable(engine)
+    if reason:
+        return {'engine': engine, 'skipped': reason}
+
+    from controllers.batch_importer import _document_pipeline_stages, STATUS_OK
+    from controllers.pdf_processor import PDFProcessor
+    from controllers.pipeline import Pipeline
+    from database.db_manager import DatabaseManager
+    from database.report_writer import ReportWriter
+
+    manifest = load_manifest(corpus_dir)
+    pdf_files = [os.path.join(corpus_dir, entry['file']) for entry in manifest['documents']]
+
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, 'w') as devnull:
+        db_name = os.path.join(work_dir, "benchmark.db")
+        db_manager = DatabaseManager(db_name)
+        template = manifest['template']
+        db_manager.save_template("benchmark", template['numer_zlecenia'], template['numer_operatora'],
+                                 template['data'])
+
+        with contextlib.redirect_stdout(devnull):
+            pdf_processor = PDFProcessor(db_manager)
+            start = time.perf_counter()
+            pdf_processor.warm_up_engines()
+            warm_up = time.perf_counter() - start
+            if ENGINE_VARIANTS[engine]['OCR_ENGINE'] == 'paddle' and not pdf_processor.paddle_ocr:
+                return {'engine': engine, 'skipped': "nie udało się załadować PaddleOCR"}
+
+            stages = _document_pipeline_stages(pdf_processor, db_manager.get_templates(), db_name,
+                                               config.PIPELINE_STAGES, ocr_batch)
+            pipeline = Pipeline(stages)
+            results = []
+            errors = 0
+            write_latencies = []
+
+            start = time.perf_counter()
+            with ReportWriter(db_name) as writer:
+                for result in pipeline.run(pdf_files):
+                    if result.error is not None:
+                        errors += 1
+                        continue
+                    value = result.value
+                    results.append(value)
+                    submitted = time.perf_counter()
+                    future = writer.submit(value['numer_zlecenia'], value['numer_operatora'], value['data_raportu'],
+                                           value['sciezka_pdf'], value['hash_pdf'])
+                    future.add_done_callback(
+                        lambda future, submitted=submitted: write_latencies.append(time.perf_counter() - submitted))
+            elapsed = time.perf_counter() - start
+        db_manager.close()
+
+    stages = [
+        {'stage': stage['etap'], 'kind': stage['rodzaj'], 'workers': stage['wykonawcow'],
+         'ms_per_document': stage['czas_na_element'] * 1000, 'utilization': stage['obciazenie'],
+         'queue_mean': stage['kolejka_srednio']}
+        for stage in pipeline.stats()
+    ]
+    stages.append({'stage': 'write', 'kind': 'thread', 'workers': 1,
+                   'ms_per_document': statistics.mean(write_latencies) * 1000 if write_latencies else 0.0,
+                   'utilization': None, 'queue_mean': None})
+
+    return {
+        'engine': engine,
+        'documents': len(pdf_files),
+        'errors': errors,
+        'uncertain': sum(1 for result in results if result['status'] != STATUS_OK),
+        'warm_up_seconds': warm_up,
+        'seconds': elapsed,
+        'documents_per_second': len(pdf_files) / elapsed if elapsed > 0 else 0.0,
+        'peak_rss_mb': _peak_rss_mb(),
+        'stages': stages,
+        'accuracy': measure_accuracy(results, manifest),
+    }
+
+
+def run_engine(engine, corpus_dir, ocr_batch, tesseract_path=None):
+    """Pomiar silnika w osobnym procesie - szczytowe RSS nie obejmuje innych silników ani generowania zbioru."""
+    command = [sys.executable, os.path.abspath(__file__), "--worker", engine, "--corpus", corpus_dir,
+               "--ocr-batch", str(ocr_batch)]
+    if tesseract_path:
+        command += ["--tesseract-path", tesseract_path]
+    result = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Pomiar silnika {engine} nie powiódł się:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(engines, corpus_dir, runs, ocr_batch, tesseract_path=None):
+    """Pomiar wszystkich silników - przy kilku powtórzeniach mediana przepustowości i maksimum pamięci."""
+    manifest = load_manifest(corpus_dir)
+    measured = {}
+    for engine in engines:
+        samples = [run_engine(engine, corpus_dir, ocr_batch, tesseract_path) for _ in range(runs)]
+        if 'skipped' in samples[0]:
+            measured[engine] = samples[0]
+            continue
+        best = sorted(samples, key=lambda sample: sample['documents_per_second'])[len(samples) // 2]
+        best['runs'] = runs
+        best['peak_rss_mb'] = max((sample['peak_rss_mb'] or 0) for sample in samples) or None
+        measured[engine] = best
+
+    return {
+        'version': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'corpus': manifest['parameters'],
+        'ocr_batch': ocr_batch,
+        'engines': measured,
+    }
+
+
+def _git_revision():
+    """Skrót bieżącej wersji kodu (None poza repozytorium git)."""
+    try:
+        result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=PROJECT_DIR,
+                                capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def compare_with_baseline(result, baseline, tolerance, accuracy_tolerance):
+    """Lista regresji względem wyniku bazowego (dla silników zmierzonych w obu przebiegach)."""
+    if result['corpus'] != baseline['corpus']:
+        return ["Wynik bazowy dotyczy innego zbioru raportów - porównanie niemożliwe"]
+
+    failures = []
+    for engine, current in result['engines'].items():
+        previous = baseline['engines'].get(engine)
+        if not previous or 'skipped' in previous or 'skipped' in current:
+            continue
+
+        limit = previous['documents_per_second'] * (1 - tolerance)
+        if current['documents_per_second'] < limit:
+            failures.append(f"{engine}: {current['documents_per_second']:.2f} dok./s < {limit:.2f} "
+                            f"(bazowo {previous['documents_per_second']:.2f})")
+        if current['peak_rss_mb'] and previous['peak_rss_mb']:
+            limit = previous['peak_rss_mb'] * (1 + tolerance)
+            if current['peak_rss_mb'] > limit:
+                failures.append(f"{engine}: szczytowe RSS {current['peak_rss_mb']:.0f} MB > {limit:.0f} MB "
+                                f"(bazowo {previous['peak_rss_mb']:.0f} MB)")
+        for field, accuracy in current['accuracy'].items():
+            before = previous['accuracy'].get(field)
+            if before is not None and accuracy < before - accuracy_tolerance:
+                failures.append(f"{engine}: dokładność {field} {accuracy:.1%} < {before:.1%}")
+    return failures
+
+
+def format_result(result):
+    """Tabela wyników do wypisania w konsoli."""
+    corpus = result['corpus']
+    lines = [f"Zbiór: {corpus['documents']} raportów (seed {corpus['seed']}), wersja {result['version']}"]
+    for engine, measured in result['engines'].items():
+        lines.append("")
+        if 'skipped' in measured:
+            lines.append(f"{engine}: pominięty ({measured['skipped']})")
+            continue
+        rss = f"{measured['peak_rss_mb']:.0f} MB" if measured['peak_rss_mb'] else "?"
+        lines.append(f"{engine}: {measured['documents_per_second']:.2f} dok./s ({measured['seconds']:.1f}s, "
+                     f"rozgrzewanie {measured['warm_up_seconds']:.1f}s), szczytowe RSS {rss}, błędów {measured['errors']}, "
+                     f"do weryfikacji {measured['uncertain']}")
+        lines.append("  Etap          ms/dok.  Obciąż.")
+        for stage in measured['stages']:
+            utilization = f"{stage['utilization'] * 100:7.1f}%" if stage['utilization'] is not None else "       -"
+            lines.append(f"  {stage['stage']:<12} {stage['ms_per_document']:8.1f} {utilization}")
+        lines.append("  Dokładność: " + ", ".join(
+            f"{field} {accuracy:.1%}" for field, accuracy in measured['accuracy'].items()))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pomiar przepustowości i dokładności rozpoznawania raportów.")
+    parser.add_argument("--documents", type=int, default=50, help="Liczba raportów w generowanym zbiorze")
+    parser.add_argument("--seed", type=int, default=0, help="Ziarno generowanego zbioru")
+    parser.add_argument("--corpus", help="Katalog zbioru (jeśli nie zawiera manifestu, zbiór zostanie w nim "
+                                         "wygenerowany); domyślnie katalog tymczasowy")
+    parser.add_argument("--engines", default=",".join(ENGINE_VARIANTS),
+                        help="Silniki oddzielone przecinkami (domyślnie wszystkie)")
+    parser.add_argument("--runs", type=int, default=1, help="Liczba powtórzeń dla każdego silnika (mediana)")
+    parser.add_argument("--ocr-batch", type=int, default=config.BATCH_OCR_DOCUMENTS,
+                        help="Liczba dokumentów rozpoznawanych razem")
+    parser.add_argument("--tesseract-path", help="Ścieżka do programu tesseract (zamiast config.TESSERACT_PATH)")
+    parser.add_argument("--baseline", help="Plik JSON z wynikiem bazowym do porównania")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Dopuszczalny względny spadek przepustowości lub wzrost pamięci (domyślnie 20%%)")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.02,
+                        help="Dopuszczalny spadek dokładności pola (domyślnie 2 punkty procentowe)")
+    parser.add_argument("--output", help="Zapisz wynik w pliku JSON (np. jako nowy wynik bazowy)")
+    parser.add_argument("--json", action="store_true", help="Wypisz wynik w formacie JSON")
+    parser.add_argument("--worker", choices=list(ENGINE_VARIANTS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.tesseract_path:
+        config.TESSERACT_PATH = args.tesseract_path
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.corpus, args.ocr_batch)))
+        return 0
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    unknown = [engine for engine in engines if engine not in ENGINE_VARIANTS]
+    if unknown:
+        parser.error(f"Nieznane silniki: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = args.corpus or work_dir
+        if not os.path.exists(os.path.join(corpus_dir, MANIFEST_NAME)):
+            if not args.json:
+                print(f"Generowanie zbioru {args.documents} raportów...")
+            generate_corpus(corpus_dir, args.documents, args.seed)
+        result = run_benchmark(engines, os.path.abspath(corpus_dir), args.runs, args.ocr_batch, args.tesseract_path)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print(format_result(result))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare_with_baseline(result, baseline, args.tolerance, args.accuracy_tolerance)
+
+    for failure in failures:
+        print(f"REGRESJA: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
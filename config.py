@@ -4,9 +4,28 @@ import os
 import sys
 import platform
 
+# Katalog główny aplikacji
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Nazwa bazy danych
 DB_NAME = "raporty_klejenia.db"
 
+# Ustawienia SQLite - WAL pozwala czytać bazę podczas importu, a przy WAL
+# synchronous=NORMAL synchronizuje dysk tylko przy punktach kontrolnych
+DB_JOURNAL_MODE = "WAL"
+DB_SYNCHRONOUS = "NORMAL"
+DB_BUSY_TIMEOUT = 30.0  # Sekundy oczekiwania na zwolnienie blokady zapisu
+
+# Zapis grupowy raportów (ReportWriter)
+WRITER_MAX_BATCH = 500  # Maksymalna liczba raportów w jednej transakcji
+WRITER_MAX_DELAY = 0.5  # Maksymalny czas (s) oczekiwania na zebranie grupy
+WRITER_QUEUE_SIZE = 10000  # Limit raportów oczekujących na zapis
+
+# Postępowanie z plikiem PDF, którego zawartość (skrót SHA-256) jest już w bazie:
+# 'skip' - pominięcie, 'link' - przypisanie nowej ścieżki raportowi, którego plik zniknął
+# (przeniesiony lub przemianowany)
+DUPLICATE_POLICY = 'skip'
+
 # Konfiguracja ścieżki do Tesseract OCR
 if platform.system() == 'Windows':
     TESSERACT_PATH = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
@@ -17,8 +36,105 @@ elif platform.system() == 'Darwin':  # macOS
 else:
     TESSERACT_PATH = 'tesseract'  # Domyślna wartość
 
+# Silnik OCR: 'auto' (PaddleOCR, jeśli jest zainstalowany, w przeciwnym razie Tesseract),
+# 'paddle' lub 'tesseract' (np. do porównania silników w benchmarks/throughput_benchmark.py)
+OCR_ENGINE = 'auto'
+
 # Parametry OCR
 OCR_CONFIG_DIGITS = r'--oem 1 --psm 6 -c tessedit_char_whitelist=0123456789.'
 
+# Tryb PaddleOCR bez detekcji i klasyfikacji orientacji - ROI z szablonu trafiają
+# bezpośrednio do modelu rozpoznawania, wsadowo dla wszystkich pól (i dokumentów).
+# Domyślnie wyłączony (pełny potok z detekcją); porównanie: warianty paddle i paddle-rec
+# w benchmarks/throughput_benchmark.py
+PADDLE_RECOGNITION_ONLY = False
+
+# Tryb Tesseract z mozaiką - wszystkie ROI strony (lub stron) w jednym obrazie,
+# jedno uruchomienie tesseract zamiast osobnego procesu dla każdego ROI i konfiguracji.
+# Domyślnie wyłączony (rozpoznawanie jak dotąd - konfiguracje OCR_CONFIG_DIGITS według priorytetu);
+# włączać po potwierdzeniu tej samej dokładności w benchmarks/throughput_benchmark.py (tesseract / tesseract-roi)
+TESSERACT_MOSAIC = False
+TESSERACT_MOSAIC_CONFIG = r'--oem 1 --psm 11 -c tessedit_char_whitelist=0123456789.-'
+TESSERACT_MOSAIC_GAP = 40  # Odstęp między obszarami w mozaice (piksele)
+TESSERACT_MOSAIC_MAX_ROIS = 30  # Maksymalna liczba obszarów w jednej mozaice
+
+# Równoległe uruchamianie konfiguracji Tesseract (z przerywaniem zbędnych) i obszarów ROI
+TESSERACT_CONCURRENT_CONFIGS = True
+# Limit jednoczesnych procesów tesseract dla całego importu - w puli procesów dzielony między procesy robocze
+TESSERACT_MAX_WORKERS = max(2, os.cpu_count() or 1)
+ROI_MAX_WORKERS = 3  # Liczba obszarów ROI dokumentu przetwarzanych jednocześnie
+
+# Liczba dokumentów przetwarzanych razem przez proces roboczy importu wsadowego
+BATCH_OCR_DOCUMENTS = 4
+
+# Potok przetwarzania dokumentów (batch_import.py --pipeline): etap -> (rodzaj, liczba wykonawców).
+# Rodzaj 'thread' dla etapów czekających na dysk lub biblioteki zwalniające GIL (PyMuPDF, OpenCV,
+# tesseract), 'process' dla etapów obliczeniowych w Pythonie.
+PIPELINE_QUEUE_SIZE = 8  # Limit dokumentów w kolejce przed każdym etapem
+PIPELINE_STAGES = {
+    'hash': ('thread', 2),
+    'render': ('thread', 2),
+    'preprocess': ('thread', max(1, (os.cpu_count() or 1) - 1)),
+    'ocr': ('thread', 1),
+    'format': ('thread', 1),
+}
+
+# Usługa obserwacji katalogów skanerów (watch_import.py)
+WATCH_BACKEND = 'auto'  # 'auto' (inotify w Linuksie, poza nim odpytywanie), 'inotify' lub 'polling'
+WATCH_POLL_INTERVAL = 2.0  # Odstęp (s) między przeglądami katalogów w trybie odpytywania
+WATCH_STABLE_SECONDS = 2.0  # Czas (s) bez zmiany rozmiaru i daty pliku, po którym uznaje się go za zapisany
+WATCH_INCOMPLETE_TIMEOUT = 60.0  # Po tym czasie (s) plik bez znacznika %%EOF jest mimo to przetwarzany
+WATCH_QUEUE_SIZE = 64  # Limit plików oczekujących na rozpoznawanie
+
+# Rasteryzacja PDF
+PDF_RENDER_DPI = 300  # Rozdzielczość, w której zapisywane są współrzędne ROI szablonu
+PDF_RENDER_BACKEND = 'pymupdf'  # 'pymupdf' lub 'poppler' (pdf2image)
+
+# Wybór szablonu dla dokumentu: odcisk (dHash) strony wyrenderowanej w niskiej rozdzielczości
+TEMPLATE_FINGERPRINT_DPI = 24  # Rozdzielczość renderowania strony do obliczenia odcisku
+TEMPLATE_FINGERPRINT_SIZE = 16  # Bok siatki porównań - odcisk ma 2 * TEMPLATE_FINGERPRINT_SIZE ** 2 bitów
+TEMPLATE_MATCH_MAX_DISTANCE = 32  # Odległość Hamminga (z 512 bitów), powyżej której wybór szablonu jest ostrzeżeniem
+
+# Wyrównanie ROI szablonu do przesunięcia i skosu skanu (korelacja fazowa strony w niskiej rozdzielczości)
+ALIGNMENT_ENABLED = True
+ALIGNMENT_DPI = 50  # Rozdzielczość strony wzorcowej zapisywanej z szablonem i obrazu strony dokumentu
+ALIGNMENT_MARGIN_MM = 60.0  # Margines wokół obszarów ROI porównywany ze stroną wzorcową
+ALIGNMENT_MIN_RESPONSE = 0.2  # Minimalna siła piku korelacji (0-1), przy której wynik jest używany
+ALIGNMENT_MAX_SHIFT_MM = 20.0  # Większe przesunięcie uznawane jest za błędny wynik
+ALIGNMENT_MAX_ANGLE = 3.0  # Większy skos (stopnie) uznawany jest za błędny wynik
+
+# Pamięć podręczna zrasteryzowanych stron (klucz: skrót pliku + DPI + przestrzeń barw)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_DIR = os.path.join(BASE_DIR, "page_cache")
+PAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+
+# Artefakty diagnostyczne (obrazy pośrednie przetwarzania ROI)
+DEBUG_MODE = 'off'  # 'off', 'on_failure' (nieudane lub niepewne rozpoznania) lub 'sampled'
+DEBUG_DIR = os.path.join(BASE_DIR, "debug_images")
+DEBUG_SAMPLE_RATE = 0.01  # Odsetek dokumentów zapisywanych w trybie 'sampled'
+DEBUG_LOW_CONFIDENCE = 0.6  # Próg pewności PaddleOCR dla trybu 'on_failure'
+DEBUG_MAX_PENDING = 32  # Maksymalna liczba paczek oczekujących na zapis
+
+# Komunikaty diagnostyczne przetwarzania (utils/log.py) - poziom można zmienić zmienną środowiskową.
+# Komunikaty poniżej poziomu nie są nawet formatowane.
+LOG_LEVEL = os.environ.get("RAPORTY_LOG_LEVEL", "info")  # 'debug' (każde ROI i wywołanie OCR), 'info', 'warning', 'error' lub 'off'
+
+# Metryki czasu przetwarzania (utils/metrics.py) - plik Prometheus i podsumowanie JSON
+METRICS_LEVEL = 'off'  # 'off', 'basic' (etapy dokumentu i liczniki) lub 'detailed' (także każde ROI i wywołanie OCR)
+METRICS_DIR = os.path.join(BASE_DIR, "metrics")
+METRICS_EXPORT_INTERVAL = 60.0  # Odstęp (s) między zapisami metryk w usłudze watch_import.py
+
+# Profilowanie wybranych dokumentów (utils/profiling.py): cProfile, stosy do wykresu płomieniowego i alokacje.
+# Odsetek dokumentów i katalog można ustawić bez zmiany kodu zmiennymi środowiskowymi.
+PROFILE_SAMPLE_RATE = float(os.environ.get("RAPORTY_PROFILE_RATE", "0"))  # 0 - wyłączone, 1 - każdy dokument
+PROFILE_DIR = os.environ.get("RAPORTY_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_SAMPLE_INTERVAL = 0.005  # Odstęp (s) między próbkami stosów wątków
+PROFILE_TOP_ALLOCATIONS = 25  # Liczba miejsc alokacji w raporcie tracemalloc
+
 # Wymiary i pozycja głównego okna aplikacji
-MAIN_WINDOW_GEOMETRY = (100, 100, 1000, 600)  # x, y, szerokość, wysokość
\ No newline at end of file
+MAIN_WINDOW_GEOMETRY = (100, 100, 1000, 600)  # x, y, szerokość, wysokość
+# Opóźnienie (ms) wyszukiwania po ostatnim naciśnięciu klawisza
+SEARCH_DEBOUNCE_MS = 250
+
+# Liczba raportów pobieranych do tabeli jednym zapytaniem (kolejne strony przy przewijaniu)
+TABLE_PAGE_SIZE = 500
@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+
+import glob
+import os
+import time
+import functools
+import threading
+import contextlib
+import multiprocessing
+import multiprocessing.util
+
+import config
+from database.report_writer import ReportWriter
+from utils.hashing import file_sha256
+from utils.metrics import get_metrics
+from utils.log import LOG_OFF, set_log_level, log_level
+from controllers.tesseract_runner import limit_worker_processes
+
+# Stan procesu roboczego (osobny w każdym procesie puli)
+_worker_db_manager = None
+_worker_pdf_processor = None
+_worker_engines_ready = False
+
+# Statusy przetwarzania pojedynczego pliku
+STATUS_OK = "OK"
+STATUS_DO_WERYFIKACJI = "DO_WERYFIKACJI"
+STATUS_BLAD = "BŁĄD"
+STATUS_DUPLIKAT = "JUŻ_W_BAZIE"
+
+# Postępowanie z plikami już zaimportowanymi (config.DUPLICATE_POLICY)
+DUPLICATE_SKIP = 'skip'
+DUPLICATE_LINK = 'link'
+
+
+def collect_pdf_files(paths, recursive=False):
+    """Zbieranie plików PDF z listy katalogów, wzorców glob i pojedynczych plików."""
+    pdf_files = []
+    seen = set()
+
+    def add(path):
+        full_path = os.path.abspath(path)
+        if full_path not in seen and full_path.lower().endswith('.pdf') and os.path.isfile(full_path):
+            seen.add(full_path)
+            pdf_files.append(full_path)
+
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for root, _, files in os.walk(path):
+                    for name in sorted(files):
+                        add(os.path.join(root, name))
+            else:
+                for name in sorted(os.listdir(path)):
+                    add(os.path.join(path, name))
+        elif glob.has_magic(path):
+            for match in sorted(glob.glob(path, recursive=True)):
+                add(match)
+        else:
+            add(path)
+
+    return pdf_files
+
+
+def _init_worker(db_name, quiet, metrics_level=None, processes=1):
+    """Inicjalizacja procesu roboczego - własne połączenie z bazą i procesor PDF.
+    
+    `processes` to liczba procesów puli - dzielony jest między nie limit
+    jednoczesnych procesów tesseract.
+    """
+    global _worker_db_manager, _worker_pdf_processor
+    
+    limit_worker_processes(processes)
+
+    if metrics_level is not None:
+        # Poziom metryk procesu głównego (np. z opcji wiersza poleceń)
+        get_metrics().set_level(metrics_level)
+
+    if quiet:
+        # Komunikaty diagnostyczne PDFProcessor nie są potrzebne w trybie wsadowym; strumienie
+        # procesu pozostają bez zmian, aby błędy i ślady stosu procesów roboczych były widoczne
+        set_log_level(LOG_OFF)
+
+    # Import lokalny, aby proces główny nie ładował silników OCR
+    from database.db_manager import DatabaseManager
+    from controllers.pdf_processor import PDFProcessor
+
+    _worker_db_manager = DatabaseManager(db_name)
+    _worker_pdf_processor = PDFProcessor(_worker_db_manager)
+
+    # Procesy puli kończą się bez wywołania atexit - zapisujemy zaległe artefakty diagnostyczne
+    multiprocessing.util.Finalize(None, _worker_pdf_processor.debug_sink.flush, exitpriority=10)
+
+
+def _warm_up_worker():
+    """Załadowanie modeli OCR raz na proces - dopiero przed pierwszym plikiem do rozpoznania."""
+    global _worker_engines_ready
+
+    if not _worker_engines_ready:
+        _worker_pdf_processor.warm_up_engines()
+        _worker_engines_ready = True
+
+
+def _file_result(pdf_path, status, file_hash=None, numer_zlecenia=None, numer_operatora=None,
+                 data_raportu=None, elapsed=0.0, error=None, existing=None):
+    """Wynik przetwarzania pojedynczego pliku przekazywany do procesu głównego."""
+    return {
+        'sciezka_pdf': pdf_path,
+        'hash_pdf': file_hash,
+        'numer_zlecenia': numer_zlecenia,
+        'numer_operatora': numer_operatora,
+        'data_raportu': data_raportu,
+        'status': status,
+        'czas': elapsed,
+        'blad': error,
+        # Raport, który już zawiera ten plik (id, sciezka_pdf) - dla STATUS_DUPLIKAT
+        'istniejacy': existing
+    }
+
+
+def _process_files(pdf_paths):
+    """Przetworzenie grupy plików PDF w procesie roboczym.
+
+    Zwraca wyniki plików oraz metryki zebrane w procesie od poprzedniej
+    grupy (do scalenia w procesie głównym; None, gdy metryki są wyłączone).
+    """
+    results = _recognize_files(pdf_paths)
+    metrics = get_metrics()
+    return results, metrics.snapshot(reset=True) if metrics.enabled() else None
+
+
+def _recognize_files(pdf_paths):
+    """Rozpoznanie grupy plików PDF (jedno wsadowe wywołanie OCR).
+
+    Przed renderowaniem każdy plik jest identyfikowany skrótem zawartości -
+    pliki już zapisane w bazie (także pod inną nazwą lub w innym katalogu)
+    nie są rasteryzowane ani rozpoznawane.
+    """
+    results = []
+    new_paths = []
+    new_hashes = []
+
+    for pdf_path in pdf_paths:
+        start = time.perf_counter()
+        try:
+            file_hash = file_sha256(pdf_path)
+            existing = _worker_db_manager.find_report_by_hash(file_hash)
+        except Exception as e:
+            results.append(_file_result(pdf_path, STATUS_BLAD, elapsed=time.perf_counter() - start, error=str(e)))
+            continue
+
+        if file_hash in new_hashes:
+            # Kopia pliku z tej samej grupy - rozpoznawana tylko raz
+            results.append(_file_result(pdf_path, STATUS_DUPLIKAT, file_hash, elapsed=time.perf_counter() - start,
+                                        existing=(None, new_paths[new_hashes.index(file_hash)])))
+        elif existing:
+            results.append(_file_result(pdf_path, STATUS_DUPLIKAT, file_hash, *existing[1:4],
+                                        elapsed=time.perf_counter() - start,
+                                        existing=(existing[0], existing[4])))
+        else:
+            new_paths.append(pdf_path)
+            new_hashes.append(file_hash)
+
+    if not new_paths:
+        return results
+
+    start = time.perf_counter()
+    try:
+        _warm_up_worker()
+        extracted = _worker_pdf_processor.extract_data_from_pdfs_with_template(
+            new_paths, render_full_page=False, file_hashes=new_hashes)
+        error = None
+    except Exception as e:
+        extracted = [(None, None, None, None)] * len(new_paths)
+        error = str(e)
+
+    # Czas grupy rozkładany równo na pliki
+    elapsed = (time.perf_counter() - start) / len(new_paths)
+
+    for pdf_path, file_hash, (numer_zlecenia, numer_operatora, data_raportu, debug_info) in zip(
+            new_paths, new_hashes, extracted):
+        if error is not None:
+            status = STATUS_BLAD
+        elif not debug_info or numer_zlecenia in ["BŁĄD", "NIEZNANY"]:
+            status = STATUS_DO_WERYFIKACJI
+        else:
+            status = STATUS_OK
+
+        results.append(_file_result(pdf_path, status, file_hash, numer_zlecenia, numer_operatora,
+                                    data_raportu, elapsed, error))
+    return results
+
+
+def _document_pipeline_stages(pdf_processor, templates, db_name, stage_settings, ocr_batch):
+    """Etapy potoku importu: skrót pliku -> renderowanie ROI -> przetwarzanie wstępne -> OCR -> formatowanie.
+
+    Elementem potoku jest słownik dokumentu (jak w PDFProcessor._prepare_document);
+    pliki już zaimportowane przechodzą przez kolejne etapy bez przetwarzania.
+    Wynikiem ostatniego etapu jest słownik jak z _recognize_files. Zapis do bazy
+    wykonuje ReportWriter (własny wątek i ograniczona kolejka).
+    """
+    from controllers.pdf_processor import preprocess_document
+    from controllers.pipeline import Stage, STAGE_PROCESS
+    from database.db_manager import DatabaseManager
+
+    unknown = set(stage_settings) - {'hash', 'render', 'preprocess', 'ocr', 'format'}
+    if unknown:
+        raise ValueError(f"Nieznane etapy potoku: {', '.join(sorted(unknown))}")
+    for name, (kind, _) in stage_settings.items():
+        # Pozostałe etapy korzystają ze wspólnego PDFProcessor i muszą działać w wątkach
+        if kind == STAGE_PROCESS and name != 'preprocess':
+            raise ValueError(f"Etap {name} może działać tylko w wątkach")
+
+    # Każdy wątek etapu 'hash' ma własne połączenie z bazą (zamykane wraz z wątkiem)
+    local = threading.local()
+
+    def open_database():
+        local.db_manager = DatabaseManager(db_name)
+
+    def hash_file(pdf_path):
+        file_hash = file_sha256(pdf_path)
+        return {
+            'pdf_path': pdf_path,
+            'file_hash': file_hash,
+            'existing': local.db_manager.find_report_by_hash(file_hash),
+            'started': time.perf_counter(),
+            'roi_images': {},
+        }
+
+    def render(job):
+        if job['existing']:
+            return job
+        template = pdf_processor.select_template(job['pdf_path'], templates)
+        document = pdf_processor._prepare_document(job['pdf_path'], template, False, job['file_hash'])
+        document.update(file_hash=job['file_hash'], existing=None, started=job['started'])
+        return document
+
+    def recognize(documents):
+        pdf_processor._recognize_documents([
+            document for document in documents
+            if not document['existing'] and document['result'] is None
+        ])
+        return documents
+
+    def finish(document):
+        elapsed = time.perf_counter() - document['started']
+        existing = document['existing']
+        if existing:
+            return _file_result(document['pdf_path'], STATUS_DUPLIKAT, document['file_hash'], *existing[1:4],
+                                elapsed=elapsed, existing=(existing[0], existing[4]))
+
+        result = pdf_processor._finish_document(document)
+        failed = result[3] is None or any(value in pdf_processor.FAILED_VALUES for value in result[:3])
+        pdf_processor.debug_sink.finish_document(document['debug'], failed=failed)
+
+        numer_zlecenia, numer_operatora, data_raportu, debug_info = result
+        if not debug_info or numer_zlecenia in ["BŁĄD", "NIEZNANY"]:
+            status = STATUS_DO_WERYFIKACJI
+        else:
+            status = STATUS_OK
+        return _file_result(document['pdf_path'], status, document['file_hash'],
+                            numer_zlecenia, numer_operatora, data_raportu, elapsed)
+
+    def stage(name, function, **options):
+        kind, workers = stage_settings.get(name, config.PIPELINE_STAGES[name])
+        return Stage(name, function, workers=workers, kind=kind, **options)
+
+    return [
+        stage('hash', hash_file, initializer=open_database),
+        stage('render', render),
+        # Funkcja modułu (nie domknięcie) - etap może działać także w procesach
+        stage('preprocess', functools.partial(preprocess_document, for_paddle=pdf_processor.uses_paddle())),
+        # Dokumenty zebrane w kolejce rozpoznawane są razem (wsadowy PaddleOCR, mozaika Tesseract)
+        stage('ocr', recognize, batch_size=ocr_batch),
+        stage('format', finish),
+    ]
+
+
+class BatchImporter:
+    """Wsadowy import raportów PDF z użyciem puli procesów."""
+    def __init__(self, db_manager, db_name=config.DB_NAME, workers=None,
+                 save_uncertain=False, quiet=True, ocr_batch=config.BATCH_OCR_DOCUMENTS,
+                 duplicates=config.DUPLICATE_POLICY, pipeline_stages=None):
+        if duplicates not in (DUPLICATE_SKIP, DUPLICATE_LINK):
+            raise ValueError(f"Nieznany sposób obsługi duplikatów: {duplicates}")
+        self.db_manager = db_manager
+        self.db_name = db_name
+        self.workers = workers or os.cpu_count() or 1
+        self.ocr_batch = max(1, ocr_batch)
+        self.save_uncertain = save_uncertain
+        self.quiet = quiet
+        self.duplicates = duplicates
+        # Ustawienia etapów (jak config.PIPELINE_STAGES) - import potokiem w bieżącym procesie
+        # zamiast puli procesów; None - pula procesów
+        self.pipeline_stages = pipeline_stages
+
+    def run(self, pdf_files, report=print):
+        """Import listy plików PDF. Zwraca słownik z podsumowaniem."""
+        summary = {
+            'plikow': len(pdf_files),
+            'zapisanych': 0,
+            'do_weryfikacji': [],
+            'juz_w_bazie': [],
+            'powiazanych': 0,
+            'bledow': [],
+            'czas': 0.0,
+            'plikow_na_sekunde': 0.0
+        }
+
+        if not pdf_files:
+            return summary
+
+        # Przed uruchomieniem puli sprawdzamy, czy jest szablon
+        if not self.db_manager.get_template():
+            raise RuntimeError("Brak szablonu rozpoznawania - utwórz szablon w aplikacji przed importem wsadowym.")
+
+        start = time.perf_counter()
+        total = len(pdf_files)
+        done = 0
+
+        # Wyniki zapisywane grupowymi transakcjami zamiast jednej transakcji na raport
+        pending = []
+        # Skróty plików przekazanych do zapisu w tym imporcie - kopie tego samego pliku
+        # w przetwarzanym katalogu nie są jeszcze widoczne w bazie
+        submitted = {}
+        # Potok działa w tym procesie - w trybie cichym wyłączany jest logger przetwarzania
+        # (jak w procesach roboczych puli), a linie statusu i komunikaty innych wątków pozostają
+        quiet = log_level(LOG_OFF) if self.quiet and self.pipeline_stages is not None else contextlib.nullcontext()
+
+        with quiet, ReportWriter(self.db_name) as writer:
+            if self.pipeline_stages is not None:
+                results = self._pipeline_results(pdf_files, report)
+            else:
+                results = self._pool_results(pdf_files)
+            for result in results:
+                done += 1
+                self._handle_result(result, summary, writer, pending, submitted)
+                report(self._format_status(done, total, result))
+
+        # Po zamknięciu ReportWriter wszystkie grupy są zatwierdzone
+        for pdf_path, file_hash, future in pending:
+            if future.exception() is None and future.result():
+                summary['zapisanych'] += 1
+                continue
+
+            # Raport niezapisany - plik nie może jednocześnie czekać na weryfikację
+            if pdf_path in summary['do_weryfikacji']:
+                summary['do_weryfikacji'].remove(pdf_path)
+            if future.exception() is not None:
+                summary['bledow'].append(pdf_path)
+            else:
+                # Ten sam plik zapisał w międzyczasie inny import (np. usługa obserwująca katalog)
+                summary['juz_w_bazie'].append(pdf_path)
+                existing = self.db_manager.find_report_by_hash(file_hash)
+                sciezka_pdf = existing[4] if existing else "?"
+                report(f"{STATUS_DUPLIKAT}: {pdf_path} = {sciezka_pdf} (zapisany równolegle przez inny import)")
+
+        summary['czas'] = time.perf_counter() - start
+        if summary['czas'] > 0:
+            summary['plikow_na_sekunde'] = total / summary['czas']
+        return summary
+
+    def _pool_results(self, pdf_files):
+        """Wyniki plików przetwarzanych w puli procesów (w kolejności ukończenia)."""
+        # Grupy dokumentów przetwarzane jednym wsadowym wywołaniem OCR w procesie roboczym
+        chunks = [pdf_files[i:i + self.ocr_batch] for i in range(0, len(pdf_files), self.ocr_batch)]
+
+        metrics = get_metrics()
+        processes = min(self.workers, len(chunks))
+        with multiprocessing.Pool(
+            processes=processes,
+            initializer=_init_worker,
+            initargs=(self.db_name, self.quiet, metrics.level, processes)
+        ) as pool:
+            for results, worker_metrics in pool.imap_unordered(_process_files, chunks):
+                metrics.merge(worker_metrics)
+                yield from results
+
+            # Zwykłe zamknięcie puli (zamiast terminate) pozwala procesom dokończyć zapisy w tle
+            pool.close()
+            pool.join()
+
+    def _pipeline_results(self, pdf_files, report):
+        """Wyniki plików przetwarzanych potokiem etapów w bieżącym procesie (w kolejności ukończenia)."""
+        from controllers.pdf_processor import PDFProcessor
+        from controllers.pipeline import Pipeline, format_pipeline_stats
+
+        # Rozpoznawanie w wątkach tego procesu - cały limit procesów tesseract, po jednym wątku OpenMP
+        limit_worker_processes(1)
+        pdf_processor = PDFProcessor(self.db_manager)
+        pdf_processor.warm_up_engines()
+        stages = _document_pipeline_stages(pdf_processor, self.db_manager.get_templates(), self.db_name,
+                                           self.pipeline_stages, self.ocr_batch)
+        pipeline = Pipeline(stages)
+
+        for result in pipeline.run(pdf_files):
+            if result.error is not None:
+                yield _file_result(result.item, STATUS_BLAD, error=str(result.error))
+            else:
+                yield result.value
+        pdf_processor.debug_sink.flush()
+        report(format_pipeline_stats(pipeline.stats(), pipeline.queue_size))
+
+    def _handle_result(self, result, summary, writer, pending, submitted):
+        """Przekazanie wyniku do zapisu w bazie (w procesie głównym) i aktualizacja podsumowania."""
+        status = result['status']
+
+        if status == STATUS_BLAD:
+            summary['bledow'].append(result['sciezka_pdf'])
+            return
+
+        if status != STATUS_DUPLIKAT and result['hash_pdf'] in submitted:
+            # Kopia pliku przetworzonego wcześniej w tym samym imporcie
+            result['status'] = status = STATUS_DUPLIKAT
+            result['istniejacy'] = (None, submitted[result['hash_pdf']])
+
+        if status == STATUS_DUPLIKAT:
+            summary['juz_w_bazie'].append(result['sciezka_pdf'])
+            report_id, sciezka_pdf = result['istniejacy']
+            # Powiązanie tylko z raportem, którego plik zniknął (przeniesiony lub przemianowany) -
+            # istniejąca kopia pozostaje przy dotychczasowej ścieżce
+            if self.duplicates == DUPLICATE_LINK and report_id is not None and not os.path.exists(sciezka_pdf):
+                self.db_manager.link_report_path(report_id, result['sciezka_pdf'])
+                summary['powiazanych'] += 1
+            return
+
+        if status == STATUS_DO_WERYFIKACJI:
+            summary['do_weryfikacji'].append(result['sciezka_pdf'])
+            if not self.save_uncertain:
+                return
+
+        future = writer.submit(
+            result['numer_zlecenia'],
+            result['numer_operatora'],
+            result['data_raportu'],
+            result['sciezka_pdf'],
+            result['hash_pdf']
+        )
+        submitted[result['hash_pdf']] = result['sciezka_pdf']
+        pending.append((result['sciezka_pdf'], result['hash_pdf'], future))
+
+    def _format_status(self, done, total, result):
+        """Formatowanie linii statusu dla pojedynczego pliku."""
+        line = f"[{done}/{total}] {result['status']:<14} {result['czas']:6.2f}s  {result['sciezka_pdf']}"
+        if result['status'] == STATUS_BLAD:
+            line += f"  ({result['blad']})"
+        elif result['status'] == STATUS_DUPLIKAT:
+            report_id, sciezka_pdf = result['istniejacy']
+            line += f"  = raport {report_id} ({sciezka_pdf})" if report_id is not None else f"  = {sciezka_pdf}"
+        elif result['numer_zlecenia']:
+            line += f"  -> {result['numer_zlecenia']} / {result['numer_operatora']} / {result['data_raportu']}"
+        return line
+
+
+def format_summary(summary):
+    """Formatowanie podsumowania importu wsadowego."""
+    lines = [
+        "",
+        "Podsumowanie importu:",
+        f"  Plików:              {summary['plikow']}",
+        f"  Zapisanych raportów: {summary['zapisanych']}",
+        f"  Do weryfikacji:      {len(summary['do_weryfikacji'])}",
+        f"  Już w bazie:         {len(summary['juz_w_bazie'])}",
+        f"  Powiązanych ścieżek: {summary['powiazanych']}",
+        f"  Błędów:              {len(summary['bledow'])}",
+        f"  Czas:                {summary['czas']:.2f}s",
+        f"  Przepustowość:       {summary['plikow_na_sekunde']:.2f} plików/s",
+    ]
+
+    if summary['do_weryfikacji']:
+        lines.append("")
+        lines.append("Pliki wymagające ręcznej weryfikacji:")
+        lines.extend(f"  {path}" for path in summary['do_weryfikacji'])
+
+    if summary['bledow']:
+        lines.append("")
+        lines.append("Pliki, których nie udało się przetworzyć:")
+        lines.extend(f"  {path}" for path in summary['bledow'])
+
+    return "\n".join(lines)
+
+
+__all__ = ['BatchImporter', 'collect_pdf_files', 'format_summary']
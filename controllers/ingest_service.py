@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import queue
+import threading
+import multiprocessing
+
+import config
+from database.report_writer import ReportWriter
+from controllers.batch_importer import (_init_worker, _process_files, STATUS_DO_WERYFIKACJI, STATUS_BLAD,
+                                        STATUS_DUPLIKAT, DUPLICATE_SKIP, DUPLICATE_LINK)
+from utils.folder_watcher import FolderWatcher
+from utils.metrics import get_metrics
+
+
+class IngestService:
+    """Usługa importująca raporty PDF pojawiające się w obserwowanych katalogach.
+
+    Wątek obserwatora przekazuje w pełni zapisane pliki do ograniczonej
+    kolejki, z której pętla główna wysyła grupy plików do puli procesów
+    rozpoznających (tych samych co w imporcie wsadowym), a wyniki zapisuje
+    ReportWriter. Jednocześnie rozpoznawanych jest najwyżej `workers` grup.
+    Gdy OCR nie nadąża, kolejka się zapełnia i obserwator czeka - nowe pliki
+    pozostają w katalogach, zamiast gromadzić się w pamięci. Przy włączonych
+    metrykach są one co config.METRICS_EXPORT_INTERVAL sekund zapisywane
+    w katalogu `metrics_dir`.
+    """
+    def __init__(self, db_manager, directories, db_name=config.DB_NAME, recursive=False, workers=None,
+                 ocr_batch=config.BATCH_OCR_DOCUMENTS, queue_size=config.WATCH_QUEUE_SIZE,
+                 save_uncertain=False, duplicates=config.DUPLICATE_POLICY, quiet=True,
+                 watcher_options=None, metrics_dir=config.METRICS_DIR, report=print):
+        if duplicates not in (DUPLICATE_SKIP, DUPLICATE_LINK):
+            raise ValueError(f"Nieznany sposób obsługi duplikatów: {duplicates}")
+        self.db_manager = db_manager
+        self.directories = directories
+        self.db_name = db_name
+        self.recursive = recursive
+        self.workers = workers or os.cpu_count() or 1
+        self.ocr_batch = max(1, ocr_batch)
+        self.save_uncertain = save_uncertain
+        self.duplicates = duplicates
+        self.quiet = quiet
+        self.watcher_options = watcher_options or {}
+        self.metrics = get_metrics()
+        self.metrics_dir = metrics_dir
+        self.report = report
+        self.stats = {'plikow': 0, 'zapisanych': 0, 'do_weryfikacji': 0, 'juz_w_bazie': 0, 'bledow': 0}
+        self._stats_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._results = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._stop = threading.Event()
+        # Skróty plików przekazanych do zapisu, ale jeszcze niezatwierdzonych
+        self._submitted = {}
+
+    def _count(self, key):
+        """Zwiększenie licznika statystyk (także z wątku ReportWriter)."""
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def stop(self):
+        """Zakończenie pracy (np. z obsługi sygnału) - pliki w trakcie rozpoznawania zostaną zapisane."""
+        self._stop.set()
+
+    def run(self):
+        """Praca do wywołania stop(). Zwraca statystyki usługi."""
+        if not self.db_manager.get_template():
+            raise RuntimeError("Brak szablonu rozpoznawania - utwórz szablon w aplikacji przed uruchomieniem usługi.")
+
+        watcher = FolderWatcher(self.directories, recursive=self.recursive, **self.watcher_options)
+        self.report(f"Obserwowane katalogi ({watcher.backend}): {', '.join(watcher.directories)}")
+
+        watcher_thread = threading.Thread(target=self._watch_loop, args=(watcher,), name="folder-watcher", daemon=True)
+        with ReportWriter(self.db_name) as writer, multiprocessing.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(self.db_name, self.quiet, self.metrics.level, self.workers)
+        ) as pool:
+            watcher_thread.start()
+            next_export = time.monotonic() + config.METRICS_EXPORT_INTERVAL
+            try:
+                while not self._stop.is_set():
+                    self._drain_results(writer)
+                    self._dispatch(pool)
+                    if self.metrics.enabled() and time.monotonic() >= next_export:
+                        self._export_metrics()
+                        next_export = time.monotonic() + config.METRICS_EXPORT_INTERVAL
+            finally:
+                self._stop.set()
+                watcher_thread.join()
+                watcher.close()
+
+                # Dokończenie grup już wysłanych do procesów roboczych
+                pool.close()
+                pool.join()
+                self._drain_results(writer)
+
+        if self.metrics.enabled():
+            self._export_metrics()
+        return self.stats
+
+    def _export_metrics(self):
+        """Zapis metryk (plik Prometheus i podsumowanie JSON) - błąd zapisu nie przerywa pracy usługi."""
+        try:
+            self.metrics.export(self.metrics_dir)
+        except OSError as e:
+            self.report(f"Nie udało się zapisać metryk w {self.metrics_dir}: {e}")
+
+    def _watch_loop(self, watcher):
+        """Wątek obserwatora - przekazywanie gotowych plików do kolejki (czeka, gdy jest pełna)."""
+        try:
+            while not self._stop.is_set():
+                for path in watcher.poll(timeout=0.5):
+                    while not self._stop.is_set():
+                        try:
+                            self._queue.put(path, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+        except Exception as e:
+            self.report(f"Błąd obserwacji katalogów: {e}")
+            self._stop.set()
+
+    def _next_chunk(self):
+        """Grupa do `ocr_batch` plików z kolejki (pusta, gdy w ciągu chwili nic nie przyszło)."""
+        try:
+            chunk = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        while len(chunk) < self.ocr_batch:
+            try:
+                chunk.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return chunk
+
+    def _dispatch(self, pool):
+        """Wysłanie kolejnej grupy plików do puli, jeśli któryś proces jest wolny."""
+        if not self._slots.acquire(timeout=0.2):
+            return
+        chunk = self._next_chunk()
+        if not chunk:
+            self._slots.release()
+            return
+
+        def finished(output):
+            results, worker_metrics = output
+            self.metrics.merge(worker_metrics)
+            self._results.put(results)
+            self._slots.release()
+
+        def failed(error):
+            self._results.put([{'sciezka_pdf': path, 'status': STATUS_BLAD, 'blad': str(error)} for path in chunk])
+            self._slots.release()
+
+        pool.apply_async(_process_files, (chunk,), callback=finished, error_callback=failed)
+
+    def _drain_results(self, writer):
+        """Obsługa wyników zwróconych przez procesy robocze (w wątku głównym usługi)."""
+        while True:
+            try:
+                results = self._results.get_nowait()
+            except queue.Empty:
+                return
+            for result in results:
+                self._handle_result(result, writer)
+
+    def _handle_result(self, result, writer):
+        """Zapis rozpoznanego raportu lub powiązanie duplikatu."""
+        path = result['sciezka_pdf']
+        status = result['status']
+        self._count('plikow')
+
+        if status == STATUS_BLAD:
+            self._count('bledow')
+            self.report(f"{STATUS_BLAD}: {path} ({result['blad']})")
+            return
+
+        if status != STATUS_DUPLIKAT and result['hash_pdf'] in self._submitted:
+            result['status'] = status = STATUS_DUPLIKAT
+            result['istniejacy'] = (None, self._submitted[result['hash_pdf']])
+
+        if status == STATUS_DUPLIKAT:
+            self._count('juz_w_bazie')
+            report_id, sciezka_pdf = result['istniejacy']
+            if self.duplicates == DUPLICATE_LINK and report_id is not None and not os.path.exists(sciezka_pdf):
+                self.db_manager.link_report_path(report_id, path)
+                self.report(f"{STATUS_DUPLIKAT}: {path} - powiązano z raportem {report_id}")
+            else:
+                self.report(f"{STATUS_DUPLIKAT}: {path} = {sciezka_pdf}")
+            return
+
+        if status == STATUS_DO_WERYFIKACJI:
+            self._count('do_weryfikacji')
+            if not self.save_uncertain:
+                self.report(f"{STATUS_DO_WERYFIKACJI}: {path} - pominięto (wymaga ręcznego importu)")
+                return
+
+        file_hash = result['hash_pdf']
+        received = time.monotonic()
+        future = writer.submit(result['numer_zlecenia'], result['numer_operatora'], result['data_raportu'],
+                               path, file_hash)
+        self._submitted[file_hash] = path
+
+        def saved(future):
+            # Wywoływane w wątku ReportWriter po zatwierdzeniu grupy
+            self._submitted.pop(file_hash, None)
+            if future.exception() is not None:
+                self._count('bledow')
+                self.report(f"{STATUS_BLAD}: {path} - zapis nieudany ({future.exception()})")
+                return
+            if not future.result():
+                # Ten sam plik zapisał w międzyczasie inny import (np. batch_import)
+                self._count('juz_w_bazie')
+                self.report(f"{STATUS_DUPLIKAT}: {path} - zapisany równolegle przez inny import")
+                return
+            self._count('zapisanych')
+            self.report(f"{status}: {path} -> "
+                        f"{result['numer_zlecenia']} / {result['numer_operatora']} / {result['data_raportu']} "
+                        f"(zapis {time.monotonic() - received:.2f}s)")
+
+        future.add_done_callback(saved)
+
+
+__all__ = ['IngestService']
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import threading
+from contextlib import contextmanager
+
+import config
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Nazwy silników OCR w rejestrze
+ENGINE_PADDLE = 'paddle'
+ENGINE_TESSERACT = 'tesseract'
+
+
+def _create_paddle_ocr():
+    """Utworzenie instancji PaddleOCR (ładowanie modeli detekcji, klasyfikacji i rozpoznawania)."""
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(
+        use_angle_cls=True,  # Automatyczna korekcja orientacji
+        lang='en',           # Model dla języka angielskiego (najlepszy dla cyfr)
+        rec_algorithm='SVTR_LCNet',  # Algorytm rozpoznawania (dobry dla pisma odręcznego)
+        use_gpu=False,       # Zmień na True, jeśli masz GPU
+        show_log=False       # Wyłączenie logowania
+    )
+
+
+def _create_tesseract():
+    """Konfiguracja pytesseract (ścieżka do programu tesseract)."""
+    import pytesseract
+
+    pytesseract.pytesseract.tesseract_cmd = config.TESSERACT_PATH
+    return pytesseract
+
+
+class OCREngineRegistry:
+    """Rejestr silników OCR współdzielonych w obrębie procesu.
+
+    Każdy silnik jest tworzony raz, przy pierwszym rzeczywistym użyciu
+    (albo jawnie przez warm_up) i współdzielony przez wszystkie instancje
+    PDFProcessor oraz wątki. Nieudana inicjalizacja jest zapamiętywana, aby
+    nie próbować ładować modeli przy każdym dokumencie.
+    """
+    def __init__(self):
+        self._factories = {}
+        self._engines = {}
+        self._failed = set()
+        self._load_locks = {}
+        self._use_locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        """Rejestracja fabryki silnika OCR pod podaną nazwą."""
+        with self._lock:
+            self._factories[name] = factory
+            self._load_locks.setdefault(name, threading.Lock())
+            self._use_locks.setdefault(name, threading.RLock())
+
+    def get(self, name):
+        """Pobranie silnika (ładowanego przy pierwszym wywołaniu). Zwraca None, jeśli jest niedostępny."""
+        engine = self._engines.get(name)
+        if engine is not None or name in self._failed:
+            return engine
+
+        load_lock = self._load_locks.get(name)
+        if load_lock is None:
+            return None
+
+        with load_lock:
+            # Inny wątek mógł załadować silnik, gdy czekaliśmy na blokadę
+            if name in self._engines or name in self._failed:
+                return self._engines.get(name)
+
+            try:
+                engine = self._factories[name]()
+                log.info("Silnik OCR '%s' został zainicjalizowany pomyślnie.", name)
+            except Exception as e:
+                log.error("Błąd podczas inicjalizacji silnika OCR '%s': %s", name, e)
+                self._failed.add(name)
+                return None
+
+            self._engines[name] = engine
+            return engine
+
+    @contextmanager
+    def use(self, name):
+        """Użycie silnika na wyłączność - modele OCR nie są bezpieczne przy wywołaniach z wielu wątków."""
+        engine = self.get(name)
+        if engine is None:
+            yield None
+            return
+        with self._use_locks[name]:
+            yield engine
+
+    def is_loaded(self, name):
+        """Sprawdzenie, czy silnik jest już załadowany."""
+        return name in self._engines
+
+    def warm_up(self, *names):
+        """Jawne załadowanie silników (domyślnie wszystkich zarejestrowanych)."""
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def release(self, *names):
+        """Zwolnienie silników (domyślnie wszystkich) - zostaną ponownie załadowane przy następnym użyciu."""
+        with self._lock:
+            for name in names or list(self._engines):
+                self._engines.pop(name, None)
+                self._failed.discard(name)
+        gc.collect()
+
+
+_registry = OCREngineRegistry()
+_registry.register(ENGINE_PADDLE, _create_paddle_ocr)
+_registry.register(ENGINE_TESSERACT, _create_tesseract)
+
+
+def get_engine_registry():
+    """Wspólny dla całego procesu rejestr silników OCR."""
+    return _registry
+
+
+__all__ = ['OCREngineRegistry', 'get_engine_registry', 'ENGINE_PADDLE', 'ENGINE_TESSERACT']
@@ -1,194 +1,459 @@
 import io
 import re
+import math
 import os
+import time
+import functools
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import numpy as np
-import cv2
-from PIL import Image
-import pytesseract
 import config
-from PyQt5.QtWidgets import QDialog, QMessageBox
-from PyQt5.QtCore import QByteArray
-from pdf2image import convert_from_path
+from utils.pdf_renderer import PDFRenderer
+from utils.page_cache import PageCache
+from utils.hashing import file_sha256
+from utils.debug_sink import get_debug_sink
+from utils.log import get_logger
+from utils.metrics import get_metrics, METRICS_DETAILED
+from utils.profiling import get_profiler
+from utils.fingerprint import page_fingerprint, fingerprint_to_text, nearest_fingerprint
+from utils.alignment import encode_reference, decode_reference, fit_to_reference, estimate_alignment
+from controllers.ocr_engines import get_engine_registry, ENGINE_PADDLE, ENGINE_TESSERACT
 
-# Sprawdzenie, czy PaddleOCR jest dostępny
-PADDLE_AVAILABLE = False
-try:
-    from paddleocr import PaddleOCR
-    PADDLE_AVAILABLE = True
-    print("PaddleOCR został pomyślnie zaimportowany i jest dostępny.")
-except ImportError:
-    print("PaddleOCR nie jest dostępny. Używany będzie Tesseract OCR.")
+# Sprawdzenie, czy PaddleOCR jest zainstalowany - bez importowania go.
+# Ciężkie biblioteki (paddle, cv2, numpy) ładowane są dopiero w ścieżkach OCR,
+# aby okno aplikacji pojawiało się bez czekania na nie.
+PADDLE_AVAILABLE = importlib.util.find_spec("paddleocr") is not None
 
+# Komunikaty diagnostyczne (poziom z config.LOG_LEVEL) - przy wyłączonym poziomie nie są formatowane
+log = get_logger(__name__)
 
-class PDFProcessor:
-    def __init__(self, db_manager):
-        """Inicjalizacja procesora PDF."""
-        self.db_manager = db_manager
+# Strony wzorcowe szablonów do wyrównania (dekodowane raz na szablon)
+_decoded_reference = functools.lru_cache(maxsize=16)(decode_reference)
+
+# Pula wątków do równoległego przetwarzania obszarów ROI dokumentu
+_roi_executor = None
+_roi_executor_lock = threading.Lock()
+
+
+def _get_roi_executor():
+    """Wspólna pula wątków dla równoległego rozpoznawania obszarów ROI."""
+    global _roi_executor
+    with _roi_executor_lock:
+        if _roi_executor is None:
+            _roi_executor = ThreadPoolExecutor(max_workers=config.ROI_MAX_WORKERS, thread_name_prefix="roi")
+        return _roi_executor
+
+
+def preprocess_roi_image(image, roi_name="unknown", for_paddle=False, debug=None):
+    """Zaawansowane przetwarzanie obrazu ROI dla lepszego rozpoznawania pisma odręcznego.
+    
+    Funkcja modułu (a nie metoda PDFProcessor), aby etap przetwarzania
+    wstępnego mógł działać także w osobnych procesach potoku.
+    """
+    with get_metrics().span("czas_przetwarzania_roi_sekundy", METRICS_DETAILED, roi=roi_name):
+        return _preprocess_roi_image(image, roi_name, for_paddle, debug)
+
+
+def _preprocess_roi_image(image, roi_name, for_paddle, debug):
+    """Przetworzenie obrazu ROI (bez pomiaru czasu) - zob. preprocess_roi_image."""
+    import numpy as np
+    import cv2
+    from PIL import Image
+    
+    try:
+        # Dodanie oryginalnego obrazu ROI do paczki diagnostycznej
+        if debug is not None:
+            debug.add(f"roi_{roi_name}_original", image)
         
-        # Konfiguracja ścieżki do Tesseract OCR
-        pytesseract.pytesseract.tesseract_cmd = config.TESSERACT_PATH
+        # Konwersja PIL Image do tablicy numpy
+        np_image = np.array(image)
         
-        # Inicjalizacja PaddleOCR, tylko jeśli jest dostępny
-        self.paddle_ocr = None
-        if PADDLE_AVAILABLE:
-            try:
-                self.paddle_ocr = PaddleOCR(
-                    use_angle_cls=True,  # Automatyczna korekcja orientacji
-                    lang='en',           # Model dla języka angielskiego (najlepszy dla cyfr)
-                    rec_algorithm='SVTR_LCNet',  # Algorytm rozpoznawania (dobry dla pisma odręcznego)
-                    use_gpu=False,       # Zmień na True, jeśli masz GPU
-                    show_log=False       # Wyłączenie logowania
-                )
-                print("PaddleOCR został zainicjalizowany pomyślnie.")
-            except Exception as e:
-                print(f"Błąd podczas inicjalizacji PaddleOCR: {e}")
-                print("Będzie używany Tesseract OCR.")
+        # Konwersja do skali szarości
+        if len(np_image.shape) == 3:
+            gray = cv2.cvtColor(np_image, cv2.COLOR_RGB2GRAY)
+        else:
+            gray = np_image
         
-        # Tworzymy katalog na obrazy diagnostyczne, jeśli nie istnieje
-        self.debug_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "debug_images")
-        os.makedirs(self.debug_dir, exist_ok=True)
-        print(f"Katalog debugowania: {self.debug_dir}")
+        if debug is not None:
+            debug.add(f"roi_{roi_name}_gray", gray)
         
-    def pdf_to_pil_image(self, pdf_path):
-        """Konwersja pierwszej strony PDF do obrazu PIL używając popplera."""
-        try:
-            # Konwersja PDF do obrazu używając pdf2image (poppler)
-            images = convert_from_path(pdf_path, dpi=300)  # Wysoka rozdzielczość
-            
-            if not images:
-                print("PDF nie zawiera stron")
-                return None
-            
-            # Pobieranie pierwszej strony
-            first_page = images[0]
+        # Przetwarzanie dla PaddleOCR
+        if for_paddle:
+            # Wyrównanie histogramu dla zwiększenia kontrastu
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            enhanced = clahe.apply(gray)
             
-            # Zapisanie obrazu do debugowania
-            debug_path = os.path.join(self.debug_dir, "original_pdf.png")
-            first_page.save(debug_path)
-            print(f"Zapisano oryginalny obraz do: {debug_path}")
+            # Usunięcie szumu
+            denoised = cv2.fastNlMeansDenoising(enhanced, None, 10, 7, 21)
             
-            return first_page
-            
-        except Exception as e:
-            print(f"Błąd podczas konwersji PDF do obrazu: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-    
-    def preprocess_image_for_handwriting(self, image, roi_name="unknown"):
-        """Zaawansowane przetwarzanie obrazu dla lepszego rozpoznawania pisma odręcznego."""
-        try:
-            # Zapisanie oryginalnego obrazu ROI do debugowania
-            debug_path = os.path.join(self.debug_dir, f"roi_{roi_name}_original.png")
-            image.save(debug_path)
-            print(f"Zapisano oryginalny ROI do: {debug_path}")
+            # Wzmocnienie krawędzi
+            kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
+            sharpened = cv2.filter2D(denoised, -1, kernel)
             
-            # Konwersja PIL Image do tablicy numpy
-            np_image = np.array(image)
+            # Powiększenie obrazu (może poprawić rozpoznawanie)
+            height, width = sharpened.shape
+            scaled = cv2.resize(sharpened, (width*2, height*2), interpolation=cv2.INTER_CUBIC)
             
-            # Konwersja do skali szarości
-            if len(np_image.shape) == 3:
-                gray = cv2.cvtColor(np_image, cv2.COLOR_RGB2GRAY)
-            else:
-                gray = np_image
+            if debug is not None:
+                debug.add(f"roi_{roi_name}_enhanced", enhanced)
+                debug.add(f"roi_{roi_name}_denoised", denoised)
+                debug.add(f"roi_{roi_name}_sharpened", sharpened)
+                debug.add(f"roi_{roi_name}_scaled", scaled)
             
-            # Zapisanie obrazu w skali szarości do debugowania
-            cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_gray.png"), gray)
+            # Konwersja z powrotem do PIL Image
+            processed_image = Image.fromarray(scaled)
+        else:
+            # Przetwarzanie dla Tesseract (istniejący kod)
+            # Prosta binaryzacja z progiem Otsu
+            _, binary_otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV+cv2.THRESH_OTSU)
             
-            # Przetwarzanie dla PaddleOCR
-            if PADDLE_AVAILABLE and self.paddle_ocr:
-                # Wyrównanie histogramu dla zwiększenia kontrastu
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-                enhanced = clahe.apply(gray)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_enhanced.png"), enhanced)
-                
-                # Usunięcie szumu
-                denoised = cv2.fastNlMeansDenoising(enhanced, None, 10, 7, 21)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_denoised.png"), denoised)
-                
-                # Wzmocnienie krawędzi
-                kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-                sharpened = cv2.filter2D(denoised, -1, kernel)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_sharpened.png"), sharpened)
-                
-                # Powiększenie obrazu (może poprawić rozpoznawanie)
-                height, width = sharpened.shape
-                scaled = cv2.resize(sharpened, (width*2, height*2), interpolation=cv2.INTER_CUBIC)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_scaled.png"), scaled)
-                
-                # Konwersja z powrotem do PIL Image
-                processed_image = Image.fromarray(scaled)
-            else:
-                # Przetwarzanie dla Tesseract (istniejący kod)
+            if debug is not None:
+                # Alternatywne metody binaryzacji liczone tylko do porównania w diagnostyce
                 # 1. Metoda: Binaryzacja adaptacyjna
-                binary = cv2.adaptiveThreshold(
+                binary_adaptive = cv2.adaptiveThreshold(
                     gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2
                 )
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_binary_adaptive.png"), binary)
-                
-                # 2. Metoda: Prosta binaryzacja z progiem Otsu
-                _, binary_otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV+cv2.THRESH_OTSU)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_binary_otsu.png"), binary_otsu)
-                
                 # 3. Metoda: Zastosowanie filtru rozmycia, a następnie binaryzacja
                 blurred = cv2.GaussianBlur(gray, (5, 5), 0)
                 _, binary_blur = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV+cv2.THRESH_OTSU)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_binary_blur.png"), binary_blur)
-                
-                # Wybór metody binaryzacji
-                binary = binary_otsu
                 
-                # Usuwanie szumu
-                kernel = np.ones((1, 1), np.uint8)
-                opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_opening.png"), opening)
+                debug.add(f"roi_{roi_name}_binary_adaptive", binary_adaptive)
+                debug.add(f"roi_{roi_name}_binary_otsu", binary_otsu)
+                debug.add(f"roi_{roi_name}_binary_blur", binary_blur)
+            
+            # Wybór metody binaryzacji
+            binary = binary_otsu
+            
+            # Usuwanie szumu
+            kernel = np.ones((1, 1), np.uint8)
+            opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+            
+            # Dylatacja tekstu (pogrubienie)
+            dilated = cv2.dilate(opening, np.ones((2, 2), np.uint8), iterations=1)
+            
+            if debug is not None:
+                debug.add(f"roi_{roi_name}_opening", opening)
+                debug.add(f"roi_{roi_name}_dilated", dilated)
+            
+            # Konwersja z powrotem do PIL Image
+            processed_image = Image.fromarray(dilated)
+        
+        # Końcowy przetworzony obraz
+        if debug is not None:
+            debug.add(f"roi_{roi_name}_processed", processed_image)
+        
+        return processed_image
+    except Exception as e:
+        log.exception("Błąd podczas przetwarzania obrazu: %s", e)
+        return image  # Zwróć oryginalny obraz w przypadku błędu
+
+
+def preprocess_document(document, for_paddle=False):
+    """Przetworzenie wszystkich obrazów ROI dokumentu (document['processed'])."""
+    with get_metrics().span("czas_etapu_sekundy", etap="przetwarzanie_wstepne"):
+        document['processed'] = {
+            roi_name: preprocess_roi_image(roi_image, roi_name, for_paddle, document['debug'])
+            for roi_name, roi_image in document['roi_images'].items()
+            if roi_image is not None
+        }
+    return document
+
+
+class PDFProcessor:
+    # Nazwy obszarów ROI i odpowiadające im kolumny w wierszu szablonu
+    TEMPLATE_ROIS = (("numer_zlecenia", 2), ("numer_operatora", 3), ("data", 4))
+    
+    # Wartości oznaczające nieudane rozpoznanie pola
+    FAILED_VALUES = ("NIEZNANY", "NIEZNANA", "BŁĄD")
+
+    def __init__(self, db_manager):
+        """Inicjalizacja procesora PDF."""
+        self.db_manager = db_manager
+        self.renderer = PDFRenderer()
+        self.page_cache = PageCache() if config.PAGE_CACHE_ENABLED else None
+        
+        # Silniki OCR są współdzielone w obrębie procesu i ładowane przy pierwszym użyciu
+        self.ocr_engines = get_engine_registry()
+        
+        # Artefakty diagnostyczne zapisywane są w tle, zgodnie z config.DEBUG_MODE
+        self.debug_sink = get_debug_sink()
+        
+        # Czasy etapów i liczniki (zgodnie z config.METRICS_LEVEL)
+        self.metrics = get_metrics()
+        
+        # Profilowanie wybranego odsetka dokumentów (config.PROFILE_SAMPLE_RATE)
+        self.profiler = get_profiler()
+        
+    @property
+    def paddle_ocr(self):
+        """Współdzielona instancja PaddleOCR (None, jeśli PaddleOCR jest niedostępny lub wyłączony)."""
+        if not PADDLE_AVAILABLE or config.OCR_ENGINE == ENGINE_TESSERACT:
+            return None
+        return self.ocr_engines.get(ENGINE_PADDLE)
+    
+    def warm_up_engines(self):
+        """Załadowanie silnika OCR przed przetwarzaniem pierwszego dokumentu."""
+        if not self.paddle_ocr:
+            self.ocr_engines.warm_up(ENGINE_TESSERACT)
+    
+    def get_cached_page(self, pdf_path, file_hash=None):
+        """Pobranie strony z pamięci podręcznej jako tablicy numpy (lub None)."""
+        if self.page_cache is None:
+            return None
+        file_hash = file_hash or file_sha256(pdf_path)
+        return self.page_cache.get(file_hash, self.renderer.dpi, "RGB")
+    
+    def pdf_to_pil_image(self, pdf_path, file_hash=None, debug=None):
+        """Konwersja pierwszej strony PDF do obrazu PIL."""
+        import numpy as np
+        from PIL import Image
+        
+        try:
+            first_page = None
+            if self.page_cache is not None:
+                file_hash = file_hash or file_sha256(pdf_path)
+                cached = self.page_cache.get(file_hash, self.renderer.dpi, "RGB")
+                if cached is not None:
+                    log.debug("Strona wczytana z pamięci podręcznej: %s", pdf_path)
+                    first_page = Image.fromarray(np.asarray(cached))
+            
+            if first_page is None:
+                # Renderowanie tylko pierwszej strony (PyMuPDF lub poppler)
+                first_page = self.renderer.render_page(pdf_path)
                 
-                # Dylatacja tekstu (pogrubienie)
-                dilated = cv2.dilate(opening, np.ones((2, 2), np.uint8), iterations=1)
-                cv2.imwrite(os.path.join(self.debug_dir, f"roi_{roi_name}_dilated.png"), dilated)
+                if first_page is None:
+                    log.warning("PDF nie zawiera stron")
+                    return None
                 
-                # Konwersja z powrotem do PIL Image
-                processed_image = Image.fromarray(dilated)
+                if self.page_cache is not None:
+                    self.page_cache.put(file_hash, self.renderer.dpi, "RGB", np.asarray(first_page.convert("RGB")))
             
-            # Zapisanie końcowego przetworzonego obrazu
-            debug_path = os.path.join(self.debug_dir, f"roi_{roi_name}_processed.png")
-            processed_image.save(debug_path)
-            print(f"Zapisano przetworzony ROI do: {debug_path}")
+            # Dodanie obrazu do paczki diagnostycznej dokumentu
+            if debug is not None:
+                debug.add("original_pdf", first_page)
+            
+            return first_page
             
-            return processed_image
         except Exception as e:
-            print(f"Błąd podczas przetwarzania obrazu: {e}")
-            import traceback
-            traceback.print_exc()
-            return image  # Zwróć oryginalny obraz w przypadku błędu
+            log.exception("Błąd podczas konwersji PDF do obrazu: %s", e)
+            return None
     
-    def extract_text_from_roi_with_paddle(self, image, roi_data, roi_name="unknown"):
-        """Ekstrakcja tekstu z określonego obszaru przy użyciu PaddleOCR."""
+    def parse_roi(self, roi_data, roi_name="unknown"):
+        """Parsowanie współrzędnych ROI zapisanych w szablonie jako 'x1,y1,x2,y2'."""
         if not roi_data:
-            print(f"Brak danych ROI dla {roi_name}")
-            return ""
+            log.warning("Brak danych ROI dla %s", roi_name)
+            return None
+        
+        roi = [int(val) for val in roi_data.split(',')]
+        if len(roi) != 4:
+            log.warning("Nieprawidłowe dane ROI dla %s: %s", roi_name, roi_data)
+            return None
+        
+        return tuple(roi)
+    
+    def template_regions(self, template, alignment=None):
+        """Słownik nazwa ROI -> współrzędne dla wszystkich obszarów zdefiniowanych w szablonie.
+        
+        Z podanym `alignment` (page_alignment) obszary są przesunięte zgodnie
+        z położeniem strony dokumentu względem strony wzorcowej.
+        """
+        regions = {}
+        for roi_name, column in self.TEMPLATE_ROIS:
+            try:
+                roi = self.parse_roi(template[column], roi_name)
+            except ValueError:
+                log.warning("Nieprawidłowe dane ROI dla %s: %s", roi_name, template[column])
+                roi = None
+            if roi:
+                regions[roi_name] = alignment.shift_box(roi, self.renderer.dpi) if alignment else roi
+        return regions
+    
+    def pdf_to_roi_images(self, pdf_path, template, file_hash=None, alignment=None):
+        """Renderowanie z pierwszej strony PDF tylko obszarów ROI szablonu (przesuniętych o `alignment`)."""
+        import numpy as np
+        from PIL import Image
         
         try:
-            # Parsowanie danych ROI
-            roi = [int(val) for val in roi_data.split(',')]
-            if len(roi) != 4:
-                print(f"Nieprawidłowe dane ROI dla {roi_name}: {roi_data}")
-                return ""
+            regions = self.template_regions(template, alignment)
+            
+            # Jeśli strona jest już w pamięci podręcznej, wycinamy ROI z mapowanej tablicy
+            cached = self.get_cached_page(pdf_path, file_hash)
+            if cached is not None:
+                log.debug("Obszary ROI wycięte ze strony w pamięci podręcznej: %s", pdf_path)
+                return {
+                    roi_name: Image.fromarray(np.array(cached[y1:y2, x1:x2]))
+                    for roi_name, (x1, y1, x2, y2) in regions.items()
+                }
             
-            print(f"Wycinanie ROI {roi_name} z koordynatami: {roi}")
+            roi_images = self.renderer.render_regions(pdf_path, regions)
+            
+            if any(roi_image is None for roi_image in roi_images.values()):
+                log.warning("PDF nie zawiera stron")
+                return None
             
-            # Wycięcie obszaru zainteresowania
-            roi_image = image.crop((roi[0], roi[1], roi[2], roi[3]))
+            return roi_images
             
-            # Przetworzenie obrazu dla lepszego OCR
-            roi_image = self.preprocess_image_for_handwriting(roi_image, roi_name)
+        except Exception as e:
+            log.exception("Błąd podczas renderowania obszarów ROI z PDF: %s", e)
+            return None
+    
+    def pdf_fingerprint(self, pdf_path):
+        """Odcisk pierwszej strony PDF wyrenderowanej w niskiej rozdzielczości (None, jeśli PDF nie ma stron)."""
+        image = self.renderer.render_page(pdf_path, dpi=config.TEMPLATE_FINGERPRINT_DPI, grayscale=True)
+        return None if image is None else page_fingerprint(image)
+    
+    def template_reference(self, pdf_path):
+        """Odcisk (tekst do bazy) i strona wzorcowa przykładowego PDF szablonu - (odcisk, strona_wzorcowa)."""
+        fingerprint = self.pdf_fingerprint(pdf_path)
+        odcisk = fingerprint_to_text(fingerprint) if fingerprint is not None else None
+        return odcisk, self.alignment_reference(pdf_path)
+    
+    def select_template(self, pdf_path, templates):
+        """Szablon dla dokumentu - przy kilku szablonach ten o odcisku najbliższym odciskowi strony.
+        
+        `templates` to wiersze jak z DatabaseManager.get_templates (od ostatnio
+        zapisanego). Odcisk liczony jest z renderu w niskiej rozdzielczości,
+        więc wybór poprzedza renderowanie ROI w pełnej rozdzielczości.
+        Szablony bez odcisku (zapisane przed jego wprowadzeniem) są
+        rezerwowe: ostatnio zapisany z nich jest używany, gdy strona nie
+        przypomina żadnego szablonu z odciskiem (odległość większa niż
+        config.TEMPLATE_MATCH_MAX_DISTANCE) albo gdy odcisku strony nie da
+        się obliczyć. Bez szablonów rezerwowych używany jest wtedy najbliższy
+        albo ostatnio zapisany szablon.
+        """
+        if len(templates) == 1 or not any(template[5] for template in templates):
+            return templates[0]
+        
+        legacy = [template for template in templates if not template[5]]
+        fallback = legacy[0] if legacy else templates[0]
+        
+        with self.metrics.span("czas_etapu_sekundy", etap="wybor_szablonu"):
+            try:
+                fingerprint = self.pdf_fingerprint(pdf_path)
+            except Exception as e:
+                log.error("Błąd podczas obliczania odcisku strony %s: %s", pdf_path, e)
+                fingerprint = None
+            if fingerprint is None:
+                return fallback
+            index, distance = nearest_fingerprint(
+                fingerprint, ((index, template[5]) for index, template in enumerate(templates)))
+        
+        if index is None:
+            return fallback
+        template = templates[index]
+        if distance > config.TEMPLATE_MATCH_MAX_DISTANCE:
+            if legacy:
+                log.info("Strona %s nie przypomina szablonów z odciskiem (odległość %s) - "
+                         "używam szablonu bez odcisku ID=%s, Nazwa=%s", pdf_path, distance, fallback[0], fallback[1])
+                self.metrics.inc("wybor_szablonu_total", szablon=fallback[0])
+                return fallback
+            log.warning("Strona %s nie przypomina żadnego szablonu (odległość %s) - wynik wymaga sprawdzenia",
+                        pdf_path, distance)
+        log.debug("Szablon dla %s: ID=%s, Nazwa=%s (odległość odcisku: %s)",
+                  pdf_path, template[0], template[1], distance)
+        self.metrics.inc("wybor_szablonu_total", szablon=template[0])
+        return template
+    
+    def alignment_reference(self, pdf_path):
+        """Strona wzorcowa szablonu do wyrównania - pierwsza strona PDF w config.ALIGNMENT_DPI (PNG) lub None."""
+        image = self.renderer.render_page(pdf_path, dpi=config.ALIGNMENT_DPI, grayscale=True)
+        return None if image is None else encode_reference(image, config.ALIGNMENT_DPI)
+    
+    def page_alignment(self, pdf_path, template, image=None, file_hash=None):
+        """Przesunięcie i skos pierwszej strony względem strony wzorcowej szablonu (Alignment lub None).
+        
+        Obraz strony w niskiej rozdzielczości pochodzi z `image` (cała strona
+        już wyrenderowana), z pamięci podręcznej stron albo z osobnego,
+        taniego renderowania. None oznacza brak wyrównania: szablon bez strony
+        wzorcowej, inny format strony albo niewiarygodny wynik korelacji.
+        """
+        import numpy as np
+        import cv2
+        
+        if not config.ALIGNMENT_ENABLED or len(template) < 7 or not template[6]:
+            return None
+        
+        with self.metrics.span("czas_etapu_sekundy", etap="wyrownanie"):
+            try:
+                reference, dpi = _decoded_reference(template[6])
+                if image is not None:
+                    page = np.asarray(image.convert("L"))
+                else:
+                    cached = self.get_cached_page(pdf_path, file_hash)
+                    if cached is not None:
+                        page = cv2.cvtColor(np.asarray(cached), cv2.COLOR_RGB2GRAY)
+                    else:
+                        rendered = self.renderer.render_page(pdf_path, dpi=dpi, grayscale=True)
+                        if rendered is None:
+                            return None
+                        page = np.asarray(rendered)
+                
+                # Porównywane jest otoczenie obszarów ROI szablonu
+                page = fit_to_reference(page, reference)
+                boxes = list(self.template_regions(template).values())
+                alignment = None
+                if page is not None:
+                    alignment = estimate_alignment(reference, page, boxes, dpi, self.renderer.dpi)
+            except Exception as e:
+                log.error("Błąd podczas wyrównywania strony %s: %s", pdf_path, e)
+                alignment = None
+        
+        self.metrics.inc("wyrownanie_total", wynik="ok" if alignment else "brak")
+        if alignment:
+            scale = self.renderer.dpi / alignment.dpi
+            log.debug("Wyrównanie strony: przesunięcie (%.0f, %.0f) px, skos %.2f°",
+                      alignment.dx * scale, alignment.dy * scale, math.degrees(alignment.angle))
+        else:
+            log.info("Nie wyznaczono wyrównania strony %s - ROI bez przesunięcia", pdf_path)
+        return alignment
+    
+    def uses_paddle(self):
+        """Czy rozpoznawanie korzysta z PaddleOCR (od tego zależy przetwarzanie wstępne ROI)."""
+        return bool(PADDLE_AVAILABLE and self.paddle_ocr)
+    
+    def preprocess_image_for_handwriting(self, image, roi_name="unknown", debug=None):
+        """Zaawansowane przetwarzanie obrazu dla lepszego rozpoznawania pisma odręcznego."""
+        return preprocess_roi_image(image, roi_name, self.uses_paddle(), debug)
+    
+    def crop_roi(self, image, roi_data, roi_name="unknown", alignment=None):
+        """Wycięcie obszaru zainteresowania z obrazu całej strony (przesuniętego o `alignment`)."""
+        roi = self.parse_roi(roi_data, roi_name)
+        if not roi:
+            return None
+        if alignment:
+            roi = alignment.shift_box(roi, self.renderer.dpi)
+        
+        log.debug("Wycinanie ROI %s z koordynatami: %s", roi_name, list(roi))
+        return image.crop(roi)
+    
+    def extract_text_from_roi_with_paddle(self, image, roi_data, roi_name="unknown", debug=None, alignment=None):
+        """Ekstrakcja tekstu z określonego obszaru przy użyciu PaddleOCR."""
+        try:
+            roi_image = self.crop_roi(image, roi_data, roi_name, alignment)
+        except Exception as e:
+            log.error("Błąd podczas wycinania ROI %s: %s", roi_name, e)
+            return ""
+        if roi_image is None:
+            return ""
+        return self.recognize_roi_with_paddle(roi_image, roi_name, debug)
+    
+    def recognize_roi_with_paddle(self, roi_image, roi_name="unknown", debug=None, preprocessed=False):
+        """Rozpoznanie tekstu na wyciętym obrazie ROI przy użyciu PaddleOCR."""
+        import numpy as np
+        
+        try:
+            # Przetworzenie obrazu dla lepszego OCR (o ile nie zostało już wykonane)
+            if not preprocessed:
+                roi_image = self.preprocess_image_for_handwriting(roi_image, roi_name, debug)
             
             # Zapisanie przetworzonego obrazu do numpy array dla PaddleOCR
             np_image = np.array(roi_image)
             
-            # Uruchomienie PaddleOCR
-            results = self.paddle_ocr.ocr(np_image, cls=True)
+            # Uruchomienie PaddleOCR (silnik współdzielony, wywołania serializowane)
+            with self.ocr_engines.use(ENGINE_PADDLE) as paddle_ocr, \
+                    self.metrics.span("czas_wywolania_ocr_sekundy", METRICS_DETAILED, silnik="paddle"):
+                results = paddle_ocr.ocr(np_image, cls=True)
             
             # Wyciągnięcie tekstu z wyników
             extracted_text = ""
@@ -198,111 +463,301 @@ class PDFProcessor:
                 for line in results[0]:
                     if isinstance(line, list) and len(line) >= 2:
                         text, confidence = line[1]
-                        print(f"PaddleOCR {roi_name}: '{text}' (pewność: {confidence:.2f})")
-                        
-                        # Dla numerów, zostawiamy tylko cyfry i znaki specjalne
-                        if roi_name == "numer_zlecenia":
-                            text = re.sub(r'[^0-9\-]', '', text)
-                        elif roi_name == "numer_operatora":
-                            text = re.sub(r'[^0-9]', '', text)
-                        
-                        # Dodanie do wyniku tylko jeśli pewność jest wystarczająca
-                        if confidence > 0.5:  # Próg pewności 50%
-                            extracted_text += text
-            
-            print(f"Finalny tekst dla {roi_name}: '{extracted_text}'")
+                        extracted_text += self._filter_paddle_text(text, confidence, roi_name, debug)
+            
+            log.debug("Finalny tekst dla %s: '%s'", roi_name, extracted_text)
             return extracted_text
             
         except Exception as e:
-            print(f"Błąd podczas ekstrakcji tekstu z ROI {roi_name} za pomocą PaddleOCR: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Błąd podczas ekstrakcji tekstu z ROI %s za pomocą PaddleOCR: %s", roi_name, e)
             return ""
     
-    def extract_text_from_roi_with_tesseract(self, image, roi_data, roi_name="unknown"):
-        """Ekstrakcja tekstu z określonego obszaru przy użyciu Tesseract OCR."""
-        if not roi_data:
-            print(f"Brak danych ROI dla {roi_name}")
-            return ""
+    def _filter_paddle_text(self, text, confidence, roi_name, debug=None):
+        """Oczyszczenie tekstu rozpoznanego przez PaddleOCR - pusty wynik przy zbyt niskiej pewności."""
+        log.debug("PaddleOCR %s: '%s' (pewność: %.2f)", roi_name, text, confidence)
+        if debug is not None:
+            debug.note_confidence(confidence)
+        
+        # Dla numerów, zostawiamy tylko cyfry i znaki specjalne
+        if roi_name == "numer_zlecenia":
+            text = re.sub(r'[^0-9\-]', '', text)
+        elif roi_name == "numer_operatora":
+            text = re.sub(r'[^0-9]', '', text)
+        
+        # Dodanie do wyniku tylko jeśli pewność jest wystarczająca
+        if confidence > 0.5:  # Próg pewności 50%
+            return text
+        return ""
+    
+    def recognize_roi_images_with_paddle(self, items, preprocessed=False):
+        """Wsadowe rozpoznawanie wielu obrazów ROI bez detekcji i klasyfikacji orientacji.
+        
+        Szablon wyznacza położenie tekstu, więc każdy wycięty ROI trafia
+        bezpośrednio do modelu rozpoznawania. `items` to lista krotek
+        (obraz ROI, nazwa ROI, paczka diagnostyczna lub None) - mogą pochodzić
+        z jednego lub wielu dokumentów. Przy preprocessed=True obrazy są już
+        przetworzone. Zwraca listę tekstów w tej samej kolejności.
+        """
+        import numpy as np
+        import cv2
+        
+        if not items:
+            return []
         
         try:
-            # Parsowanie danych ROI
-            roi = [int(val) for val in roi_data.split(',')]
-            if len(roi) != 4:
-                print(f"Nieprawidłowe dane ROI dla {roi_name}: {roi_data}")
-                return ""
-            
-            print(f"Wycinanie ROI {roi_name} z koordynatami: {roi}")
+            np_images = []
+            for roi_image, roi_name, debug in items:
+                if not preprocessed:
+                    roi_image = self.preprocess_image_for_handwriting(roi_image, roi_name, debug)
+                processed = np.array(roi_image)
+                # Model rozpoznawania oczekuje obrazu 3-kanałowego
+                if processed.ndim == 2:
+                    processed = cv2.cvtColor(processed, cv2.COLOR_GRAY2BGR)
+                np_images.append(processed)
             
-            # Wycięcie obszaru zainteresowania
-            roi_image = image.crop((roi[0], roi[1], roi[2], roi[3]))
+            with self.ocr_engines.use(ENGINE_PADDLE) as paddle_ocr, \
+                    self.metrics.span("czas_wywolania_ocr_sekundy", METRICS_DETAILED, silnik="paddle_wsadowo"):
+                recognized = self._paddle_recognize_batch(paddle_ocr, np_images)
             
-            # Przetworzenie obrazu dla lepszego OCR
-            roi_image = self.preprocess_image_for_handwriting(roi_image, roi_name)
+            texts = []
+            for (_, roi_name, debug), (text, confidence) in zip(items, recognized):
+                text = self._filter_paddle_text(text, confidence, roi_name, debug)
+                log.debug("Finalny tekst dla %s: '%s'", roi_name, text)
+                texts.append(text)
+            return texts
             
-            # Spróbujmy różnych konfiguracji OCR
-            configs = [
-                (r'--oem 1 --psm 6 -c tessedit_char_whitelist=0123456789.', "Cyfry"),
-                (r'--oem 1 --psm 7', "Jedna linia"),
-                (r'--oem 1 --psm 7 -c tessedit_char_whitelist=0123456789-', "Cyfry ze znakami")
-            ]
+        except Exception as e:
+            log.exception("Błąd podczas wsadowego rozpoznawania ROI za pomocą PaddleOCR: %s", e)
+            return [""] * len(items)
+    
+    def _paddle_recognize_batch(self, paddle_ocr, np_images):
+        """Jedno wywołanie modelu rozpoznawania PaddleOCR dla listy obrazów - lista (tekst, pewność)."""
+        text_recognizer = getattr(paddle_ocr, 'text_recognizer', None)
+        if text_recognizer is not None:
+            output = text_recognizer(np_images)
+            # TextRecognizer zwraca (wyniki, czas) w PaddleOCR 2.x
+            if isinstance(output, tuple) and len(output) == 2 and not isinstance(output[1], (list, tuple)):
+                output = output[0]
+            return [(text, float(confidence)) for text, confidence in output]
+        
+        # Starsze API bez dostępu do modelu rozpoznawania - tryb bez detekcji, obraz po obrazie
+        recognized = []
+        for np_image in np_images:
+            result = paddle_ocr.ocr(np_image, det=False, cls=False)
+            lines = result[0] if result and isinstance(result[0], list) else result
+            text, confidence = lines[0] if lines else ("", 0.0)
+            recognized.append((text, float(confidence)))
+        return recognized
+    
+    def extract_text_from_roi_with_tesseract(self, image, roi_data, roi_name="unknown", debug=None, alignment=None):
+        """Ekstrakcja tekstu z określonego obszaru przy użyciu Tesseract OCR."""
+        try:
+            roi_image = self.crop_roi(image, roi_data, roi_name, alignment)
+        except Exception as e:
+            log.error("Błąd podczas wycinania ROI %s: %s", roi_name, e)
+            return ""
+        if roi_image is None:
+            return ""
+        return self.recognize_roi_with_tesseract(roi_image, roi_name, debug)
+    
+    def recognize_roi_with_tesseract(self, roi_image, roi_name="unknown", debug=None, preprocessed=False):
+        """Rozpoznanie tekstu na wyciętym obrazie ROI przy użyciu Tesseract OCR."""
+        try:
+            # Przetworzenie obrazu dla lepszego OCR (o ile nie zostało już wykonane)
+            if not preprocessed:
+                roi_image = self.preprocess_image_for_handwriting(roi_image, roi_name, debug)
+            return self._tesseract_with_configs(roi_image, roi_name)
             
-            for config, config_name in configs:
-                text = pytesseract.image_to_string(roi_image, config=config).strip()
-                print(f"OCR {roi_name} ({config_name}): '{text}'")
-                
-                # Zwróć pierwszy niepusty wynik
-                if text:
-                    return text
+        except Exception as e:
+            log.exception("Błąd podczas ekstrakcji tekstu z ROI %s za pomocą Tesseract: %s", roi_name, e)
+            return ""
+    
+    def _tesseract_with_configs(self, processed_image, roi_name):
+        """Rozpoznanie przetworzonego obrazu ROI kolejnymi konfiguracjami Tesseract."""
+        # Spróbujmy różnych konfiguracji OCR
+        configs = [
+            (r'--oem 1 --psm 6 -c tessedit_char_whitelist=0123456789.', "Cyfry"),
+            (r'--oem 1 --psm 7', "Jedna linia"),
+            (r'--oem 1 --psm 7 -c tessedit_char_whitelist=0123456789-', "Cyfry ze znakami")
+        ]
+        
+        if config.TESSERACT_CONCURRENT_CONFIGS:
+            # Wszystkie konfiguracje równolegle - wynik jak przy kolejnym uruchamianiu,
+            # a uruchomienia o niższym priorytecie są przerywane po znalezieniu wyniku
+            from controllers.tesseract_runner import run_with_priority_fallback
             
-            print(f"Nie udało się rozpoznać tekstu dla {roi_name}")
+            text, config_name = run_with_priority_fallback(processed_image, configs)
+            if text:
+                log.debug("OCR %s (%s): '%s'", roi_name, config_name, text)
+                self._count_config_fallback(configs, config_name)
+                return text
+            log.warning("Nie udało się rozpoznać tekstu dla %s", roi_name)
+            self.metrics.inc("ocr_ponowienia_total", powod="brak_tekstu")
             return ""
+        
+        tesseract = self.ocr_engines.get(ENGINE_TESSERACT)
+        for tesseract_config, config_name in configs:
+            with self.metrics.span("czas_wywolania_ocr_sekundy", METRICS_DETAILED, silnik="tesseract"):
+                text = tesseract.image_to_string(processed_image, config=tesseract_config).strip()
+            log.debug("OCR %s (%s): '%s'", roi_name, config_name, text)
             
+            # Zwróć pierwszy niepusty wynik
+            if text:
+                self._count_config_fallback(configs, config_name)
+                return text
+        
+        log.warning("Nie udało się rozpoznać tekstu dla %s", roi_name)
+        self.metrics.inc("ocr_ponowienia_total", powod="brak_tekstu")
+        return ""
+    
+    def _count_config_fallback(self, configs, config_name):
+        """Zliczenie wyniku uzyskanego dopiero kolejną (nie pierwszą) konfiguracją Tesseract."""
+        if config_name != configs[0][1]:
+            self.metrics.inc("ocr_ponowienia_total", powod="konfiguracja_tesseract", konfiguracja=config_name)
+    
+    def recognize_roi_images_with_tesseract_mosaic(self, items, preprocessed=False):
+        """Rozpoznanie wielu obrazów ROI jednym wywołaniem Tesseract.
+        
+        Przetworzone obrazy ROI (z jednej lub wielu stron) są układane jeden pod
+        drugim w jednym obrazie o znanych przesunięciach. Tesseract uruchamiany
+        jest raz (image_to_data), a rozpoznane słowa przypisywane są do pól
+        według położenia. Pola, dla których mozaika nie dała wyniku, są
+        rozpoznawane osobno z pełnym zestawem konfiguracji.
+        `items` to lista krotek (obraz ROI, nazwa ROI, paczka diagnostyczna lub None),
+        przy preprocessed=True z obrazami już przetworzonymi.
+        """
+        import numpy as np
+        
+        if not items:
+            return []
+        
+        processed = []
+        for roi_image, roi_name, debug in items:
+            if not preprocessed:
+                roi_image = self.preprocess_image_for_handwriting(roi_image, roi_name, debug)
+            processed.append(np.array(roi_image.convert("L")))
+        
+        texts = [""] * len(items)
+        max_rois = max(1, config.TESSERACT_MOSAIC_MAX_ROIS)
+        for start in range(0, len(items), max_rois):
+            indices = list(range(start, min(start + max_rois, len(items))))
+            try:
+                chunk_texts = self._tesseract_mosaic([processed[i] for i in indices])
+            except Exception as e:
+                log.exception("Błąd podczas rozpoznawania mozaiki ROI za pomocą Tesseract: %s", e)
+                chunk_texts = [""] * len(indices)
+            for i, text in zip(indices, chunk_texts):
+                texts[i] = text
+        
+        # Pola bez wyniku - osobne, równoległe rozpoznanie z kolejnymi konfiguracjami
+        from PIL import Image
+        
+        def fallback(i):
+            roi_name = items[i][1]
+            try:
+                return self._tesseract_with_configs(Image.fromarray(processed[i]), roi_name)
+            except Exception as e:
+                log.error("Błąd podczas ekstrakcji tekstu z ROI %s za pomocą Tesseract: %s", roi_name, e)
+                return ""
+        
+        for i, (_, roi_name, _) in enumerate(items):
+            log.debug("OCR %s (mozaika): '%s'", roi_name, texts[i])
+        empty = [i for i, text in enumerate(texts) if not text]
+        self.metrics.inc("ocr_ponowienia_total", len(empty), powod="mozaika_bez_wyniku")
+        for i, text in zip(empty, _get_roi_executor().map(fallback, empty)):
+            texts[i] = text
+        
+        return texts
+    
+    def _tesseract_mosaic(self, images):
+        """Złożenie obrazów w mozaikę, jedno wywołanie image_to_data i podział słów na pola."""
+        import numpy as np
+        import cv2
+        
+        gap = config.TESSERACT_MOSAIC_GAP
+        width = max(image.shape[1] for image in images) + 2 * gap
+        height = sum(image.shape[0] for image in images) + (len(images) + 1) * gap
+        
+        # Obrazy po binaryzacji mają jasny tekst na ciemnym tle - w mozaice odwracamy
+        # je do ciemnego tekstu na białym tle, aby duże puste obszary nie myliły analizy układu
+        mosaic = np.full((height, width), 255, dtype=np.uint8)
+        slots = []
+        y = gap
+        for image in images:
+            h, w = image.shape
+            mosaic[y:y + h, gap:gap + w] = cv2.bitwise_not(image)
+            slots.append((y, y + h))
+            y += h + gap
+        
+        tesseract = self.ocr_engines.get(ENGINE_TESSERACT)
+        with self.metrics.span("czas_wywolania_ocr_sekundy", METRICS_DETAILED, silnik="tesseract_mozaika"):
+            data = tesseract.image_to_data(mosaic, config=config.TESSERACT_MOSAIC_CONFIG,
+                                           output_type=tesseract.Output.DICT)
+        
+        words = [[] for _ in images]
+        for i, text in enumerate(data['text']):
+            text = text.strip()
+            if not text or float(data['conf'][i]) < 0:
+                continue
+            center_y = data['top'][i] + data['height'][i] / 2
+            for slot_index, (top, bottom) in enumerate(slots):
+                if top <= center_y < bottom:
+                    words[slot_index].append((data['left'][i], text))
+                    break
+        
+        return [" ".join(text for _, text in sorted(slot_words)) for slot_words in words]
+    
+    def extract_text_from_roi(self, image, roi_data, roi_name="unknown", debug=None, alignment=None):
+        """Ekstrakcja tekstu z określonego obszaru zainteresowania (ROI)."""
+        try:
+            roi_image = self.crop_roi(image, roi_data, roi_name, alignment)
         except Exception as e:
-            print(f"Błąd podczas ekstrakcji tekstu z ROI {roi_name} za pomocą Tesseract: {e}")
-            import traceback
-            traceback.print_exc()
+            log.error("Błąd podczas wycinania ROI %s: %s", roi_name, e)
             return ""
+        return self.extract_text_from_roi_image(roi_image, roi_name, debug)
     
-    def extract_text_from_roi(self, image, roi_data, roi_name="unknown"):
-        """Ekstrakcja tekstu z określonego obszaru zainteresowania (ROI)."""
+    def extract_text_from_roi_image(self, roi_image, roi_name="unknown", debug=None):
+        """Ekstrakcja tekstu z już wyciętego (lub wyrenderowanego) obrazu ROI."""
+        if roi_image is None:
+            return ""
+        
         # Wybór metody OCR w zależności od dostępności PaddleOCR
         if PADDLE_AVAILABLE and self.paddle_ocr:
-            print(f"Używam PaddleOCR dla {roi_name}")
-            return self.extract_text_from_roi_with_paddle(image, roi_data, roi_name)
+            log.debug("Używam PaddleOCR dla %s", roi_name)
+            return self.recognize_roi_with_paddle(roi_image, roi_name, debug)
         else:
-            print(f"Używam Tesseract OCR dla {roi_name}")
-            return self.extract_text_from_roi_with_tesseract(image, roi_data, roi_name)
+            log.debug("Używam Tesseract OCR dla %s", roi_name)
+            return self.recognize_roi_with_tesseract(roi_image, roi_name, debug)
     
     def format_to_pattern(self, digits):
         """Formatowanie ciągu cyfr do wzoru XXX-XXXX-XXXX-XXX."""
         # Usunięcie wszystkich nie-cyfr
         clean_digits = re.sub(r'[^0-9]', '', digits)
-        print(f"Cyfry po oczyszczeniu: '{clean_digits}'")
+        log.debug("Cyfry po oczyszczeniu: '%s'", clean_digits)
         
         # Sprawdzenie, czy mamy wystarczającą liczbę cyfr
         if len(clean_digits) >= 15:
             # Formatowanie do wzoru XXX-XXXX-XXXX-XXX
             result = f"{clean_digits[0:3]}-{clean_digits[3:7]}-{clean_digits[7:11]}-{clean_digits[11:14]}"
-            print(f"Sformatowany numer zlecenia: {result}")
+            log.debug("Sformatowany numer zlecenia: %s", result)
             return result
         elif len(clean_digits) > 0:
             # Uzupełnienie zerami, jeśli brakuje cyfr
             padded_digits = clean_digits.ljust(15, '0')
             result = f"{padded_digits[0:3]}-{padded_digits[3:7]}-{padded_digits[7:11]}-{padded_digits[11:14]}"
-            print(f"Uzupełniony numer zlecenia: {result}")
+            log.debug("Uzupełniony numer zlecenia: %s", result)
             return result
         else:
-            print("Nie znaleziono cyfr - używam 'NIEZNANY'")
+            log.warning("Nie znaleziono cyfr - używam 'NIEZNANY'")
             return "NIEZNANY"
     
     def format_date(self, date_text):
         """Formatowanie daty do formatu dd.mm.yyyy."""
-        print(f"Formatowanie daty z tekstu: '{date_text}'")
+        log.debug("Formatowanie daty z tekstu: '%s'", date_text)
         
         # Usunięcie wszystkich nie-cyfr (z wyjątkiem kropek i myślników)
         clean_date = re.sub(r'[^0-9.-]', '', date_text)
-        print(f"Oczyszczony tekst daty: '{clean_date}'")
+        log.debug("Oczyszczony tekst daty: '%s'", clean_date)
         
         # Najpierw sprawdź, czy data już jest w formacie dd.mm.yyyy lub dd.mm.yy
         dot_pattern = r'(\d{1,2})\.(\d{1,2})\.(\d{2,4})'
@@ -321,7 +776,7 @@ class PDFProcessor:
                 year = "20" + year
                 
             result = f"{day}.{month}.{year}"
-            print(f"Dopasowano format z kropkami: {result}")
+            log.debug("Dopasowano format z kropkami: %s", result)
             return result
             
         elif dash_match:
@@ -334,12 +789,12 @@ class PDFProcessor:
                 year = "20" + year
                 
             result = f"{day}.{month}.{year}"
-            print(f"Dopasowano format z myślnikami: {result}")
+            log.debug("Dopasowano format z myślnikami: %s", result)
             return result
         
         # Jeśli nie pasuje do wzorców, spróbuj odczytać same cyfry
         digits = re.findall(r'\d', clean_date)
-        print(f"Znalezione cyfry: {digits}")
+        log.debug("Znalezione cyfry: %s", digits)
         
         if len(digits) >= 4:  # co najmniej dzień i miesiąc
             day = ''.join(digits[0:2]).zfill(2)
@@ -353,36 +808,222 @@ class PDFProcessor:
                 year = datetime.now().strftime("%Y")
                 
             result = f"{day}.{month}.{year}"
-            print(f"Sformatowana data z cyfr: {result}")
+            log.debug("Sformatowana data z cyfr: %s", result)
             return result
         
-        print(f"Nie udało się sformatować daty - używam oryginalnego tekstu lub 'NIEZNANA'")
+        log.warning("Nie udało się sformatować daty - używam oryginalnego tekstu lub 'NIEZNANA'")
         return clean_date if clean_date else "NIEZNANA"
     
-    def extract_data_from_pdf_with_template(self, pdf_path):
-        """Ekstrakcja danych z PDF przy użyciu szablonu."""
+    def extract_data_from_pdf_with_template(self, pdf_path, render_full_page=True, file_hash=None):
+        """Ekstrakcja danych z PDF przy użyciu szablonu.
+        
+        Przy render_full_page=False renderowane są tylko obszary ROI szablonu,
+        a debug_info nie zawiera podglądu całej strony (tryb wsadowy).
+        Wylosowany dokument jest profilowany (utils/profiling.py).
+        """
+        with self.profiler.document(pdf_path):
+            return self._extract_documents([pdf_path], render_full_page, [file_hash])[0]
+    
+    def extract_data_from_pdfs_with_template(self, pdf_paths, render_full_page=False, file_hashes=None):
+        """Ekstrakcja danych z wielu plików PDF przy użyciu szablonu.
+        
+        Zwraca listę krotek (numer_zlecenia, numer_operatora, data_raportu, debug_info)
+        w kolejności plików. W trybie config.PADDLE_RECOGNITION_ONLY obrazy ROI
+        wszystkich dokumentów są rozpoznawane w jednym wsadowym wywołaniu PaddleOCR.
+        `file_hashes` to obliczone już skróty plików (klucze pamięci podręcznej stron).
+        Dokumenty wylosowane do profilowania przetwarzane są osobno, aby profil
+        dotyczył jednego dokumentu.
+        """
+        file_hashes = file_hashes or [None] * len(pdf_paths)
+        if not self.profiler.enabled:
+            return self._extract_documents(pdf_paths, render_full_page, file_hashes)
+        
+        selected = [self.profiler.select() for _ in pdf_paths]
+        results = [None] * len(pdf_paths)
+        rest = [i for i, profiled in enumerate(selected) if not profiled]
+        if rest:
+            extracted = self._extract_documents(
+                [pdf_paths[i] for i in rest], render_full_page, [file_hashes[i] for i in rest])
+            for i, result in zip(rest, extracted):
+                results[i] = result
+        for i in (i for i, profiled in enumerate(selected) if profiled):
+            with self.profiler.profile(pdf_paths[i]):
+                results[i] = self._extract_documents([pdf_paths[i]], render_full_page, [file_hashes[i]])[0]
+        return results
+    
+    def _extract_documents(self, pdf_paths, render_full_page, file_hashes):
+        """Rozpoznanie grupy dokumentów (wspólne wsadowe wywołanie OCR)."""
+        try:
+            # Pobranie szablonów (przy kilku szablon wybierany jest osobno dla każdego dokumentu)
+            templates = self.db_manager.get_templates()
+        except Exception as e:
+            log.error("Błąd podczas pobierania szablonu: %s", e)
+            return [("BŁĄD", "BŁĄD", "BŁĄD", None) for _ in pdf_paths]
+        
+        if not templates:
+            log.warning("Brak szablonu rozpoznawania")
+            return [("NIEZNANY", "NIEZNANY", "NIEZNANA", None) for _ in pdf_paths]
+        
+        if len(templates) == 1:
+            template = templates[0]
+            log.debug("Szablon rozpoznawania: ID=%s, Nazwa=%s", template[0], template[1])
+            log.debug("ROI dla numeru zlecenia: %s", template[2])
+            log.debug("ROI dla numeru operatora: %s", template[3])
+            log.debug("ROI dla daty: %s", template[4])
+        
+        documents = [
+            self._prepare_document(pdf_path, self.select_template(pdf_path, templates), render_full_page, file_hash)
+            for pdf_path, file_hash in zip(pdf_paths, file_hashes)
+        ]
+        self._recognize_documents([document for document in documents if document['result'] is None])
+        
+        results = []
+        for document in documents:
+            result = self._finish_document(document)
+            failed = result[3] is None or any(value in self.FAILED_VALUES for value in result[:3])
+            self.debug_sink.finish_document(document['debug'], failed=failed)
+            results.append(result)
+        return results
+    
+    def _prepare_document(self, pdf_path, template, render_full_page, file_hash=None):
+        """Renderowanie dokumentu - cała strona z wyciętymi ROI albo tylko obszary ROI."""
+        with self.metrics.span("czas_etapu_sekundy", etap="renderowanie"):
+            return self._render_document(pdf_path, template, render_full_page, file_hash)
+    
+    def _render_document(self, pdf_path, template, render_full_page, file_hash):
+        """Słownik dokumentu z wyrenderowanymi obrazami ROI (lub z wynikiem, gdy renderowanie się nie udało)."""
+        document = {
+            'pdf_path': pdf_path,
+            'template': template,
+            'debug': self.debug_sink.begin_document(pdf_path),
+            'image': None,
+            'roi_images': {},
+            'processed': None,  # obrazy ROI po przetwarzaniu wstępnym
+            'raw': {},
+            'result': None
+        }
+        
+        try:
+            if render_full_page:
+                # Konwersja pierwszej strony PDF do obrazu (potrzebny do podglądu)
+                image = self.pdf_to_pil_image(pdf_path, file_hash, debug=document['debug'])
+                if not image:
+                    log.warning("Nie udało się skonwertować PDF do obrazu")
+                    document['result'] = ("NIEZNANY", "NIEZNANY", "NIEZNANA", None)
+                    return document
+                
+                document['image'] = image
+                alignment = self.page_alignment(pdf_path, template, image=image)
+                document['roi_images'] = {
+                    roi_name: image.crop(roi)
+                    for roi_name, roi in self.template_regions(template, alignment).items()
+                }
+            else:
+                # Renderowanie wyłącznie obszarów ROI (po wyrównaniu do strony wzorcowej)
+                alignment = self.page_alignment(pdf_path, template, file_hash=file_hash)
+                roi_images = self.pdf_to_roi_images(pdf_path, template, file_hash, alignment)
+                if roi_images is None:
+                    log.warning("Nie udało się skonwertować PDF do obrazu")
+                    document['result'] = ("NIEZNANY", "NIEZNANY", "NIEZNANA", None)
+                    return document
+                document['roi_images'] = roi_images
+                
+        except Exception as e:
+            log.exception("Błąd podczas przetwarzania PDF: %s", e)
+            document['result'] = ("BŁĄD", "BŁĄD", "BŁĄD", None)
+        
+        return document
+    
+    def _preprocess_documents(self, documents):
+        """Równoległe przetwarzanie wstępne ROI dokumentów, które nie przeszły go wcześniej (np. w potoku)."""
+        for_paddle = self.uses_paddle()
+        pending = [document for document in documents if document.get('processed') is None]
+        start = time.perf_counter()
+        tasks = [
+            (document, roi_name, roi_image)
+            for document in pending
+            for roi_name, roi_image in document['roi_images'].items()
+            if roi_image is not None
+        ]
+        
+        processed = _get_roi_executor().map(
+            lambda task: preprocess_roi_image(task[2], task[1], for_paddle, task[0]['debug']), tasks)
+        for document in pending:
+            document['processed'] = {}
+        for (document, roi_name, _), processed_image in zip(tasks, processed):
+            document['processed'][roi_name] = processed_image
+        
+        # Dokumenty przetwarzane są razem - każdemu przypisujemy równą część czasu
+        elapsed = time.perf_counter() - start
+        for _ in pending:
+            self.metrics.observe("czas_etapu_sekundy", elapsed / len(pending), etap="przetwarzanie_wstepne")
+    
+    def _recognize_documents(self, documents):
+        """Rozpoznanie tekstu ze wszystkich ROI przygotowanych dokumentów."""
+        roi_names = [roi_name for roi_name, _ in self.TEMPLATE_ROIS]
+        self._preprocess_documents(documents)
+        start = time.perf_counter()
+        
+        keys = []
+        items = []
+        for document in documents:
+            for roi_name in roi_names:
+                roi_image = document['processed'].get(roi_name)
+                if roi_image is None:
+                    document['raw'][roi_name] = ""
+                    continue
+                keys.append((document, roi_name))
+                items.append((roi_image, roi_name, document['debug']))
+        
+        if self.paddle_ocr:
+            if not config.PADDLE_RECOGNITION_ONLY:
+                texts = [self.recognize_roi_with_paddle(*item, preprocessed=True) for item in items]
+            else:
+                # Jedno wsadowe wywołanie modelu rozpoznawania dla wszystkich dokumentów
+                log.debug("Wsadowe rozpoznawanie PaddleOCR: %s obszarów z %s dokumentów", len(items), len(documents))
+                texts = self.recognize_roi_images_with_paddle(items, preprocessed=True)
+        elif config.TESSERACT_MOSAIC:
+            # Jedno wywołanie Tesseract dla mozaiki ROI wszystkich dokumentów
+            log.debug("Mozaika Tesseract: %s obszarów z %s dokumentów", len(items), len(documents))
+            texts = self.recognize_roi_images_with_tesseract_mosaic(items, preprocessed=True)
+        else:
+            # Obszary ROI rozpoznawane równolegle
+            texts = list(_get_roi_executor().map(
+                lambda item: self.recognize_roi_with_tesseract(*item, preprocessed=True), items))
+        
+        for (document, roi_name), text in zip(keys, texts):
+            document['raw'][roi_name] = text
+        
+        elapsed = time.perf_counter() - start
+        for _ in documents:
+            self.metrics.observe("czas_etapu_sekundy", elapsed / len(documents), etap="ocr")
+    
+    def _finish_document(self, document):
+        """Formatowanie rozpoznanych pól i przygotowanie informacji diagnostycznych."""
+        if document['result'] is not None:
+            result = document['result']
+        else:
+            with self.metrics.span("czas_etapu_sekundy", etap="formatowanie"):
+                result = self._format_document(document, document['template'])
+        
+        if self.metrics.enabled():
+            failed_fields = [
+                (roi_name, value) for (roi_name, _), value in zip(self.TEMPLATE_ROIS, result[:3])
+                if value in self.FAILED_VALUES
+            ]
+            for roi_name, value in failed_fields:
+                self.metrics.inc("pola_nierozpoznane_total", pole=roi_name, wartosc=value)
+            outcome = "blad" if result[3] is None else "niepewny" if failed_fields else "ok"
+            self.metrics.inc("dokumenty_total", wynik=outcome)
+        return result
+    
+    def _format_document(self, document, template):
+        """Formatowanie pól rozpoznanych w dokumencie - krotka jak z extract_data_from_pdf_with_template."""
+        
         try:
-            # Pobranie szablonu
-            template = self.db_manager.get_template()
-            if not template:
-                print("Brak szablonu rozpoznawania")
-                return "NIEZNANY", "NIEZNANY", "NIEZNANA", None
-            
-            print(f"Szablon rozpoznawania: ID={template[0]}, Nazwa={template[1]}")
-            print(f"ROI dla numeru zlecenia: {template[2]}")
-            print(f"ROI dla numeru operatora: {template[3]}")
-            print(f"ROI dla daty: {template[4]}")
-            
-            # Konwersja PDF do obrazu używając popplera
-            image = self.pdf_to_pil_image(pdf_path)
-            if not image:
-                print("Nie udało się skonwertować PDF do obrazu")
-                return "NIEZNANY", "NIEZNANY", "NIEZNANA", None
-            
-            # Ekstrakcja tekstu z poszczególnych ROI
-            numer_zlecenia_raw = self.extract_text_from_roi(image, template[2], "numer_zlecenia")  # roi_numer_zlecenia
-            numer_operatora_raw = self.extract_text_from_roi(image, template[3], "numer_operatora")  # roi_numer_operatora
-            data_raportu_raw = self.extract_text_from_roi(image, template[4], "data")    # roi_data
+            numer_zlecenia_raw = document['raw'].get("numer_zlecenia", "")
+            numer_operatora_raw = document['raw'].get("numer_operatora", "")
+            data_raportu_raw = document['raw'].get("data", "")
             
             # Formatowanie numeru zlecenia według wzoru XXX-XXXX-XXXX-XXX
             numer_zlecenia = self.format_to_pattern(numer_zlecenia_raw)
@@ -395,10 +1036,12 @@ class PDFProcessor:
             # Formatowanie daty do dd.mm.yyyy
             data_raportu = self.format_date(data_raportu_raw)
             
-            # Zapisanie obrazu do debugowania
-            img_buffer = io.BytesIO()
-            image.save(img_buffer, format='PNG')
-            img_data = img_buffer.getvalue()
+            # Zapisanie obrazu do debugowania (tylko gdy renderowano całą stronę)
+            img_data = None
+            if document['image'] is not None:
+                img_buffer = io.BytesIO()
+                document['image'].save(img_buffer, format='PNG')
+                img_data = img_buffer.getvalue()
             
             # Słownik z informacjami diagnostycznymi
             debug_info = {
@@ -412,28 +1055,28 @@ class PDFProcessor:
                 'data_raportu_raw': data_raportu_raw
             }
             
-            print("Wykryte dane:")
-            print(f"Numer zlecenia: {numer_zlecenia} (surowy: {numer_zlecenia_raw})")
-            print(f"Numer operatora: {numer_operatora} (surowy: {numer_operatora_raw})")
-            print(f"Data: {data_raportu} (surowy: {data_raportu_raw})")
+            log.debug("Wykryte dane:")
+            log.debug("Numer zlecenia: %s (surowy: %s)", numer_zlecenia, numer_zlecenia_raw)
+            log.debug("Numer operatora: %s (surowy: %s)", numer_operatora, numer_operatora_raw)
+            log.debug("Data: %s (surowy: %s)", data_raportu, data_raportu_raw)
             
             return numer_zlecenia, numer_operatora, data_raportu, debug_info
             
         except Exception as e:
-            print(f"Błąd podczas przetwarzania PDF: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Błąd podczas przetwarzania PDF: %s", e)
             return "BŁĄD", "BŁĄD", "BŁĄD", None
     
-    def extract_data_from_pdf(self, pdf_path):
+    def extract_data_from_pdf(self, pdf_path, file_hash=None):
         """Główna funkcja ekstrakcji danych z PDF."""
         try:
             # Import dialogu lokalnie, aby uniknąć cyklicznych importów
+            from PyQt5.QtWidgets import QDialog
             from views.dialogs.ocr_dialog import OCRResultDialog
             from views.dialogs.manual_dialog import ManualDataEntryDialog
             
             # Próba ekstrakcji danych przy użyciu szablonu
-            numer_zlecenia, numer_operatora, data_raportu, debug_info = self.extract_data_from_pdf_with_template(pdf_path)
+            numer_zlecenia, numer_operatora, data_raportu, debug_info = self.extract_data_from_pdf_with_template(
+                pdf_path, file_hash=file_hash)
             
             # Jeśli nie ma informacji debugowania lub dane są niepoprawne
             if not debug_info or numer_zlecenia in ["BŁĄD", "NIEZNANY"]:
@@ -466,9 +1109,7 @@ class PDFProcessor:
             return numer_zlecenia, numer_operatora, data_raportu
             
         except Exception as e:
-            import traceback
-            print(f"Błąd podczas ekstrakji danych z PDF: {e}")
-            print(traceback.format_exc())
+            log.exception("Błąd podczas ekstrakji danych z PDF: %s", e)
             return None, None, None
 
 # Dodaj eksport klasy
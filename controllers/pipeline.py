@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+import time
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Rodzaje etapów potoku
+STAGE_THREAD = 'thread'    # wątki - etapy czekające na dysk, sieć lub biblioteki zwalniające GIL
+STAGE_PROCESS = 'process'  # procesy - etapy obliczeniowe w czystym Pythonie
+
+# Znacznik końca danych przekazywany między etapami
+_STOP = object()
+
+# Wynik potoku: numer elementu wejściowego, element, wartość po ostatnim etapie, wyjątek lub None
+PipelineResult = namedtuple('PipelineResult', ['index', 'item', 'value', 'error'])
+
+
+class Stage:
+    """Etap potoku - funkcja wykonywana przez `workers` wątków lub procesów.
+
+    Przy `batch_size` > 1 funkcja otrzymuje listę dostępnych od razu
+    elementów (najwyżej `batch_size`) i zwraca listę wyników tej samej
+    długości - np. dla wsadowego OCR wielu dokumentów. Funkcja etapu
+    procesowego oraz jego dane wejściowe i wyniki muszą dać się serializować
+    (pickle), a `initializer` uruchamiany jest raz w każdym procesie.
+    """
+    def __init__(self, name, function, workers=1, kind=STAGE_THREAD, batch_size=1,
+                 initializer=None, initargs=()):
+        if kind not in (STAGE_THREAD, STAGE_PROCESS):
+            raise ValueError(f"Nieznany rodzaj etapu potoku: {kind}")
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.kind = kind
+        self.batch_size = max(1, batch_size)
+        self.initializer = initializer
+        self.initargs = initargs
+
+
+class _Job:
+    """Element w drodze przez potok."""
+    __slots__ = ('index', 'item', 'value', 'error')
+
+    def __init__(self, index, item):
+        self.index = index
+        self.item = item
+        self.value = item
+        self.error = None
+
+
+class _StageStats:
+    """Liczniki etapu aktualizowane przez jego wykonawców."""
+    def __init__(self):
+        self.items = 0
+        self.errors = 0
+        self.calls = 0
+        self.busy = 0.0           # czas wykonywania funkcji etapu (suma po wykonawcach)
+        self.input_wait = 0.0     # czas oczekiwania na dane z poprzedniego etapu
+        self.output_wait = 0.0    # czas oczekiwania na miejsce w kolejce następnego etapu
+        self.queue_samples = 0
+        self.queue_total = 0
+        self.queue_max = 0
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    """Potok etapów połączonych ograniczonymi kolejkami.
+
+    Każdy etap ma własnych wykonawców, więc np. renderowanie kolejnego
+    dokumentu trwa w czasie, gdy poprzedni jest rozpoznawany. Kolejki między
+    etapami mieszczą najwyżej `queue_size` elementów - gdy późniejszy etap nie
+    nadąża, wcześniejsze czekają, a liczba dokumentów w pamięci pozostaje
+    ograniczona. Wyjątek w funkcji etapu nie zatrzymuje potoku - element
+    przechodzi przez pozostałe etapy bez przetwarzania i trafia do wyniku
+    z wypełnionym polem `error`.
+
+    stats() podaje dla każdego etapu m.in. obciążenie (część czasu, przez
+    którą wykonawcy byli zajęci) i średnie zapełnienie kolejki wejściowej -
+    etap o obciążeniu bliskim 1 i pełnej kolejce jest wąskim gardłem.
+    """
+    def __init__(self, stages, queue_size=config.PIPELINE_QUEUE_SIZE):
+        if not stages:
+            raise ValueError("Potok musi mieć co najmniej jeden etap")
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+        self._stats = [_StageStats() for _ in self.stages]
+        self._elapsed = 0.0
+        self._started = None
+
+    def run(self, items):
+        """Przepuszczenie elementów przez potok. Generator wyników (PipelineResult) w kolejności ukończenia."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        executors = []
+        threads = []
+        abort = threading.Event()
+
+        self._stats = [_StageStats() for _ in self.stages]
+        self._started = time.perf_counter()
+        try:
+            for position, stage in enumerate(self.stages):
+                executor = None
+                if stage.kind == STAGE_PROCESS:
+                    executor = ProcessPoolExecutor(max_workers=stage.workers, initializer=stage.initializer,
+                                                   initargs=stage.initargs)
+                    executors.append(executor)
+                remaining = [stage.workers]
+                for worker in range(stage.workers):
+                    thread = threading.Thread(
+                        target=self._stage_worker,
+                        args=(position, queues[position], queues[position + 1], executor, remaining, abort),
+                        name=f"pipeline-{stage.name}-{worker}", daemon=True
+                    )
+                    thread.start()
+                    threads.append(thread)
+
+            feeder = threading.Thread(target=self._feed, args=(items, queues[0], abort),
+                                      name="pipeline-feeder", daemon=True)
+            feeder.start()
+            threads.append(feeder)
+
+            output = queues[-1]
+            while True:
+                job = output.get()
+                if job is _STOP:
+                    break
+                yield PipelineResult(job.index, job.item, job.value, job.error)
+        finally:
+            # Przerwanie iteracji przez wywołującego - pozostałe elementy są tylko przepuszczane do końca
+            abort.set()
+            if threads:
+                while any(thread.is_alive() for thread in threads):
+                    try:
+                        queues[-1].get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+            for executor in executors:
+                executor.shutdown()
+            self._elapsed = time.perf_counter() - self._started
+
+    def _feed(self, items, output, abort):
+        """Wątek podający elementy wejściowe do pierwszego etapu."""
+        try:
+            for index, item in enumerate(items):
+                if abort.is_set():
+                    break
+                output.put(_Job(index, item))
+        finally:
+            for _ in range(self.stages[0].workers):
+                output.put(_STOP)
+
+    def _stage_worker(self, position, input_queue, output_queue, executor, remaining, abort):
+        """Wykonawca etapu - pobieranie grup elementów, wywołanie funkcji i przekazanie dalej."""
+        stage = self.stages[position]
+        stats = self._stats[position]
+        init_error = None
+        if executor is None and stage.initializer is not None:
+            try:
+                stage.initializer(*stage.initargs)
+            except Exception as e:
+                # Wykonawca nadal przekazuje elementy dalej (z błędem), aby potok się nie zatrzymał
+                log.error("Błąd inicjalizacji etapu %s: %s", stage.name, e)
+                init_error = e
+
+        stopping = False
+        while not stopping:
+            waited = time.perf_counter()
+            queued = input_queue.qsize()
+            job = input_queue.get()
+            waited = time.perf_counter() - waited
+            if job is _STOP:
+                break
+
+            batch = [job]
+            while len(batch) < stage.batch_size:
+                try:
+                    job = input_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stopping = True
+                    break
+                batch.append(job)
+
+            if init_error is not None:
+                for job in batch:
+                    job.error = job.error or init_error
+
+            started = time.perf_counter()
+            self._call_stage(stage, batch, executor, abort)
+            busy = time.perf_counter() - started
+
+            blocked = time.perf_counter()
+            for job in batch:
+                output_queue.put(job)
+            blocked = time.perf_counter() - blocked
+
+            with stats.lock:
+                stats.items += len(batch)
+                stats.errors += sum(1 for job in batch if job.error is not None)
+                stats.calls += 1
+                stats.busy += busy
+                stats.input_wait += waited
+                stats.output_wait += blocked
+                stats.queue_samples += 1
+                stats.queue_total += queued
+                stats.queue_max = max(stats.queue_max, queued)
+
+        # Ostatni kończący wykonawca etapu zamyka wejście następnego etapu
+        with stats.lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            following = self.stages[position + 1].workers if position + 1 < len(self.stages) else 1
+            for _ in range(following):
+                output_queue.put(_STOP)
+
+    def _call_stage(self, stage, batch, executor, abort):
+        """Wywołanie funkcji etapu dla grupy elementów (elementy z błędem są pomijane)."""
+        active = [job for job in batch if job.error is None]
+        if not active or abort.is_set():
+            return
+
+        values = [job.value for job in active]
+        try:
+            if stage.batch_size > 1:
+                arguments = (values,)
+            else:
+                arguments = (values[0],)
+
+            if executor is not None:
+                result = executor.submit(stage.function, *arguments).result()
+            else:
+                result = stage.function(*arguments)
+
+            results = result if stage.batch_size > 1 else [result]
+            if len(results) != len(active):
+                raise ValueError(f"Etap {stage.name} zwrócił {len(results)} wyników dla {len(active)} elementów")
+        except Exception as e:
+            for job in active:
+                job.error = e
+            return
+
+        for job, value in zip(active, results):
+            job.value = value
+
+    def stats(self):
+        """Statystyki etapów ostatniego (lub trwającego) przebiegu - lista słowników w kolejności etapów."""
+        elapsed = self._elapsed
+        if self._started is not None and not elapsed:
+            elapsed = time.perf_counter() - self._started
+
+        result = []
+        for stage, stats in zip(self.stages, self._stats):
+            with stats.lock:
+                result.append({
+                    'etap': stage.name,
+                    'rodzaj': stage.kind,
+                    'wykonawcow': stage.workers,
+                    'elementow': stats.items,
+                    'bledow': stats.errors,
+                    'wywolan': stats.calls,
+                    'czas_pracy': stats.busy,
+                    'obciazenie': stats.busy / (stage.workers * elapsed) if elapsed > 0 else 0.0,
+                    'oczekiwanie_na_wejscie': stats.input_wait,
+                    'oczekiwanie_na_wyjscie': stats.output_wait,
+                    'kolejka_srednio': stats.queue_total / stats.queue_samples if stats.queue_samples else 0.0,
+                    'kolejka_max': stats.queue_max,
+                    'czas_na_element': stats.busy / stats.items if stats.items else 0.0,
+                })
+        return result
+
+
+def format_pipeline_stats(stats, queue_size=config.PIPELINE_QUEUE_SIZE):
+    """Tabela statystyk etapów do wypisania w konsoli."""
+    lines = [
+        "",
+        "Etapy potoku:",
+        f"  {'Etap':<12} {'Rodzaj':<8} {'Wyk.':>4} {'Elem.':>7} {'Obciąż.':>8} {'ms/elem.':>9} "
+        f"{f'Kolejka/{queue_size} śr./max':>20} {'Czeka wej.':>11} {'Czeka wyj.':>11}",
+    ]
+    for stage in stats:
+        lines.append(
+            f"  {stage['etap']:<12} {stage['rodzaj']:<8} {stage['wykonawcow']:>4} {stage['elementow']:>7} "
+            f"{stage['obciazenie'] * 100:7.1f}% {stage['czas_na_element'] * 1000:9.1f} "
+            f"{stage['kolejka_srednio']:14.1f} / {stage['kolejka_max']:<3} "
+            f"{stage['oczekiwanie_na_wejscie']:10.2f}s {stage['oczekiwanie_na_wyjscie']:10.2f}s"
+        )
+    return "\n".join(lines)
+
+
+__all__ = ['Pipeline', 'Stage', 'PipelineResult', 'format_pipeline_stats', 'STAGE_THREAD', 'STAGE_PROCESS']
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import threading
+
+from PyQt5.QtCore import QCoreApplication, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+import config
+from database.db_manager import QUERY_ALL, QUERY_SEARCH, QUERY_SEGMENT, QUERY_DATE_RANGE
+
+
+class _SearchWorker(QObject):
+    """Wykonywanie zapytań w osobnym wątku, na własnym połączeniu z bazą."""
+    finished = pyqtSignal(int, object, object, object)  # numer zapytania, zapytanie, sortowanie, pierwsza strona
+    failed = pyqtSignal(int, str)  # numer zapytania, komunikat błędu
+    page_finished = pyqtSignal(object, object, object, object)  # zapytanie, sortowanie, klucz, strona (lub None)
+
+    def __init__(self, db_name, is_current, page_size):
+        super().__init__()
+        self.db_name = db_name
+        self.is_current = is_current
+        self.page_size = page_size
+        self.db_manager = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    @pyqtSlot(int, object, object)
+    def run_query(self, generation, query, sort):
+        """Wykonanie zapytania, o ile w międzyczasie nie pojawiło się nowsze."""
+        if not self.is_current(generation):
+            return
+
+        self._open()
+
+        # Drugie podejście na wypadek, gdy przerwanie przeznaczone dla poprzedniego
+        # zapytania trafiło w bieżące
+        for _ in range(2):
+            with self._lock:
+                self._running = True
+            try:
+                # Tylko pierwsza strona - kolejne doczytuje model tabeli przy przewijaniu
+                rows = self.db_manager.fetch_reports_page(query, limit=self.page_size, sort=sort)
+                break
+            except sqlite3.OperationalError as e:
+                if not self.is_current(generation):
+                    return
+                if str(e) != "interrupted":
+                    self.failed.emit(generation, str(e))
+                    return
+            finally:
+                with self._lock:
+                    self._running = False
+        else:
+            return
+
+        if self.is_current(generation):
+            self.finished.emit(generation, query, sort, rows)
+
+    @pyqtSlot(object, object, object)
+    def run_page(self, query, sort, after):
+        """Pobranie kolejnej strony wyników za kluczem `after` (None w wyniku - zapytanie przerwane lub błąd)."""
+        self._open()
+        with self._lock:
+            self._running = True
+        try:
+            rows = self.db_manager.fetch_reports_page(query, after=after, limit=self.page_size, sort=sort)
+        except sqlite3.OperationalError:
+            # Przerwane przez nowsze wyszukiwanie - model ponowi prośbę przy kolejnym przewinięciu
+            rows = None
+        finally:
+            with self._lock:
+                self._running = False
+        self.page_finished.emit(query, sort, after, rows)
+
+    def _open(self):
+        if self.db_manager is None:
+            # Import lokalny - połączenie SQLite musi powstać w wątku, który z niego korzysta
+            from database.db_manager import DatabaseManager
+            self.db_manager = DatabaseManager(self.db_name)
+
+    def interrupt(self):
+        """Przerwanie trwającego zapytania (wywoływane z wątku interfejsu)."""
+        with self._lock:
+            if self._running and self.db_manager is not None:
+                self.db_manager.conn.interrupt()
+
+    @pyqtSlot()
+    def close(self):
+        """Zamknięcie połączenia z bazą (w wątku wyszukiwania)."""
+        if self.db_manager is not None:
+            self.db_manager.close()
+            self.db_manager = None
+
+
+class SearchController(QObject):
+    """Wyszukiwanie i filtrowanie raportów w tle, bez blokowania interfejsu.
+
+    Kolejne zmiany tekstu są zbierane przez `debounce_ms`, zanim zapytanie
+    trafi do wątku roboczego. Każde żądanie dostaje nowy numer - trwające
+    zapytanie o starszym numerze jest przerywane, a wyniki nieaktualnych
+    zapytań są odrzucane, więc results_ready przekazuje tylko wynik
+    najnowszego żądania - zapytanie, sortowanie i pierwszą stronę wierszy.
+    Wybrane sortowanie obowiązuje także dla kolejnych wyszukiwań i filtrów.
+    Kolejne strony wyników (fetch_page) również pobierane są w wątku
+    wyszukiwania i przekazywane przez page_ready.
+    """
+    results_ready = pyqtSignal(object, object, object)
+    search_failed = pyqtSignal(str)
+    page_ready = pyqtSignal(object, object, object, object)
+    _query_requested = pyqtSignal(int, object, object)
+    _page_requested = pyqtSignal(object, object, object)
+
+    def __init__(self, db_name=config.DB_NAME, debounce_ms=config.SEARCH_DEBOUNCE_MS,
+                 page_size=config.TABLE_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self._generation = 0
+        self._pending = None
+        self._query = (QUERY_ALL, ())
+        self._sort = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._dispatch)
+
+        self._thread = QThread(self)
+        self._worker = _SearchWorker(db_name, self.is_current, page_size)
+        self._worker.moveToThread(self._thread)
+        self._query_requested.connect(self._worker.run_query)
+        self._page_requested.connect(self._worker.run_page)
+        self._worker.page_finished.connect(self.page_ready)
+        self._worker.finished.connect(self._on_finished)
+        self._worker.failed.connect(self._on_failed)
+        # Sygnał finished jest emitowany w wątku wyszukiwania - tam zamykane jest połączenie
+        self._thread.finished.connect(self._worker.close)
+        self._thread.start()
+
+        # Wątek musi zostać zatrzymany także wtedy, gdy aplikacja kończy się bez zamknięcia okna
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def is_current(self, generation):
+        """Sprawdzenie, czy zapytanie o danym numerze jest nadal najnowsze."""
+        return generation == self._generation
+
+    def search(self, search_text):
+        """Wyszukiwanie tekstu (pusty tekst - wszystkie raporty)."""
+        if search_text:
+            self._request(QUERY_SEARCH, (search_text,))
+        else:
+            self._request(QUERY_ALL, ())
+
+    def filter_segment(self, segment_index, segment_value):
+        """Filtrowanie po segmencie numeru zlecenia (pusta wartość - wszystkie raporty)."""
+        if segment_value:
+            self._request(QUERY_SEGMENT, (segment_index, segment_value))
+        else:
+            self._request(QUERY_ALL, ())
+
+    def filter_date_range(self, date_from, date_to):
+        """Filtrowanie po przedziale dat raportu (date lub None - przedział otwarty z tej strony)."""
+        self._request(QUERY_DATE_RANGE, (date_from, date_to))
+
+    def load_all(self):
+        """Natychmiastowe wczytanie wszystkich raportów (bez opóźnienia)."""
+        self._request(QUERY_ALL, (), immediate=True)
+
+    @property
+    def query(self):
+        """Ostatnio zlecone zapytanie (rodzaj, parametry)."""
+        return self._query
+
+    def restore(self, query):
+        """Natychmiastowe ponowienie wcześniejszego zapytania (np. zapamiętanego z `query`)."""
+        self._request(*query, immediate=True)
+
+    def fetch_page(self, query, sort, after):
+        """Pobranie w tle strony wyników za kluczem `after` - wynik przez page_ready.
+
+        page_ready przekazuje (zapytanie, sortowanie, klucz, wiersze); wiersze
+        są None, gdy pobranie przerwało nowsze wyszukiwanie.
+        """
+        self._page_requested.emit(query, sort, after)
+
+    def set_sort(self, sort):
+        """Zmiana sortowania (numer kolumny, malejąco) - natychmiastowe ponowienie ostatniego zapytania."""
+        self._sort = sort
+        self._request(*self._query, immediate=True)
+
+    def _request(self, kind, params, immediate=False):
+        """Zarejestrowanie nowego żądania - unieważnia wszystkie wcześniejsze."""
+        self._generation += 1
+        self._query = (kind, params)
+        self._pending = (self._query, self._sort)
+        self._worker.interrupt()
+
+        if immediate:
+            self._timer.stop()
+            self._dispatch()
+        else:
+            self._timer.start()
+
+    def _dispatch(self):
+        """Przekazanie oczekującego żądania do wątku wyszukiwania."""
+        if self._pending is None:
+            return
+        query, sort = self._pending
+        self._pending = None
+        self._query_requested.emit(self._generation, query, sort)
+
+    def _on_finished(self, generation, query, sort, rows):
+        if self.is_current(generation):
+            self.results_ready.emit(query, sort, rows)
+
+    def _on_failed(self, generation, message):
+        if self.is_current(generation):
+            self.search_failed.emit(message)
+
+    def shutdown(self):
+        """Zatrzymanie wątku wyszukiwania (przy zamykaniu okna lub aplikacji)."""
+        if not self._thread.isRunning():
+            return
+        self._timer.stop()
+        self._generation += 1
+        self._pending = None
+        self._worker.interrupt()
+        self._thread.quit()
+        self._thread.wait()
+
+
+__all__ = ['SearchController']
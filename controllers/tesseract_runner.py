@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import shlex
+import functools
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+import config
+from utils.metrics import get_metrics, METRICS_DETAILED
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Co ile sekund proces tesseract sprawdza, czy nie został anulowany
+POLL_INTERVAL = 0.02
+
+_executor = None
+_executor_lock = threading.Lock()
+# Limit jednoczesnych procesów tesseract w tym procesie (None - config.TESSERACT_MAX_WORKERS)
+_max_workers = None
+
+
+class TesseractCancelled(Exception):
+    """Uruchomienie tesseract zostało anulowane, bo znany jest już wynik o wyższym priorytecie."""
+
+
+def get_config_executor():
+    """Wspólna, ograniczona pula wątków dla równoległych uruchomień tesseract."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers or config.TESSERACT_MAX_WORKERS,
+                                           thread_name_prefix="tesseract")
+        return _executor
+
+
+def limit_worker_processes(processes):
+    """Podział limitu config.TESSERACT_MAX_WORKERS między `processes` procesów roboczych puli.
+
+    Wywoływane w procesie roboczym przed pierwszym rozpoznawaniem. Każdy
+    proces tesseract dostaje też jeden wątek OpenMP (OMP_THREAD_LIMIT, o ile
+    nie ustawiono go inaczej) - równoległość zapewniają procesy, a nie wątki
+    wewnątrz nich, więc łącznie działa ich najwyżej tyle, ile rdzeni.
+    """
+    global _max_workers
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    with _executor_lock:
+        _max_workers = max(1, config.TESSERACT_MAX_WORKERS // max(1, processes))
+
+
+def run_tesseract(image, tesseract_config, cancel_event=None, tesseract_cmd=None):
+    """Rozpoznanie tekstu z obrazu PIL jednym procesem tesseract, który można przerwać.
+
+    Obraz przekazywany jest przez stdin jako PNG, wynik odczytywany ze stdout.
+    Ustawienie `cancel_event` w trakcie działania zabija proces i zgłasza
+    TesseractCancelled.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise TesseractCancelled()
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+
+    command = [tesseract_cmd or config.TESSERACT_PATH, 'stdin', 'stdout'] + shlex.split(tesseract_config)
+    with get_metrics().span("czas_wywolania_ocr_sekundy", METRICS_DETAILED, silnik="tesseract"):
+        return _communicate(command, buffer.getvalue(), cancel_event)
+
+
+def _communicate(command, data, cancel_event):
+    """Uruchomienie procesu tesseract z obrazem na stdin - tekst ze stdout."""
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    while True:
+        try:
+            stdout, stderr = process.communicate(input=data, timeout=POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            # Dane wejściowe przekazuje się tylko przy pierwszym wywołaniu communicate
+            data = None
+            if cancel_event is not None and cancel_event.is_set():
+                process.kill()
+                process.communicate()
+                raise TesseractCancelled()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"tesseract zakończył się kodem {process.returncode}: "
+                           f"{stderr.decode('utf-8', errors='replace').strip()}")
+    return stdout.decode('utf-8', errors='replace').strip()
+
+
+def run_with_priority_fallback(image, configs, executor=None):
+    """Równoległe uruchomienie konfiguracji tesseract w kolejności priorytetu.
+
+    `configs` to lista (konfiguracja, nazwa) od najważniejszej. Wynikiem jest
+    pierwszy niepusty tekst w kolejności priorytetu (tekst, nazwa) - jak przy
+    uruchamianiu po kolei - ale czas oczekiwania to czas najwolniejszej
+    potrzebnej konfiguracji, a nie suma wszystkich. Gdy tylko któraś
+    konfiguracja da niepusty wynik, uruchomienia o niższym priorytecie są
+    anulowane (oczekujące nie startują, działające procesy są zabijane) - także
+    wtedy, gdy konfiguracje o wyższym priorytecie jeszcze działają, aby nie
+    zajmowały wspólnego limitu config.TESSERACT_MAX_WORKERS.
+    """
+    executor = executor or get_config_executor()
+    cancel_events = [threading.Event() for _ in configs]
+    futures = [
+        executor.submit(run_tesseract, image, tesseract_config, cancel_event)
+        for (tesseract_config, _), cancel_event in zip(configs, cancel_events)
+    ]
+
+    def cancel_lower(index, future):
+        # Niepusty wynik - konfiguracje o niższym priorytecie nie mogą już zostać wybrane
+        if not future.cancelled() and future.exception() is None and future.result():
+            for cancel_event, lower in zip(cancel_events[index + 1:], futures[index + 1:]):
+                cancel_event.set()
+                lower.cancel()
+
+    for index, future in enumerate(futures):
+        future.add_done_callback(functools.partial(cancel_lower, index))
+
+    try:
+        for index, ((_, config_name), future) in enumerate(zip(configs, futures)):
+            try:
+                text = future.result()
+            except (TesseractCancelled, CancelledError):
+                text = ""
+            log.debug("OCR (%s): '%s'", config_name, text)
+
+            if text:
+                return text, config_name
+        return "", None
+    finally:
+        # Anulowanie wszystkich jeszcze niezakończonych uruchomień
+        for cancel_event, future in zip(cancel_events, futures):
+            cancel_event.set()
+            future.cancel()
+
+
+__all__ = ['run_tesseract', 'run_with_priority_fallback', 'get_config_executor', 'TesseractCancelled']
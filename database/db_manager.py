@@ -1,16 +1,84 @@
 # -*- coding: utf-8 -*-
 
 import sqlite3
-from datetime import datetime
+from datetime import date, datetime
 import config
+from utils.metrics import get_metrics
+
+# Wstawianie raportu - wspólne dla zapisu pojedynczego i wsadowego
+INSERT_REPORT_SQL = '''
+INSERT INTO raporty (numer_zlecenia, numer_operatora, data_raportu, data_raportu_iso,
+                   segment1, segment2, segment3, segment4,
+                   sciezka_pdf, data_importu, hash_pdf)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Wersja schematu zapisywana w PRAGMA user_version - każda kolejna wersja ma metodę _migrate_to_<n>
+SCHEMA_VERSION = 7
+
+# Najwięcej parametrów jednego zapytania (domyślny limit starszych wersji SQLite)
+SQL_PARAMETERS_LIMIT = 999
+
+# Trafność wyniku wyszukiwania pełnotekstowego (parametry - szukany tekst małymi literami):
+# 2 - pole równe szukanemu tekstowi, 1 - pole zaczynające się od niego, 0 - fragment pola
+SEARCH_RANK_SQL = """(
+    CASE
+        WHEN lower(r.numer_zlecenia) = ? OR lower(r.numer_operatora) = ? OR lower(r.data_raportu) = ? THEN 2
+        WHEN instr(lower(r.numer_zlecenia), ?) = 1 OR instr(lower(r.numer_operatora), ?) = 1
+             OR instr(lower(r.data_raportu), ?) = 1 THEN 1
+        ELSE 0
+    END)"""
+
+# Najkrótszy tekst, który indeks trygramowy potrafi wyszukać
+FTS_MIN_QUERY_LENGTH = 3
+
+# Rodzaje zapytań o listę raportów (pierwszy element pary (rodzaj, parametry))
+QUERY_ALL = 'all'
+QUERY_SEARCH = 'search'
+QUERY_SEGMENT = 'segment'
+QUERY_DATE_RANGE = 'date_range'
+
+# Format daty raportu wyświetlanej i zapisywanej w kolumnie data_raportu
+REPORT_DATE_FORMAT = "%d.%m.%Y"
+
+# Klucz chronologicznego sortowania daty dd.mm.yyyy (yyyymmdd) - indeks z wersji 3 schematu,
+# zastąpiony w wersji 4 kolumną data_raportu_iso
+DATE_SORT_KEY = "substr({0}data_raportu, 7, 4) || substr({0}data_raportu, 4, 2) || substr({0}data_raportu, 1, 2)"
+
+# Wyrażenia sortowania dla kolumn tabeli raportów (w kolejności kolumn widoku)
+SORT_COLUMNS = ('r.id', 'r.numer_zlecenia', 'r.numer_operatora', 'r.data_raportu_iso',
+                'r.sciezka_pdf', 'r.data_importu')
 
 
 class DatabaseManager:
     def __init__(self, db_name=config.DB_NAME):
         """Inicjalizacja menedżera bazy danych."""
+        self.db_name = db_name
         self.conn = sqlite3.connect(db_name)
         self.cursor = self.conn.cursor()
+        self.configure_connection()
         self.create_tables()
+        self.fts_enabled = self._table_exists("raporty_fts")
+
+    def configure_connection(self):
+        """Ustawienia SQLite: dziennik WAL (czytelnicy nie blokują zapisu) i poziom synchronizacji."""
+        self.cursor.execute(f"PRAGMA journal_mode={config.DB_JOURNAL_MODE}")
+        self.cursor.execute(f"PRAGMA synchronous={config.DB_SYNCHRONOUS}")
+        self.cursor.execute(f"PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT * 1000)}")
+
+    def _table_exists(self, name):
+        """Sprawdzenie, czy w bazie istnieje tabela (także wirtualna) o podanej nazwie."""
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        return self.cursor.fetchone() is not None
+
+    def fts5_available(self):
+        """Sprawdzenie, czy biblioteka SQLite obsługuje FTS5 z tokenizerem trygramowym (SQLite >= 3.34)."""
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE temp._fts5_test USING fts5(x, tokenize='trigram')")
+            self.conn.execute("DROP TABLE temp._fts5_test")
+            return True
+        except sqlite3.OperationalError:
+            return False
 
     def create_tables(self):
         """Tworzenie tabeli raportów jeśli nie istnieje."""
@@ -41,10 +109,129 @@ class DatabaseManager:
         ''')
         
         self.conn.commit()
+        self.upgrade_schema()
 
-    def insert_report(self, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf):
-        """Wstawianie nowego raportu do bazy danych."""
-        # Podział numeru zlecenia na segmenty
+    def upgrade_schema(self):
+        """Automatyczna aktualizacja schematu istniejącej bazy do SCHEMA_VERSION."""
+        while True:
+            # Każda migracja wraz ze zmianą numeru wersji wykonuje się w jednej transakcji.
+            # BEGIN IMMEDIATE blokuje zapis, więc równolegle otwierające bazę procesy
+            # (np. import wsadowy) nie wykonają tej samej migracji dwukrotnie.
+            with self.conn:
+                self.cursor.execute("BEGIN IMMEDIATE")
+                version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+                if version >= SCHEMA_VERSION:
+                    break
+                version += 1
+                getattr(self, f"_migrate_to_{version}")()
+                self.cursor.execute(f"PRAGMA user_version = {version}")
+            print(f"Zaktualizowano schemat bazy danych do wersji {version}")
+
+    def _migrate_to_1(self):
+        """Indeksy dla sortowania po dacie importu i filtrowania po segmentach."""
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_raporty_data_importu ON raporty (data_importu)")
+        for segment_index in range(1, 5):
+            self.cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_raporty_segment{segment_index}
+            ON raporty (segment{segment_index}, data_importu)
+            ''')
+        # Statystyki dla planisty zapytań
+        self.cursor.execute("ANALYZE")
+
+    def _migrate_to_2(self):
+        """Indeks pełnotekstowy FTS5 (trygramy) dla wyszukiwania fragmentów numerów i dat."""
+        if not self.fts5_available():
+            print("SQLite bez obsługi FTS5 (trigram) - wyszukiwanie będzie używać LIKE")
+            return
+        
+        # Tabela z zewnętrzną treścią - przechowuje tylko indeks, dane pozostają w raporty
+        self.cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS raporty_fts USING fts5(
+            numer_zlecenia, numer_operatora, data_raportu,
+            content='raporty', content_rowid='id', tokenize='trigram'
+        )
+        ''')
+        
+        # Wyzwalacze utrzymujące indeks w zgodzie z tabelą raporty
+        self.cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS raporty_fts_insert AFTER INSERT ON raporty BEGIN
+            INSERT INTO raporty_fts (rowid, numer_zlecenia, numer_operatora, data_raportu)
+            VALUES (new.id, new.numer_zlecenia, new.numer_operatora, new.data_raportu);
+        END
+        ''')
+        self.cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS raporty_fts_delete AFTER DELETE ON raporty BEGIN
+            INSERT INTO raporty_fts (raporty_fts, rowid, numer_zlecenia, numer_operatora, data_raportu)
+            VALUES ('delete', old.id, old.numer_zlecenia, old.numer_operatora, old.data_raportu);
+        END
+        ''')
+        self.cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS raporty_fts_update
+        AFTER UPDATE OF numer_zlecenia, numer_operatora, data_raportu ON raporty BEGIN
+            INSERT INTO raporty_fts (raporty_fts, rowid, numer_zlecenia, numer_operatora, data_raportu)
+            VALUES ('delete', old.id, old.numer_zlecenia, old.numer_operatora, old.data_raportu);
+            INSERT INTO raporty_fts (rowid, numer_zlecenia, numer_operatora, data_raportu)
+            VALUES (new.id, new.numer_zlecenia, new.numer_operatora, new.data_raportu);
+        END
+        ''')
+        
+        # Zbudowanie indeksu dla raportów zapisanych przed migracją
+        self.cursor.execute("INSERT INTO raporty_fts (raporty_fts) VALUES ('rebuild')")
+
+    def _migrate_to_3(self):
+        """Indeksy dla sortowania tabeli po numerze zlecenia, numerze operatora i dacie raportu."""
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_raporty_numer_zlecenia ON raporty (numer_zlecenia)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_raporty_numer_operatora ON raporty (numer_operatora)")
+        # Indeks na wyrażeniu - data dd.mm.yyyy sortowana chronologicznie
+        self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_raporty_data_raportu ON raporty ({DATE_SORT_KEY.format('')})")
+        self.cursor.execute("ANALYZE")
+
+    def _migrate_to_4(self):
+        """Kolumna z datą raportu w formacie ISO (yyyy-mm-dd) - sortowanie i zapytania zakresowe po dacie."""
+        # Pusty tekst (zamiast NULL) dla nierozpoznanych dat - klucz sortowania nigdy nie jest NULL
+        self.cursor.execute("ALTER TABLE raporty ADD COLUMN data_raportu_iso TEXT NOT NULL DEFAULT ''")
+        
+        # Uzupełnienie istniejących raportów tą samą konwersją, której używa zapis
+        rows = self.conn.execute("SELECT id, data_raportu FROM raporty").fetchall()
+        self.cursor.executemany(
+            "UPDATE raporty SET data_raportu_iso = ? WHERE id = ?",
+            ((self.date_to_iso(data_raportu), report_id) for report_id, data_raportu in rows)
+        )
+        
+        self.cursor.execute("DROP INDEX IF EXISTS idx_raporty_data_raportu")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_raporty_data_raportu_iso ON raporty (data_raportu_iso)")
+        self.cursor.execute("ANALYZE")
+
+    def _migrate_to_5(self):
+        """Skrót SHA-256 zawartości pliku PDF - rozpoznawanie już zaimportowanych plików."""
+        # Raporty sprzed migracji nie mają skrótu (NULL) - indeks unikalny obejmuje tylko znane skróty
+        self.cursor.execute("ALTER TABLE raporty ADD COLUMN hash_pdf TEXT")
+        self.cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_raporty_hash_pdf
+        ON raporty (hash_pdf) WHERE hash_pdf IS NOT NULL
+        ''')
+
+    def _migrate_to_6(self):
+        """Odcisk strony wzorcowej szablonu - wybór szablonu dla dokumentu przy wielu szablonach."""
+        # Szablony sprzed migracji nie mają odcisku (NULL) - są rezerwowe dla stron niepodobnych do pozostałych
+        # (PDFProcessor.select_template); odcisk można uzupełnić z przykładowego PDF (update_template_reference)
+        self.cursor.execute("ALTER TABLE szablony ADD COLUMN odcisk TEXT")
+
+    def _migrate_to_7(self):
+        """Strona wzorcowa szablonu w niskiej rozdzielczości - wyrównanie ROI do przesunięcia i skosu skanu."""
+        self.cursor.execute("ALTER TABLE szablony ADD COLUMN strona_wzorcowa BLOB")
+
+    def date_to_iso(self, data_raportu):
+        """Data raportu dd.mm.yyyy (tekst, date lub datetime) jako yyyy-mm-dd; pusty tekst, gdy to nie data."""
+        if isinstance(data_raportu, (date, datetime)):
+            return data_raportu.strftime("%Y-%m-%d")
+        try:
+            return datetime.strptime(data_raportu, REPORT_DATE_FORMAT).strftime("%Y-%m-%d")
+        except (TypeError, ValueError):
+            return ''
+
+    def split_segments(self, numer_zlecenia):
+        """Podział numeru zlecenia na cztery segmenty (brakujące segmenty są puste)."""
         segments = numer_zlecenia.split('-')
         segment1, segment2, segment3, segment4 = '', '', '', ''
         
@@ -56,27 +243,94 @@ class DatabaseManager:
             segment3 = segments[2]
         if len(segments) >= 4:
             segment4 = segments[3]
-            
+        
+        return segment1, segment2, segment3, segment4
+
+    def _report_values(self, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu,
+                       hash_pdf=None):
+        """Wartości kolumn dla instrukcji INSERT_REPORT_SQL."""
+        return ((numer_zlecenia, numer_operatora, data_raportu, self.date_to_iso(data_raportu))
+                + self.split_segments(numer_zlecenia)
+                + (sciezka_pdf, data_importu, hash_pdf))
+
+    def insert_report(self, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, hash_pdf=None):
+        """Wstawianie nowego raportu do bazy danych. Zwraca wstawiony wiersz (jak get_report_row).
+
+        Raport o skrócie `hash_pdf` już zapisanym w bazie powoduje sqlite3.IntegrityError.
+        """
         data_importu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
+        with get_metrics().span("czas_zapisu_bazy_sekundy", tryb="pojedynczy"):
+            self.cursor.execute(INSERT_REPORT_SQL, self._report_values(
+                numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu, hash_pdf))
+            self.conn.commit()
+        get_metrics().inc("zapisane_raporty_total")
+        return (self.cursor.lastrowid, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu)
+
+    def insert_reports_bulk(self, reports):
+        """Wstawianie wielu raportów w jednej transakcji (jedno zatwierdzenie zamiast jednego na raport).
+        
+        `reports` to dowolny iterowalny zbiór krotek
+        (numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf[, hash_pdf]).
+        Raporty o skrócie pliku już zapisanym w bazie są pomijane, aby jeden
+        powtórzony plik nie wycofywał całej grupy. Zwraca listę znaczników
+        w kolejności `reports` - True dla raportu wstawionego, False dla
+        pominiętego. Przy innym błędzie cała transakcja jest wycofywana.
+        """
+        data_importu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [self._report_values(*report[:4], data_importu, *report[4:]) for report in reports]
+        
+        # Blok with zatwierdza transakcję lub wycofuje ją w razie wyjątku. BEGIN IMMEDIATE
+        # blokuje zapis innych połączeń między odczytem znanych skrótów a wstawieniem grupy.
+        with self.conn:
+            self.cursor.execute("BEGIN IMMEDIATE")
+            seen = self._existing_hashes(row[-1] for row in rows)
+            inserted = []
+            for row in rows:
+                # Wśród powtórzeń skrótu w samej grupie wstawiany jest pierwszy raport
+                inserted.append(row[-1] is None or row[-1] not in seen)
+                seen.add(row[-1])
+            self.cursor.executemany(INSERT_REPORT_SQL + "ON CONFLICT DO NOTHING", rows)
+        return inserted
+
+    def _existing_hashes(self, hashes):
+        """Skróty spośród `hashes` zapisane już w bazie (zapytania IN w porcjach - limit parametrów SQLite)."""
+        hashes = list({hash_pdf for hash_pdf in hashes if hash_pdf is not None})
+        existing = set()
+        for start in range(0, len(hashes), SQL_PARAMETERS_LIMIT):
+            chunk = hashes[start:start + SQL_PARAMETERS_LIMIT]
+            self.cursor.execute(
+                f"SELECT hash_pdf FROM raporty WHERE hash_pdf IN ({', '.join('?' * len(chunk))})", chunk)
+            existing.update(row[0] for row in self.cursor.fetchall())
+        return existing
+
+    def find_report_by_hash(self, hash_pdf):
+        """Raport zaimportowany z pliku o danym skrócie SHA-256 (jak get_report_row) lub None."""
         self.cursor.execute('''
-        INSERT INTO raporty (numer_zlecenia, numer_operatora, data_raportu, 
-                           segment1, segment2, segment3, segment4,
-                           sciezka_pdf, data_importu)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (numer_zlecenia, numer_operatora, data_raportu, 
-              segment1, segment2, segment3, segment4,
-              sciezka_pdf, data_importu))
+        SELECT id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu
+        FROM raporty
+        WHERE hash_pdf = ?
+        ''', (hash_pdf,))
+        return self.cursor.fetchone()
+
+    def link_report_path(self, report_id, sciezka_pdf):
+        """Powiązanie raportu z nową lokalizacją tego samego pliku (np. po przeniesieniu lub zmianie nazwy)."""
+        self.cursor.execute("UPDATE raporty SET sciezka_pdf = ? WHERE id = ?", (sciezka_pdf, report_id))
         self.conn.commit()
+        return self.get_report_row(report_id)
 
     def get_all_reports(self):
         """Pobieranie wszystkich raportów z bazy danych."""
+        return self.fetch_reports((QUERY_ALL, ()))
+        
+    def get_report_row(self, report_id):
+        """Pobieranie wiersza raportu w postaci listy raportów (z datą importu)."""
         self.cursor.execute('''
         SELECT id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu
         FROM raporty
-        ORDER BY data_importu DESC
-        ''')
-        return self.cursor.fetchall()
+        WHERE id = ?
+        ''', (report_id,))
+        return self.cursor.fetchone()
         
     def get_report_by_id(self, report_id):
         """Pobieranie danych raportu po ID."""
@@ -90,38 +344,30 @@ class DatabaseManager:
     def update_report(self, report_id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf=None):
         """Aktualizacja danych raportu."""
         # Podział numeru zlecenia na segmenty
-        segments = numer_zlecenia.split('-')
-        segment1, segment2, segment3, segment4 = '', '', '', ''
-        
-        if len(segments) >= 1:
-            segment1 = segments[0]
-        if len(segments) >= 2:
-            segment2 = segments[1]
-        if len(segments) >= 3:
-            segment3 = segments[2]
-        if len(segments) >= 4:
-            segment4 = segments[3]
+        segment1, segment2, segment3, segment4 = self.split_segments(numer_zlecenia)
+        data_raportu_iso = self.date_to_iso(data_raportu)
         
         if sciezka_pdf:
             self.cursor.execute('''
             UPDATE raporty 
-            SET numer_zlecenia = ?, numer_operatora = ?, data_raportu = ?,
+            SET numer_zlecenia = ?, numer_operatora = ?, data_raportu = ?, data_raportu_iso = ?,
                 segment1 = ?, segment2 = ?, segment3 = ?, segment4 = ?,
                 sciezka_pdf = ?
             WHERE id = ?
-            ''', (numer_zlecenia, numer_operatora, data_raportu, 
+            ''', (numer_zlecenia, numer_operatora, data_raportu, data_raportu_iso,
                   segment1, segment2, segment3, segment4, 
                   sciezka_pdf, report_id))
         else:
             self.cursor.execute('''
             UPDATE raporty 
-            SET numer_zlecenia = ?, numer_operatora = ?, data_raportu = ?,
+            SET numer_zlecenia = ?, numer_operatora = ?, data_raportu = ?, data_raportu_iso = ?,
                 segment1 = ?, segment2 = ?, segment3 = ?, segment4 = ?
             WHERE id = ?
-            ''', (numer_zlecenia, numer_operatora, data_raportu, 
+            ''', (numer_zlecenia, numer_operatora, data_raportu, data_raportu_iso,
                   segment1, segment2, segment3, segment4, report_id))
         
         self.conn.commit()
+        return self.get_report_row(report_id)
     
     def delete_report(self, report_id):
         """Usuwanie raportu z bazy danych."""
@@ -133,49 +379,199 @@ class DatabaseManager:
         return self.cursor.rowcount > 0
     
     def search_reports(self, search_text):
-        """Wyszukiwanie raportów na podstawie tekstu wyszukiwania."""
-        search_param = f"%{search_text}%"
-        self.cursor.execute('''
-        SELECT id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu
-        FROM raporty
-        WHERE numer_zlecenia LIKE ? OR numer_operatora LIKE ? OR data_raportu LIKE ?
-        ORDER BY data_importu DESC
-        ''', (search_param, search_param, search_param))
-        return self.cursor.fetchall()
+        """Wyszukiwanie raportów na podstawie tekstu wyszukiwania.
+        
+        Tekst jest wyszukiwany jako fragment numeru zlecenia, numeru operatora
+        lub daty. Przy dostępnym indeksie FTS5 wyniki są uszeregowane według
+        trafności (SEARCH_RANK_SQL), a przy równej trafności od najnowszych.
+        """
+        return self.fetch_reports((QUERY_SEARCH, (search_text,)))
     
+    def prefix_range(self, prefix):
+        """Zakres [od, do) wartości zaczynających się od prefiksu - warunek, który może użyć indeksu."""
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
     def filter_by_segment(self, segment_index, segment_value):
-        """Filtrowanie raportów według segmentu numeru zlecenia."""
-        segment_column = f"segment{segment_index}"
-        segment_param = f"%{segment_value}%"
+        """Filtrowanie raportów według początku segmentu numeru zlecenia."""
+        return self.fetch_reports((QUERY_SEGMENT, (segment_index, segment_value)))
+
+    def get_reports_by_date_range(self, date_from=None, date_to=None):
+        """Raporty z datą raportu w przedziale [date_from, date_to] (obie granice włącznie, każda opcjonalna).
         
-        self.cursor.execute(f'''
-        SELECT id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu
-        FROM raporty
-        WHERE {segment_column} LIKE ?
-        ORDER BY data_importu DESC
-        ''', (segment_param,))
+        Granice to date/datetime lub tekst dd.mm.yyyy. Zapytanie jest przeglądaniem
+        zakresu indeksu idx_raporty_data_raportu_iso; wyniki od najnowszej daty.
+        """
+        return self.fetch_reports((QUERY_DATE_RANGE, (date_from, date_to)))
+
+    def _report_source(self, query):
+        """Źródło wierszy zapytania: (FROM, WHERE, parametry, domyślny klucz sortowania, parametry klucza).
+        
+        Domyślny klucz sortowania jest malejący - przy równych wartościach
+        kolejność wyznacza malejące id (najnowsze raporty najpierw).
+        """
+        kind, params = query
+        
+        if kind == QUERY_SEARCH:
+            search_text, = params
+            if self.fts_enabled and len(search_text) >= FTS_MIN_QUERY_LENGTH:
+                # Fraza w cudzysłowie - znaki specjalne FTS5 (np. '-') traktowane są dosłownie.
+                # Trafność liczona jest z samego wiersza, a nie bm25 - wynik bm25 zależy od
+                # statystyk całego indeksu i zmienia się po każdym zapisie, więc klucz
+                # ostatniego wiersza strony nie wyznaczałby już miejsca kolejnej strony.
+                fts_query = '"' + search_text.replace('"', '""') + '"'
+                return ("raporty_fts JOIN raporty r ON r.id = raporty_fts.rowid",
+                        "raporty_fts MATCH ?", (fts_query,), SEARCH_RANK_SQL,
+                        (search_text.lower(),) * SEARCH_RANK_SQL.count('?'))
+            
+            # Zbyt krótki tekst dla trygramów (lub brak FTS5) - przeszukanie tabeli
+            search_param = f"%{search_text}%"
+            return ("raporty r",
+                    "r.numer_zlecenia LIKE ? OR r.numer_operatora LIKE ? OR r.data_raportu LIKE ?",
+                    (search_param, search_param, search_param), "r.data_importu", ())
+        
+        if kind == QUERY_DATE_RANGE:
+            bounds = []
+            for value, default in zip(params, ('0000-01-01', '9999-12-31')):
+                iso = self.date_to_iso(value) if value else default
+                if not iso:
+                    raise ValueError(f"Nieprawidłowa data: {value}")
+                bounds.append(iso)
+            # Raporty bez rozpoznanej daty (pusty tekst) nigdy nie należą do przedziału
+            return ("raporty r", "r.data_raportu_iso BETWEEN ? AND ?", tuple(bounds),
+                    "r.data_raportu_iso", ())
+        
+        if kind == QUERY_SEGMENT:
+            segment_index, segment_value = params
+            if segment_index not in (1, 2, 3, 4):
+                raise ValueError(f"Nieprawidłowy numer segmentu: {segment_index}")
+            if segment_value:
+                # Zapytanie zakresowe (zamiast LIKE '%...%') korzysta z indeksu idx_raporty_segmentN
+                segment_column = f"r.segment{segment_index}"
+                return ("raporty r", f"{segment_column} >= ? AND {segment_column} < ?",
+                        self.prefix_range(segment_value), "r.data_importu", ())
+        
+        return "raporty r", "1", (), "r.data_importu", ()
+
+    def fetch_reports_page(self, query=(QUERY_ALL, ()), after=None, limit=config.TABLE_PAGE_SIZE, sort=None):
+        """Pobranie strony raportów z paginacją po kluczu (keyset).
+        
+        `query` to para (rodzaj, parametry) - QUERY_ALL, QUERY_SEARCH (tekst,)
+        lub QUERY_SEGMENT (numer segmentu, wartość). `sort` to para (numer
+        kolumny, malejąco) - bez niej obowiązuje domyślna kolejność zapytania
+        (najnowsze lub najtrafniejsze najpierw). Filtr i sortowanie trafiają do
+        jednego zapytania, a ORDER BY korzysta z indeksów kolumn. `after` to klucz
+        (wartość sortowania, id) ostatniego wiersza poprzedniej strony - kolejna
+        strona zaczyna się bezpośrednio za nim, bez OFFSET, więc koszt pobrania
+        strony nie zależy od jej położenia. Wiersze mają postać
+        (id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf,
+        data_importu, wartość_sortowania).
+        """
+        sql, params, descending = self._reports_sql(query, sort)
+        if after is not None:
+            # Pierwszy warunek wyznacza zakres indeksu (także indeksu na wyrażeniu),
+            # porównanie par rozstrzyga remisy wartości sortowania
+            operator = '<' if descending else '>'
+            sql += f"WHERE sort_value {operator}= ? AND (sort_value, id) {operator} (?, ?)\n"
+            params = params + (after[0],) + tuple(after)
+        direction = "DESC" if descending else "ASC"
+        sql += f"ORDER BY sort_value {direction}, id {direction}"
+        if limit is not None:
+            sql += "\nLIMIT ?"
+            params = params + (limit,)
+        
+        self.cursor.execute(sql, params)
         return self.cursor.fetchall()
+
+    def fetch_report_in_query(self, report_id, query=(QUERY_ALL, ()), sort=None):
+        """Wiersz raportu w postaci fetch_reports_page, jeśli raport należy do wyników zapytania (inaczej None).
+        
+        Pozwala modelowi tabeli wstawić lub przesunąć pojedynczy wiersz po
+        zmianie w bazie bez ponownego pobierania wyników.
+        """
+        sql, params, _ = self._reports_sql(query, sort, report_id)
+        self.cursor.execute(sql, params)
+        return self.cursor.fetchone()
+
+    def _reports_sql(self, query, sort, report_id=None):
+        """Zapytanie o raporty z kolumną sort_value (bez ORDER BY), parametry i kierunek sortowania."""
+        source, where, params, sort_key, sort_params = self._report_source(query)
+        descending = True
+        if sort is not None:
+            column, descending = sort
+            sort_key, sort_params = SORT_COLUMNS[column], ()
+        if report_id is not None:
+            where = f"({where}) AND r.id = ?"
+            params = params + (report_id,)
+        
+        sql = f'''
+        SELECT id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, data_importu, sort_value
+        FROM (
+            SELECT r.id, r.numer_zlecenia, r.numer_operatora, r.data_raportu, r.sciezka_pdf, r.data_importu,
+                   {sort_key} AS sort_value
+            FROM {source}
+            WHERE {where}
+        )
+        '''
+        return sql, sort_params + params, descending
+
+    def fetch_reports(self, query):
+        """Wszystkie raporty zapytania (bez kolumny sortowania), w kolejności fetch_reports_page."""
+        return [row[:6] for row in self.fetch_reports_page(query, limit=None)]
     
-    def save_template(self, name, roi_numer_zlecenia, roi_numer_operatora, roi_data):
-        """Zapisanie szablonu rozpoznawania."""
-        # Najpierw usuwamy wszystkie wcześniejsze szablony, aby mieć tylko jeden aktywny
-        self.cursor.execute('''
-        DELETE FROM szablony
-        ''')
+    def save_template(self, name, roi_numer_zlecenia, roi_numer_operatora, roi_data, odcisk=None,
+                      strona_wzorcowa=None, replace_id=None):
+        """Zapisanie szablonu rozpoznawania (obok istniejących - np. kolejnej wersji formularza).
+
+        `odcisk` to odcisk strony wzorcowej (utils.fingerprint), według
+        którego dokument jest przypisywany do najbliższego szablonu, a
+        `strona_wzorcowa` - obraz tej strony w niskiej rozdzielczości
+        (utils.alignment), względem którego wyrównywane są obszary ROI.
+        Z `replace_id` zastępowany jest istniejący szablon (np. po
+        poprawieniu obszarów ROI) - zachowuje on swój identyfikator.
+        Zwraca identyfikator szablonu.
+        """
+        values = (name, roi_numer_zlecenia, roi_numer_operatora, roi_data, odcisk, strona_wzorcowa)
+        if replace_id is not None:
+            self.cursor.execute('''
+            UPDATE szablony
+            SET nazwa = ?, roi_numer_zlecenia = ?, roi_numer_operatora = ?, roi_data = ?,
+                odcisk = ?, strona_wzorcowa = ?
+            WHERE id = ?
+            ''', values + (replace_id,))
+            self.conn.commit()
+            return replace_id
         
-        # Dodanie nowego szablonu
         self.cursor.execute('''
-        INSERT INTO szablony (nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data)
-        VALUES (?, ?, ?, ?)
-        ''', (name, roi_numer_zlecenia, roi_numer_operatora, roi_data))
+        INSERT INTO szablony (nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data, odcisk, strona_wzorcowa)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', values)
         self.conn.commit()
         return self.cursor.lastrowid
     
+    def update_template_reference(self, template_id, odcisk, strona_wzorcowa):
+        """Uzupełnienie odcisku i strony wzorcowej szablonu (np. zapisanego przed ich wprowadzeniem)."""
+        self.cursor.execute('''
+        UPDATE szablony
+        SET odcisk = ?, strona_wzorcowa = ?
+        WHERE id = ?
+        ''', (odcisk, strona_wzorcowa, template_id))
+        self.conn.commit()
+        return self.cursor.rowcount > 0
+    
+    def delete_template(self, template_id):
+        """Usunięcie szablonu rozpoznawania."""
+        self.cursor.execute('''
+        DELETE FROM szablony
+        WHERE id = ?
+        ''', (template_id,))
+        self.conn.commit()
+        return self.cursor.rowcount > 0
+    
     def get_template(self, template_id=None):
-        """Pobieranie szablonu rozpoznawania."""
+        """Pobieranie szablonu rozpoznawania (domyślnie ostatnio zapisanego)."""
         if template_id:
             self.cursor.execute('''
-            SELECT id, nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data
+            SELECT id, nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data, odcisk, strona_wzorcowa
             FROM szablony
             WHERE id = ?
             ''', (template_id,))
@@ -183,13 +579,27 @@ class DatabaseManager:
         else:
             # Pobierz ostatni szablon
             self.cursor.execute('''
-            SELECT id, nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data
+            SELECT id, nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data, odcisk, strona_wzorcowa
             FROM szablony
             ORDER BY id DESC
             LIMIT 1
             ''')
             return self.cursor.fetchone()
     
+    def get_templates(self):
+        """Pobieranie wszystkich szablonów rozpoznawania, od ostatnio zapisanego."""
+        self.cursor.execute('''
+        SELECT id, nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data, odcisk, strona_wzorcowa
+        FROM szablony
+        ORDER BY id DESC
+        ''')
+        return self.cursor.fetchall()
+    
     def close(self):
         """Zamknięcie połączenia z bazą danych."""
+        # Aktualizacja statystyk planisty, jeśli od ostatniego razu znacząco się zmieniły
+        try:
+            self.cursor.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
         self.conn.close()
\ No newline at end of file
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import config
+from utils.metrics import get_metrics
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Znacznik końca pracy wątku zapisującego
+_STOP = object()
+
+
+class ReportWriter:
+    """Zapis raportów z wielu producentów grupowymi transakcjami.
+
+    Raporty przekazane przez submit() trafiają do kolejki, a jeden wątek z
+    własnym połączeniem zbiera je w grupy - do `max_batch` raportów lub
+    `max_delay` sekund od pierwszego raportu grupy - i zapisuje każdą grupę
+    jedną transakcją (insert_reports_bulk). Synchronizacja dysku następuje
+    więc raz na grupę, a nie raz na raport.
+    """
+    def __init__(self, db_name=config.DB_NAME, max_batch=config.WRITER_MAX_BATCH,
+                 max_delay=config.WRITER_MAX_DELAY, queue_size=config.WRITER_QUEUE_SIZE):
+        self.db_name = db_name
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.written = 0
+        self.commits = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        # Błąd, który zatrzymał zapis (np. brak dostępu do bazy) - kolejne raporty są odrzucane
+        self._error = None
+
+    def start(self):
+        """Uruchomienie wątku zapisującego."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name="report-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, hash_pdf=None):
+        """Przekazanie raportu do zapisu. Zwraca Future, który kończy się po zatwierdzeniu grupy.
+
+        Wynikiem jest True, gdy raport został wstawiony, albo False, gdy
+        pominięto go jako duplikat (plik zapisany wcześniej, np. przez inny
+        równolegle działający import).
+
+        Przy pełnej kolejce wywołanie czeka - producenci nie mogą wyprzedzić zapisu bez ograniczeń.
+        Raport z `hash_pdf` już zapisanym w bazie jest pomijany (zob. insert_reports_bulk).
+        Gdy wątek zapisujący przerwał pracę (np. baza nie dała się otworzyć),
+        zgłaszany jest RuntimeError z pierwotnym błędem jako przyczyną.
+        """
+        if self._closed:
+            raise RuntimeError("ReportWriter został zamknięty")
+        if self._error is not None:
+            raise RuntimeError(f"Zapis raportów przerwany: {self._error}") from self._error
+        self.start()
+
+        future = Future()
+        self._queue.put(((numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, hash_pdf), future))
+        return future
+
+    def close(self):
+        """Zapisanie zaległych raportów i zakończenie wątku."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+        # Raporty przekazane równolegle z zamknięciem (już po znaczniku końca) nie zostaną zapisane
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(RuntimeError("ReportWriter został zamknięty przed zapisem raportu"))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _collect_batch(self, first):
+        """Zebranie grupy raportów zaczynającej się od `first`. Zwraca (grupa, czy_zakończyć)."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _writer_loop(self):
+        """Pętla wątku zapisującego - połączenie z bazą musi powstać w tym wątku."""
+        from database.db_manager import DatabaseManager
+
+        try:
+            db_manager = DatabaseManager(self.db_name)
+        except Exception as e:
+            log.error("Błąd podczas otwierania bazy %s do zapisu raportów: %s", self.db_name, e)
+            self._fail(e)
+            return
+
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch, stop = self._collect_batch(item)
+                self._write_batch(db_manager, batch)
+        except Exception as e:
+            log.exception("Błąd wątku zapisu raportów: %s", e)
+            self._fail(e)
+        finally:
+            db_manager.close()
+
+    def _fail(self, error):
+        """Przerwanie zapisu - wszystkie oczekujące i późniejsze raporty kończą się błędem `error`.
+
+        Wątek odbiera z kolejki aż do znacznika końca, aby producenci
+        czekający na miejsce w pełnej kolejce nie zostali zablokowani.
+        """
+        self._error = error
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            item[1].set_exception(error)
+
+    def _write_batch(self, db_manager, batch):
+        """Zapis grupy jedną transakcją i rozliczenie przyszłych wyników."""
+        try:
+            with get_metrics().span("czas_zapisu_bazy_sekundy", tryb="grupa"):
+                inserted = db_manager.insert_reports_bulk(report for report, _ in batch)
+        except Exception as e:
+            log.error("Błąd podczas zapisu grupy %s raportów: %s", len(batch), e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.written += sum(inserted)
+        self.commits += 1
+        get_metrics().inc("zapisane_raporty_total", sum(inserted))
+        for (_, future), was_inserted in zip(batch, inserted):
+            future.set_result(was_inserted)
+
+
+__all__ = ['ReportWriter']
@@ -1,48 +1,293 @@
 # -*- coding: utf-8 -*-
 
-from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from array import array
+from bisect import bisect_right
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, pyqtSignal
+
+import config
+from database.db_manager import QUERY_ALL
 
 
 class ReportsTableModel(QAbstractTableModel):
-    def __init__(self, data):
+    """Model tabeli raportów doczytujący wiersze z bazy stronami.
+
+    Widok prosi o kolejne strony (canFetchMore/fetchMore) dopiero przy
+    przewijaniu, a strony pobierane są paginacją po kluczu, więc otwarcie
+    nawet bardzo dużego archiwum kosztuje jedno zapytanie o `page_size`
+    wierszy. Każda strona przechowywana jest kolumnami jako listy gotowych
+    tekstów do wyświetlenia - data() nie formatuje wartości przy każdym
+    odświeżeniu widoku.
+
+    Sortowanie odbywa się w bazie (ORDER BY razem z bieżącym filtrem). Jeśli
+    podłączono sygnał sort_requested, model tylko go emituje, a nowe wyniki
+    otrzymuje przez set_query (np. z wątku wyszukiwania). Podobnie przy
+    podłączonym page_requested kolejne strony pobierane są poza wątkiem
+    interfejsu i trafiają do modelu przez page_fetched - przewijanie
+    szerokiego wyszukiwania nie blokuje okna. Klucz strony zależy tylko od
+    wierszy (także trafność wyszukiwania), więc zapisy między pobraniami
+    stron nie powodują pominięcia ani powtórzenia wierszy.
+
+    Zmiany pojedynczych raportów (report_inserted, report_updated,
+    report_removed) są nanoszone na wczytane wiersze bez ponownego
+    pobierania wyników, z zachowaniem przewinięcia i zaznaczenia.
+    """
+    sort_requested = pyqtSignal(object)  # (numer kolumny, malejąco)
+    page_requested = pyqtSignal(object, object, object)  # zapytanie, sortowanie, klucz ostatniego wiersza
+
+    def __init__(self, db_manager, page_size=config.TABLE_PAGE_SIZE):
         super().__init__()
-        self._data = data
+        self._db_manager = db_manager
+        self._page_size = page_size
         self._headers = ["ID", "Numer zlecenia", "Numer operatora", "Data raportu", "Ścieżka PDF", "Data importu"]
+        self._query = (QUERY_ALL, ())
+        self._sort = None  # (numer kolumny, malejąco) lub None - kolejność domyślna zapytania
+        self._clear()
+
+    def _clear(self):
+        """Usunięcie wszystkich wczytanych stron."""
+        self._pages = []  # strony: lista kolumn, każda kolumna to lista tekstów
+        self._page_starts = []  # numer pierwszego wiersza każdej strony
+        self._ids = array('q')  # id raportów w kolejności wierszy
+        self._sort_values = []  # wartości sortowania w kolejności wierszy
+        self._row_count = 0
+        self._exhausted = False
+        self._pending_page = None  # (zapytanie, sortowanie, klucz) strony pobieranej w tle
+
+    def _format_row(self, row):
+        """Teksty do wyświetlenia dla wiersza z fetch_reports_page."""
+        return [str(value) for value in row[:len(self._headers)]]
+
+    def _append_page(self, rows):
+        """Dopisanie strony wierszy z fetch_reports_page."""
+        if len(rows) < self._page_size:
+            self._exhausted = True
+        if not rows:
+            return
+
+        self._ids.extend(row[0] for row in rows)
+        self._sort_values.extend(row[6] for row in rows)
+        self._page_starts.append(self._row_count)
+        self._pages.append([
+            [str(value) for value in column]
+            for column in zip(*(row[:len(self._headers)] for row in rows))
+        ])
+        self._row_count += len(rows)
+
+    def _locate(self, row):
+        """Strona i pozycja na stronie dla numeru wiersza (także pozycji tuż za ostatnim wierszem)."""
+        page = max(bisect_right(self._page_starts, row) - 1, 0)
+        return page, row - self._page_starts[page]
+
+    def _after(self):
+        """Klucz (wartość sortowania, id) ostatniego wczytanego wiersza."""
+        if not self._row_count:
+            return None
+        return self._sort_values[-1], self._ids[-1]
+
+    def set_query(self, query, first_page=None, sort=None):
+        """Przełączenie modelu na inne zapytanie (wyszukiwanie, filtr) i sortowanie.
+
+        `first_page` to pierwsza strona wyników w kolejności `sort`, jeśli
+        została już pobrana (np. w wątku wyszukiwania) - w przeciwnym razie
+        jest pobierana tutaj.
+        """
+        if first_page is None:
+            first_page = self._db_manager.fetch_reports_page(query, limit=self._page_size, sort=sort)
+
+        self.beginResetModel()
+        self._query = query
+        self._sort = sort
+        self._clear()
+        self._append_page(first_page)
+        self.endResetModel()
+
+    def query(self):
+        """Bieżące zapytanie modelu."""
+        return self._query
 
     def rowCount(self, parent=QModelIndex()):
-        return len(self._data)
+        if parent.isValid():
+            return 0
+        return self._row_count
 
     def columnCount(self, parent=QModelIndex()):
         return len(self._headers)
 
     def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid() or not (0 <= index.row() < len(self._data)):
+        if not index.isValid() or not (0 <= index.row() < self._row_count):
             return QVariant()
-        
+
         if role == Qt.DisplayRole:
-            return str(self._data[index.row()][index.column()])
-            
+            page, offset = self._locate(index.row())
+            return self._pages[page][index.column()][offset]
+
         return QVariant()
 
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
             return self._headers[section]
         return QVariant()
-    
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted and self._pending_page is None
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Doczytanie kolejnej strony wierszy za ostatnim wczytanym kluczem."""
+        if parent.isValid() or self._exhausted or self._pending_page is not None:
+            return
+
+        if self.receivers(self.page_requested) > 0:
+            self._pending_page = (self._query, self._sort, self._after())
+            self.page_requested.emit(*self._pending_page)
+            return
+
+        self._insert_page(self._db_manager.fetch_reports_page(self._query, after=self._after(),
+                                                              limit=self._page_size, sort=self._sort))
+
+    def page_fetched(self, query, sort, after, rows):
+        """Strona pobrana w tle w odpowiedzi na page_requested (rows None - pobranie przerwane).
+
+        Strony dla wcześniejszego zapytania lub sortowania są pomijane, a
+        strona, przed którą zmieniły się wczytane wiersze, jest pobierana
+        ponownie przy kolejnym przewinięciu.
+        """
+        if self._pending_page != (query, sort, after):
+            return
+        self._pending_page = None
+        if rows is None or after != self._after():
+            return
+        self._insert_page(rows)
+
+    def _insert_page(self, rows):
+        """Dopisanie kolejnej strony do wczytanych wierszy (z powiadomieniem widoku)."""
+        if not rows:
+            self._exhausted = True
+            return
+
+        self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+        self._append_page(rows)
+        self.endInsertRows()
+
     def sort(self, column, order):
-        """Sortowanie danych modelu."""
-        self.layoutAboutToBeChanged.emit()
-        self._data = sorted(self._data, key=lambda x: x[column], reverse=(order == Qt.DescendingOrder))
-        self.layoutChanged.emit()
-
-    def update_data(self, data):
-        """Aktualizacja danych modelu."""
-        self.layoutAboutToBeChanged.emit()
-        self._data = data
-        self.layoutChanged.emit()
-        
+        """Sortowanie - pobranie pierwszej strony bieżącego zapytania w kolejności ORDER BY danej kolumny."""
+        sort = (column, order == Qt.DescendingOrder)
+        if self.receivers(self.sort_requested) > 0:
+            self.sort_requested.emit(sort)
+        else:
+            self.set_query(self._query, sort=sort)
+
+    def _row_of(self, report_id):
+        """Numer wczytanego wiersza raportu lub None."""
+        try:
+            return self._ids.index(report_id)
+        except ValueError:
+            return None
+
+    def _insert_position(self, row):
+        """Miejsce wiersza (z fetch_reports_page) wśród wczytanych wierszy lub None, gdy leży za nimi."""
+        descending = True if self._sort is None else self._sort[1]
+        key = (row[6], row[0])
+
+        # Wyszukiwanie binarne po kluczu (wartość sortowania, id) w kolejności modelu
+        low, high = 0, self._row_count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = (self._sort_values[middle], self._ids[middle])
+            if (middle_key > key) if descending else (middle_key < key):
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self._row_count and not self._exhausted:
+            # Wiersz zostanie pobrany razem z kolejną stroną
+            return None
+        return low
+
+    def _insert_row(self, position, row):
+        """Wstawienie wiersza na danej pozycji (z powiadomieniem widoku)."""
+        if not self._pages:
+            self._pages.append([[] for _ in self._headers])
+            self._page_starts.append(0)
+        page, offset = self._locate(position)
+
+        self.beginInsertRows(QModelIndex(), position, position)
+        for column, text in zip(self._pages[page], self._format_row(row)):
+            column.insert(offset, text)
+        for following in range(page + 1, len(self._page_starts)):
+            self._page_starts[following] += 1
+        self._ids.insert(position, row[0])
+        self._sort_values.insert(position, row[6])
+        self._row_count += 1
+        self.endInsertRows()
+
+    def _remove_row(self, position):
+        """Usunięcie wiersza z danej pozycji (z powiadomieniem widoku)."""
+        page, offset = self._locate(position)
+
+        self.beginRemoveRows(QModelIndex(), position, position)
+        for column in self._pages[page]:
+            del column[offset]
+        for following in range(page + 1, len(self._page_starts)):
+            self._page_starts[following] -= 1
+        if not self._pages[page][0]:
+            # Pusta strona - kolejne strony nie mogą zaczynać się od tego samego wiersza
+            del self._pages[page]
+            del self._page_starts[page]
+        del self._ids[position]
+        del self._sort_values[position]
+        self._row_count -= 1
+        self.endRemoveRows()
+
+    def report_inserted(self, report_id):
+        """Naniesienie nowego raportu, jeśli należy do wyników bieżącego zapytania."""
+        if self._row_of(report_id) is not None:
+            return
+        row = self._db_manager.fetch_report_in_query(report_id, self._query, self._sort)
+        if row is None:
+            return
+        position = self._insert_position(row)
+        if position is not None:
+            self._insert_row(position, row)
+
+    def report_updated(self, report_id):
+        """Naniesienie zmian raportu - odświeżenie wiersza lub przeniesienie go na nowe miejsce."""
+        current = self._row_of(report_id)
+        row = self._db_manager.fetch_report_in_query(report_id, self._query, self._sort)
+
+        if current is not None and row is not None and row[6] == self._sort_values[current]:
+            # Pozycja bez zmian - tylko nowe teksty
+            page, offset = self._locate(current)
+            for column, text in zip(self._pages[page], self._format_row(row)):
+                column[offset] = text
+            self.dataChanged.emit(self.index(current, 0), self.index(current, len(self._headers) - 1))
+            return
+
+        if current is not None:
+            self._remove_row(current)
+        if row is not None:
+            position = self._insert_position(row)
+            if position is not None:
+                self._insert_row(position, row)
+
+    def report_removed(self, report_id):
+        """Usunięcie wiersza raportu skasowanego z bazy."""
+        current = self._row_of(report_id)
+        if current is not None:
+            self._remove_row(current)
+
+    def report_id(self, row):
+        """ID raportu w danym wierszu."""
+        if 0 <= row < self._row_count:
+            return self._ids[row]
+        return None
+
     def get_row_data(self, row):
-        """Pobieranie danych z określonego wiersza."""
-        if 0 <= row < len(self._data):
-            return self._data[row]
-        return None
\ No newline at end of file
+        """Pobieranie danych z określonego wiersza (id i teksty pozostałych kolumn)."""
+        if not 0 <= row < self._row_count:
+            return None
+        page, offset = self._locate(row)
+        columns = self._pages[page]
+        return (self._ids[row],) + tuple(column[offset] for column in columns[1:])
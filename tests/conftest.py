@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+# Testy uruchamiane z katalogu repozytorium bez instalacji pakietu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.alignment import estimate_alignment, fit_to_reference
+
+DPI = 50
+BOXES = [(100, 150, 250, 180), (100, 200, 200, 230)]
+
+
+def _reference_page():
+    """Strona A4 w 50 DPI z losowym (powtarzalnym) układem czarnych prostokątów."""
+    random = np.random.default_rng(7)
+    page = np.full((585, 413), 255, np.uint8)
+    for _ in range(60):
+        x, y = int(random.integers(20, 380)), int(random.integers(20, 550))
+        w, h = int(random.integers(5, 40)), int(random.integers(2, 12))
+        page[y:y + h, x:x + w] = 0
+    return page
+
+
+def _warp(page, matrix):
+    height, width = page.shape
+    return cv2.warpAffine(page, matrix, (width, height), flags=cv2.INTER_LINEAR, borderValue=255)
+
+
+def test_known_shift_is_recovered():
+    reference = _reference_page()
+    page = _warp(reference, np.float32([[1, 0, 6], [0, 1, -4]]))
+
+    alignment = estimate_alignment(reference, page, BOXES, dpi=DPI, source_dpi=DPI)
+
+    assert alignment is not None
+    assert alignment.dx == pytest.approx(6, abs=1)
+    assert alignment.dy == pytest.approx(-4, abs=1)
+    assert abs(math.degrees(alignment.angle)) < 0.2
+
+    # ROI w rozdzielczości renderowania (6x większej) przesuwa się tak samo jak strona
+    x1, y1, x2, y2 = alignment.shift_box((600, 900, 1500, 1080), dpi=6 * DPI)
+    assert x1 - 600 == pytest.approx(36, abs=6)
+    assert y1 - 900 == pytest.approx(-24, abs=6)
+    assert (x2 - x1, y2 - y1) == (900, 180)
+
+
+def test_skew_is_detected_with_its_sign():
+    reference = _reference_page()
+    height, width = reference.shape
+    # Ujemny kąt cv2 obraca zgodnie z ruchem wskazówek zegara - prawa strona w dół
+    page = _warp(reference, cv2.getRotationMatrix2D((width / 2, height / 2), -1.0, 1.0))
+
+    alignment = estimate_alignment(reference, page, BOXES, dpi=DPI, source_dpi=DPI)
+
+    assert alignment is not None
+    assert 0.4 < math.degrees(alignment.angle) < 1.5
+
+
+def test_blank_page_gives_no_alignment():
+    reference = _reference_page()
+    page = np.full_like(reference, 255)
+
+    assert estimate_alignment(reference, page, BOXES, dpi=DPI, source_dpi=DPI) is None
+
+
+def test_fit_to_reference_rejects_other_paper_format():
+    reference = _reference_page()
+
+    assert fit_to_reference(reference, reference) is reference
+    assert fit_to_reference(cv2.resize(reference, (826, 1170)), reference).shape == reference.shape
+    assert fit_to_reference(np.full((413, 585), 255, np.uint8), reference) is None
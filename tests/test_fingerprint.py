@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+from PIL import Image, ImageDraw
+
+from utils.fingerprint import page_fingerprint, fingerprint_to_text, hamming_distance, nearest_fingerprint
+
+SIZE = 4  # odcisk 32-bitowy - 8 znaków szesnastkowych
+
+
+def _form(rows, columns, fill=255):
+    """Strona formularza z tabelą o podanej liczbie wierszy i kolumn."""
+    image = Image.new("L", (420, 594), fill)
+    draw = ImageDraw.Draw(image)
+    for row in range(rows + 1):
+        y = 60 + row * 480 // rows
+        draw.line((40, y, 380, y), fill=0, width=3)
+    for column in range(columns + 1):
+        x = 40 + column * 340 // columns
+        draw.line((x, 60, x, 540), fill=0, width=3)
+    return image
+
+
+def test_nearest_fingerprint_picks_smallest_distance():
+    candidates = [("a", "000000ff"), ("b", "0000000f"), ("c", "ffffffff")]
+    assert nearest_fingerprint(0x00000007, candidates, SIZE) == ("b", 1)
+
+
+def test_nearest_fingerprint_prefers_earlier_candidate_on_tie():
+    candidates = [("pierwszy", "00000001"), ("drugi", "00000002")]
+    assert nearest_fingerprint(0x00000003, candidates, SIZE) == ("pierwszy", 1)
+
+
+def test_nearest_fingerprint_skips_missing_and_foreign_fingerprints():
+    candidates = [("bez_odcisku", None), ("pusty", ""), ("inny_rozmiar", "0000"), ("dobry", "ffff0000")]
+    assert nearest_fingerprint(0, candidates, SIZE) == ("dobry", 16)
+
+
+def test_nearest_fingerprint_without_candidates():
+    assert nearest_fingerprint(0, [], SIZE) == (None, None)
+    assert nearest_fingerprint(0, [("bez_odcisku", None)], SIZE) == (None, None)
+
+
+def test_text_round_trip_keeps_fixed_length():
+    assert fingerprint_to_text(1, SIZE) == "00000001"
+    assert int(fingerprint_to_text(0xabc, SIZE), 16) == 0xabc
+
+
+def test_same_layout_is_closer_than_other_layout():
+    reference = page_fingerprint(_form(8, 3))
+    darker_scan = page_fingerprint(_form(8, 3, fill=225))
+    other_form = page_fingerprint(_form(4, 6))
+
+    assert hamming_distance(reference, page_fingerprint(_form(8, 3))) == 0
+    assert hamming_distance(reference, darker_scan) < hamming_distance(reference, other_form)
+
+    candidates = [("inny", fingerprint_to_text(other_form)), ("ten", fingerprint_to_text(reference))]
+    assert nearest_fingerprint(darker_scan, candidates)[0] == "ten"
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+
+import pytest
+
+from utils.folder_watcher import (FolderWatcher, is_pdf_complete, WATCH_BACKEND_INOTIFY,
+                                  WATCH_BACKEND_POLLING)
+
+PDF_BODY = b"%PDF-1.4\n1 0 obj\n<< >>\nendobj\n"
+PDF_END = b"trailer\n<< >>\n%%EOF\n"
+
+BACKENDS = [WATCH_BACKEND_POLLING]
+if sys.platform.startswith('linux'):
+    BACKENDS.append(WATCH_BACKEND_INOTIFY)
+
+
+def _poll_for(watcher, seconds):
+    """Pliki zgłoszone przez watcher w ciągu `seconds` sekund."""
+    reported = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        reported.extend(watcher.poll(timeout=0.02))
+    return reported
+
+
+def _wait_for_report(watcher, timeout=2.0):
+    """Pliki z pierwszego zgłoszenia (pusta lista, gdy przez `timeout` sekund nic nie zgłoszono)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reported = watcher.poll(timeout=0.02)
+        if reported:
+            return reported
+    return []
+
+
+def _watcher(directory, backend, incomplete_timeout=30.0):
+    return FolderWatcher([str(directory)], backend=backend, poll_interval=0.02, stable_seconds=0.05,
+                         incomplete_timeout=incomplete_timeout)
+
+
+def test_is_pdf_complete(tmp_path):
+    complete = tmp_path / "kompletny.pdf"
+    complete.write_bytes(PDF_BODY + PDF_END)
+    partial = tmp_path / "niepelny.pdf"
+    partial.write_bytes(PDF_BODY)
+    empty = tmp_path / "pusty.pdf"
+    empty.write_bytes(b"")
+
+    assert is_pdf_complete(str(complete), complete.stat().st_size)
+    assert not is_pdf_complete(str(partial), partial.stat().st_size)
+    assert not is_pdf_complete(str(empty), 0)
+    assert not is_pdf_complete(str(tmp_path / "brak.pdf"), 100)
+
+
+def test_marker_outside_tail_is_ignored(tmp_path):
+    path = tmp_path / "dlugi.pdf"
+    path.write_bytes(PDF_BODY + PDF_END + b"x" * 4096)
+
+    assert not is_pdf_complete(str(path), path.stat().st_size)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_file_is_reported_once_after_eof_and_stability(tmp_path, backend):
+    with _watcher(tmp_path, backend) as watcher:
+        assert watcher.backend == backend
+        path = tmp_path / "skan.pdf"
+        path.write_bytes(PDF_BODY)
+        (tmp_path / "notatka.txt").write_text("nie PDF")
+
+        # Zapis niezakończony (brak %%EOF) - plik czeka mimo stabilnego rozmiaru
+        assert _poll_for(watcher, 0.25) == []
+        assert watcher.pending_count() == 1
+
+        with open(path, 'ab') as f:
+            f.write(PDF_END)
+        assert _wait_for_report(watcher) == [str(path)]
+
+        # Niezmieniony plik nie jest zgłaszany ponownie
+        assert _poll_for(watcher, 0.2) == []
+        assert watcher.pending_count() == 0
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_file_is_not_reported_while_growing(tmp_path, backend):
+    with _watcher(tmp_path, backend) as watcher:
+        path = tmp_path / "skan.pdf"
+        reported = []
+        deadline = time.monotonic() + 0.25
+        while time.monotonic() < deadline:
+            # Każdy kolejny zapis kończy się %%EOF (np. przyrostowe zapisy PDF), ale rozmiar wciąż rośnie
+            with open(path, 'ab') as f:
+                f.write(PDF_BODY + PDF_END)
+            reported.extend(watcher.poll(timeout=0.02))
+
+        assert reported == []
+        assert _wait_for_report(watcher) == [str(path)]
+
+
+def test_incomplete_file_is_reported_after_timeout(tmp_path):
+    with _watcher(tmp_path, WATCH_BACKEND_POLLING, incomplete_timeout=0.3) as watcher:
+        path = tmp_path / "uszkodzony.pdf"
+        path.write_bytes(PDF_BODY)
+
+        assert _poll_for(watcher, 0.15) == []
+        assert _wait_for_report(watcher) == [str(path)]
+
+
+def test_existing_files_are_reported_at_start(tmp_path):
+    path = tmp_path / "stary.pdf"
+    path.write_bytes(PDF_BODY + PDF_END)
+
+    with _watcher(tmp_path, WATCH_BACKEND_POLLING) as watcher:
+        assert _wait_for_report(watcher) == [str(path)]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_deleted_file_is_forgotten(tmp_path, backend):
+    with _watcher(tmp_path, backend) as watcher:
+        path = tmp_path / "skan.pdf"
+        path.write_bytes(PDF_BODY + PDF_END)
+        assert _wait_for_report(watcher) == [str(path)]
+        assert str(path) in watcher._reported
+
+        os.remove(path)
+        _poll_for(watcher, 0.2)
+        assert watcher._reported == {}
+        assert watcher.pending_count() == 0
+
+        # Ten sam plik przywrócony pod tą samą nazwą jest zgłaszany ponownie
+        path.write_bytes(PDF_BODY + PDF_END)
+        assert _wait_for_report(watcher) == [str(path)]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from utils.metrics import Metrics, METRICS_BASIC, METRICS_DETAILED, METRICS_OFF
+
+BUCKETS = (0.1, 0.2, 0.5, 1.0)
+
+
+def _histogram(metrics, name):
+    return next(entry for entry in metrics.summary()['histogramy'] if entry['nazwa'] == name)
+
+
+def test_quantile_interpolates_within_bucket():
+    metrics = Metrics(METRICS_BASIC, BUCKETS)
+    for seconds in (0.3, 0.4, 0.45, 0.5):
+        metrics.observe("czas", seconds)
+
+    histogram = _histogram(metrics, "czas")
+
+    # Wszystkie pomiary w przedziale (0.2, 0.5] - mediana w połowie przedziału
+    assert histogram['p50'] == pytest.approx(0.35)
+    assert histogram['p95'] == pytest.approx(0.2 + 0.3 * 0.95)
+    assert histogram['max'] == pytest.approx(0.5)
+    assert histogram['liczba'] == 4
+    assert histogram['srednia'] == pytest.approx(0.4125)
+
+
+def test_quantile_is_capped_at_maximum():
+    metrics = Metrics(METRICS_BASIC, BUCKETS)
+    for seconds in (0.05, 0.05, 0.15, 0.15):
+        metrics.observe("czas", seconds)
+
+    histogram = _histogram(metrics, "czas")
+
+    assert histogram['p50'] == pytest.approx(0.1)
+    assert histogram['p95'] == pytest.approx(0.15)
+
+
+def test_value_above_last_bucket_is_reported_as_maximum():
+    metrics = Metrics(METRICS_BASIC, BUCKETS)
+    metrics.observe("czas", 0.05)
+    metrics.observe("czas", 7.0)
+
+    histogram = _histogram(metrics, "czas")
+
+    assert histogram['p95'] == pytest.approx(7.0)
+    assert 'raporty_czas_bucket{le="+Inf"} 2' in metrics.to_prometheus()
+
+
+def test_merge_adds_counters_and_histograms():
+    main = Metrics(METRICS_BASIC, BUCKETS)
+    worker = Metrics(METRICS_BASIC, BUCKETS)
+    main.inc("raporty_total", 2, silnik="tesseract")
+    main.observe("czas", 0.15)
+    worker.inc("raporty_total", 3, silnik="tesseract")
+    worker.inc("bledy_total")
+    worker.observe("czas", 0.8)
+
+    main.merge(worker.snapshot(reset=True))
+
+    counters = {(entry['nazwa'], tuple(entry['etykiety'].items())): entry['wartosc']
+                for entry in main.summary()['liczniki']}
+    assert counters == {("raporty_total", (("silnik", "tesseract"),)): 5, ("bledy_total", ()): 1}
+    histogram = _histogram(main, "czas")
+    assert histogram['liczba'] == 2
+    assert histogram['suma'] == pytest.approx(0.95)
+    assert histogram['max'] == pytest.approx(0.8)
+    assert worker.snapshot() == {'counters': [], 'histograms': []}
+
+
+def test_merge_ignores_empty_snapshot():
+    metrics = Metrics(METRICS_BASIC, BUCKETS)
+    metrics.merge(None)
+    assert metrics.snapshot() == {'counters': [], 'histograms': []}
+
+
+def test_levels_filter_measurements():
+    metrics = Metrics(METRICS_OFF, BUCKETS)
+    metrics.inc("raporty_total")
+    with metrics.span("czas"):
+        pass
+    assert metrics.snapshot() == {'counters': [], 'histograms': []}
+
+    metrics.set_level(METRICS_BASIC)
+    metrics.inc("raporty_total")
+    metrics.inc("roi_total", level=METRICS_DETAILED)
+    with metrics.span("czas"):
+        pass
+    snapshot = metrics.snapshot()
+    assert [counter[0] for counter in snapshot['counters']] == ["raporty_total"]
+    assert [histogram[0] for histogram in snapshot['histograms']] == ["czas"]
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+from database.db_manager import DatabaseManager, SCHEMA_VERSION
+
+# Schemat bazy sprzed migracji (user_version = 0)
+BASELINE_SCHEMA = '''
+CREATE TABLE raporty (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    numer_zlecenia TEXT NOT NULL,
+    numer_operatora TEXT NOT NULL,
+    data_raportu TEXT NOT NULL,
+    segment1 TEXT,
+    segment2 TEXT,
+    segment3 TEXT,
+    segment4 TEXT,
+    sciezka_pdf TEXT NOT NULL,
+    data_importu TEXT NOT NULL
+);
+CREATE TABLE szablony (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nazwa TEXT NOT NULL,
+    roi_numer_zlecenia TEXT,
+    roi_numer_operatora TEXT,
+    roi_data TEXT
+);
+'''
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = str(tmp_path / "raporty.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO raporty (numer_zlecenia, numer_operatora, data_raportu, segment1, segment2, segment3, "
+        "segment4, sciezka_pdf, data_importu) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [("12/345/678/9", "OP7", "05.03.2024", "12", "345", "678", "9", "/skany/a.pdf", "2024-03-05 10:00:00"),
+         ("98/765", "OP2", "nieczytelna", "98", "765", None, None, "/skany/b.pdf", "2024-03-06 10:00:00")]
+    )
+    conn.execute("INSERT INTO szablony (nazwa, roi_numer_zlecenia, roi_numer_operatora, roi_data) "
+                 "VALUES ('Stary', '[1, 2, 3, 4]', '[5, 6, 7, 8]', '[9, 10, 11, 12]')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _columns(db, table):
+    return {row[1] for row in db.conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _indexes(db):
+    return {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_baseline_database_is_upgraded(baseline_db):
+    db = DatabaseManager(baseline_db)
+    try:
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert {'idx_raporty_data_importu', 'idx_raporty_segment1', 'idx_raporty_segment2',
+                'idx_raporty_segment3', 'idx_raporty_segment4'} <= _indexes(db)
+        assert {'idx_raporty_numer_zlecenia', 'idx_raporty_numer_operatora'} <= _indexes(db)
+
+        rows = dict(db.conn.execute("SELECT sciezka_pdf, data_raportu_iso FROM raporty"))
+        assert rows == {"/skany/a.pdf": "2024-03-05", "/skany/b.pdf": ""}
+        assert 'idx_raporty_data_raportu_iso' in _indexes(db)
+
+        assert 'hash_pdf' in _columns(db, 'raporty')
+        assert 'idx_raporty_hash_pdf' in _indexes(db)
+        assert db.conn.execute("SELECT COUNT(*) FROM raporty WHERE hash_pdf IS NOT NULL").fetchone()[0] == 0
+
+        template = db.get_template()
+        assert template[1] == "Stary"
+        assert template[5] is None and template[6] is None
+    finally:
+        db.close()
+
+
+def test_upgrade_is_idempotent(baseline_db):
+    DatabaseManager(baseline_db).close()
+    db = DatabaseManager(baseline_db)
+    try:
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert db.conn.execute("SELECT COUNT(*) FROM raporty").fetchone()[0] == 2
+    finally:
+        db.close()
+
+
+def test_migrated_reports_are_searchable(baseline_db):
+    db = DatabaseManager(baseline_db)
+    try:
+        assert [row[4] for row in db.filter_by_segment(2, "34")] == ["/skany/a.pdf"]
+        assert [row[4] for row in db.search_reports("345")] == ["/skany/a.pdf"]
+        assert [row[4] for row in db.search_reports("OP")] == ["/skany/b.pdf", "/skany/a.pdf"]
+        assert [row[4] for row in db.get_reports_by_date_range("01.03.2024", "31.03.2024")] == ["/skany/a.pdf"]
+    finally:
+        db.close()
+
+
+def test_hash_index_skips_duplicates_only(baseline_db):
+    db = DatabaseManager(baseline_db)
+    try:
+        inserted = db.insert_reports_bulk([
+            ("1/2", "OP1", "01.04.2024", "/skany/c.pdf", "abc"),
+            ("1/3", "OP1", "01.04.2024", "/skany/d.pdf", "abc"),
+            ("1/4", "OP1", "01.04.2024", "/skany/e.pdf", None),
+        ])
+        assert inserted == [True, False, True]
+        assert db.find_report_by_hash("abc")[4] == "/skany/c.pdf"
+    finally:
+        db.close()
+
+
+def test_bulk_insert_flags_reports_already_in_database(baseline_db):
+    db = DatabaseManager(baseline_db)
+    try:
+        assert db.insert_reports_bulk([("1/2", "OP1", "01.04.2024", "/skany/c.pdf", "abc")]) == [True]
+        inserted = db.insert_reports_bulk([
+            ("1/5", "OP1", "01.04.2024", "/skany/f.pdf", "def"),
+            ("1/2", "OP1", "01.04.2024", "/skany/kopia.pdf", "abc"),
+        ])
+        assert inserted == [True, False]
+        assert db.insert_reports_bulk([]) == []
+        assert db.conn.execute("SELECT COUNT(*) FROM raporty").fetchone()[0] == 4
+    finally:
+        db.close()
+
+
+def test_legacy_template_can_be_completed_and_deleted(baseline_db):
+    db = DatabaseManager(baseline_db)
+    try:
+        template_id = db.get_template()[0]
+        assert db.update_template_reference(template_id, "ff" * 128, b"png")
+        assert db.get_template(template_id)[5:] == ("ff" * 128, b"png")
+        assert db.delete_template(template_id)
+        assert db.get_templates() == []
+    finally:
+        db.close()
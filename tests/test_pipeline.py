@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+
+import pytest
+
+from controllers.pipeline import Pipeline, Stage
+
+
+def _pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
+
+
+def test_single_workers_keep_input_order():
+    pipeline = Pipeline([Stage("double", lambda x: x * 2), Stage("add", lambda x: x + 1)], queue_size=2)
+
+    results = list(pipeline.run(range(50)))
+
+    assert [result.index for result in results] == list(range(50))
+    assert [result.value for result in results] == [x * 2 + 1 for x in range(50)]
+    assert all(result.error is None for result in results)
+
+
+def test_parallel_workers_return_every_item_once():
+    def slow(x):
+        time.sleep(0.001 * (x % 3))
+        return x
+
+    pipeline = Pipeline([Stage("slow", slow, workers=4), Stage("square", lambda x: x * x, workers=2)])
+
+    results = list(pipeline.run(range(40)))
+
+    assert sorted(result.index for result in results) == list(range(40))
+    assert all(result.value == result.index ** 2 for result in results)
+
+
+def test_batch_stage_receives_lists():
+    sizes = []
+
+    def batch(values):
+        sizes.append(len(values))
+        return [value + 100 for value in values]
+
+    pipeline = Pipeline([Stage("batch", batch, batch_size=3)])
+
+    results = list(pipeline.run(range(10)))
+
+    assert sorted(result.value for result in results) == list(range(100, 110))
+    assert max(sizes) <= 3 and sum(sizes) == 10
+
+
+def test_stage_error_skips_later_stages_for_that_item():
+    later = []
+
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("zły element")
+        return x
+
+    def record(x):
+        later.append(x)
+        return x
+
+    pipeline = Pipeline([Stage("check", fail_on_three), Stage("record", record)])
+
+    results = {result.index: result for result in pipeline.run(range(6))}
+
+    assert isinstance(results[3].error, ValueError)
+    assert results[3].item == 3
+    assert 3 not in later
+    assert all(results[index].error is None for index in (0, 1, 2, 4, 5))
+    stats = {stage['etap']: stage for stage in pipeline.stats()}
+    assert stats['check']['bledow'] == 1
+    assert stats['record']['bledow'] == 1
+
+
+def test_batch_with_wrong_result_count_fails_the_batch():
+    pipeline = Pipeline([Stage("batch", lambda values: [], batch_size=2)], queue_size=1)
+
+    results = list(pipeline.run([1, 2]))
+
+    assert len(results) == 2
+    assert all(isinstance(result.error, ValueError) for result in results)
+
+
+def test_early_close_stops_all_threads():
+    started = []
+
+    def slow(x):
+        started.append(x)
+        time.sleep(0.01)
+        return x
+
+    pipeline = Pipeline([Stage("slow", slow, workers=2), Stage("pass", lambda x: x)], queue_size=2)
+    results = pipeline.run(range(10000))
+
+    first = next(results)
+    results.close()
+
+    assert first.error is None
+    assert not _pipeline_threads()
+    # Ograniczone kolejki - po przerwaniu nie przetworzono całego wejścia
+    assert len(started) < 100
+
+
+def test_pipeline_requires_stages():
+    with pytest.raises(ValueError):
+        Pipeline([])
+
+
+def test_initializer_error_fails_items_of_that_stage():
+    def broken_initializer():
+        raise RuntimeError("brak modelu")
+
+    pipeline = Pipeline([Stage("ocr", lambda x: x, initializer=broken_initializer)])
+
+    results = list(pipeline.run(range(3)))
+
+    assert len(results) == 3
+    assert all(isinstance(result.error, RuntimeError) for result in results)
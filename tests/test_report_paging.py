@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from database.db_manager import DatabaseManager, QUERY_SEARCH
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "raporty.db"))
+    if not db.fts_enabled:
+        db.close()
+        pytest.skip("SQLite bez FTS5 (trigram)")
+    yield db
+    db.close()
+
+
+def _insert(db, numbers):
+    return [db.insert_report(number, "OP1", "01.04.2024", f"/skany/{number.replace('/', '_')}.pdf")[0]
+            for number in numbers]
+
+
+def _all_pages(db, query, limit, after=None):
+    """Wiersze kolejnych stron zapytania od klucza `after` do końca wyników."""
+    rows = []
+    while True:
+        page = db.fetch_reports_page(query, after=after, limit=limit)
+        if not page:
+            return rows
+        rows.extend(page)
+        after = (page[-1][6], page[-1][0])
+
+
+def test_search_ranks_exact_then_prefix_then_fragment(db):
+    fragment, prefix, exact, other, newer_prefix = _insert(db, ["9/1234", "1234/5", "1234", "77/5", "1234/6"])
+
+    rows = db.fetch_reports_page((QUERY_SEARCH, ("1234",)), limit=None)
+
+    assert [row[0] for row in rows] == [exact, newer_prefix, prefix, fragment]
+
+
+def test_search_pages_do_not_shift_after_inserts(db):
+    _insert(db, [f"{index}/1234" for index in range(6)] + [f"1234/{index}" for index in range(6)] + ["1234"])
+    query = (QUERY_SEARCH, ("1234",))
+    expected = [row[0] for row in db.fetch_reports_page(query, limit=None)]
+
+    first_page = db.fetch_reports_page(query, limit=5)
+    # Zapisy między pobraniami stron zmieniają statystyki indeksu pełnotekstowego
+    _insert(db, [f"{index}/99" for index in range(20)] + ["5/1234/8"])
+    rest = _all_pages(db, query, 5, after=(first_page[-1][6], first_page[-1][0]))
+
+    ids = [row[0] for row in first_page + rest]
+    assert len(ids) == len(set(ids))
+    assert [report_id for report_id in ids if report_id in expected] == expected
+
+
+def test_paging_covers_search_results_once(db):
+    _insert(db, [f"{index}/1234" for index in range(7)] + ["1234"])
+
+    rows = _all_pages(db, (QUERY_SEARCH, ("1234",)), 3)
+
+    assert len(rows) == 8
+    assert len({row[0] for row in rows}) == 8
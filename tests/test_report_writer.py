@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+from database.report_writer import ReportWriter
+
+
+def _paths(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        return [row[0] for row in conn.execute("SELECT sciezka_pdf FROM raporty ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_reports_are_written_in_groups(tmp_path):
+    db_name = str(tmp_path / "raporty.db")
+    with ReportWriter(db_name, max_batch=4, max_delay=0.05) as writer:
+        futures = [writer.submit(f"1/{index}", "OP1", "01.04.2024", f"/skany/{index}.pdf") for index in range(10)]
+        for future in futures:
+            assert future.result(timeout=5)
+
+    assert _paths(db_name) == [f"/skany/{index}.pdf" for index in range(10)]
+    assert writer.written == 10
+    assert 3 <= writer.commits <= 10
+
+
+def test_close_flushes_pending_reports(tmp_path):
+    db_name = str(tmp_path / "raporty.db")
+    writer = ReportWriter(db_name, max_batch=100, max_delay=60.0).start()
+    future = writer.submit("1/1", "OP1", "01.04.2024", "/skany/a.pdf")
+
+    writer.close()
+
+    assert future.result(timeout=0)
+    assert _paths(db_name) == ["/skany/a.pdf"]
+    with pytest.raises(RuntimeError):
+        writer.submit("1/2", "OP1", "01.04.2024", "/skany/b.pdf")
+
+
+def test_unopenable_database_fails_pending_reports(tmp_path):
+    db_name = str(tmp_path / "brak_katalogu" / "raporty.db")
+    writer = ReportWriter(db_name, max_batch=10, max_delay=0.05)
+    futures = []
+    try:
+        for index in range(3):
+            futures.append(writer.submit(f"1/{index}", "OP1", "01.04.2024", f"/skany/{index}.pdf"))
+    except RuntimeError:
+        # Wątek zapisujący mógł przerwać pracę jeszcze przed kolejnym zgłoszeniem
+        pass
+
+    for future in futures:
+        with pytest.raises(sqlite3.OperationalError):
+            future.result(timeout=5)
+    with pytest.raises(RuntimeError, match="Zapis raportów przerwany"):
+        writer.submit("1/2", "OP1", "01.04.2024", "/skany/b.pdf")
+    writer.close()
+    assert writer.written == 0
+
+
+def test_duplicate_hash_resolves_as_skipped(tmp_path):
+    db_name = str(tmp_path / "raporty.db")
+    with ReportWriter(db_name, max_batch=10, max_delay=0.05) as writer:
+        first = writer.submit("1/1", "OP1", "01.04.2024", "/skany/a.pdf", "abc")
+        second = writer.submit("1/1", "OP1", "01.04.2024", "/skany/kopia.pdf", "abc")
+        third = writer.submit("1/2", "OP1", "01.04.2024", "/skany/b.pdf", "def")
+
+        assert [future.result(timeout=5) for future in (first, second, third)] == [True, False, True]
+
+    assert _paths(db_name) == ["/skany/a.pdf", "/skany/b.pdf"]
+    assert writer.written == 2
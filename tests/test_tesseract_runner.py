@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from controllers import tesseract_runner
+from controllers.tesseract_runner import TesseractCancelled, run_with_priority_fallback
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    """Zastępuje proces tesseract: konfiguracja to (czas działania, tekst); zapisuje anulowania."""
+    cancelled = {}
+
+    def run(image, tesseract_config, cancel_event=None, tesseract_cmd=None):
+        seconds, text = tesseract_config
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled[text] = time.monotonic()
+                raise TesseractCancelled()
+            time.sleep(0.005)
+        return text
+
+    monkeypatch.setattr(tesseract_runner, "run_tesseract", run)
+    return cancelled
+
+
+def test_highest_priority_non_empty_result_wins(fake_tesseract):
+    configs = [((0.05, ""), "pierwsza"), ((0.01, "B"), "druga"), ((0.02, "C"), "trzecia")]
+    with ThreadPoolExecutor(3) as executor:
+        assert run_with_priority_fallback(None, configs, executor) == ("B", "druga")
+
+
+def test_lower_priority_is_cancelled_while_higher_priority_runs(fake_tesseract):
+    configs = [((0.4, ""), "pierwsza"), ((0.02, "B"), "druga"), ((5.0, "C"), "trzecia")]
+    with ThreadPoolExecutor(3) as executor:
+        start = time.monotonic()
+        result = run_with_priority_fallback(None, configs, executor)
+
+    assert result == ("B", "druga")
+    # Trzecia konfiguracja anulowana zaraz po wyniku drugiej, a nie po zakończeniu pierwszej
+    assert fake_tesseract["C"] - start < 0.3
+    assert "" not in fake_tesseract
+
+
+def test_waiting_lower_priority_never_starts(fake_tesseract):
+    configs = [((0.01, "A"), "pierwsza"), ((0.01, "B"), "druga")]
+    with ThreadPoolExecutor(1) as executor:
+        assert run_with_priority_fallback(None, configs, executor) == ("A", "pierwsza")
+    assert "B" not in fake_tesseract
+
+
+def test_no_text_from_any_config(fake_tesseract):
+    configs = [((0.01, ""), "pierwsza"), ((0.01, ""), "druga")]
+    with ThreadPoolExecutor(2) as executor:
+        assert run_with_priority_fallback(None, configs, executor) == ("", None)
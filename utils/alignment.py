@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import io
+import math
+
+import config
+
+# Dopuszczalna różnica proporcji strony dokumentu i strony wzorcowej
+_MAX_ASPECT_DIFFERENCE = 0.02
+
+
+class Alignment:
+    """Przesunięcie i skos strony względem strony wzorcowej szablonu.
+
+    `dx`, `dy`, `width` i `height` wyrażone są w pikselach obrazów wyrównania
+    (rozdzielczość `dpi`), `angle` to kąt obrotu wokół środka strony
+    w radianach (dodatni: prawa strona przesunięta w dół).
+    """
+    __slots__ = ('dx', 'dy', 'angle', 'response', 'width', 'height', 'dpi')
+
+    def __init__(self, dx, dy, angle, response, width, height, dpi):
+        self.dx = dx
+        self.dy = dy
+        self.angle = angle
+        self.response = response
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+
+    def shift_box(self, box, dpi=config.PDF_RENDER_DPI):
+        """Prostokąt (x1, y1, x2, y2) w pikselach obrazu `dpi` przesunięty tak jak jego środek na stronie.
+
+        Rozmiar prostokąta się nie zmienia (przy skosie rzędu stopnia obrót
+        samego ROI jest pomijalny), a przesunięcie jest ograniczane tak, aby
+        prostokąt nie wychodził poza stronę.
+        """
+        scale = dpi / self.dpi
+        x1, y1, x2, y2 = box
+        center_x, center_y = self.width * scale / 2, self.height * scale / 2
+        box_x, box_y = (x1 + x2) / 2, (y1 + y2) / 2
+
+        # Obrót o mały kąt wokół środka strony i przesunięcie
+        shift_x = round(self.dx * scale - self.angle * (box_y - center_y))
+        shift_y = round(self.dy * scale + self.angle * (box_x - center_x))
+        shift_x = max(min(shift_x, round(self.width * scale) - x2), -x1)
+        shift_y = max(min(shift_y, round(self.height * scale) - y2), -y1)
+        return x1 + shift_x, y1 + shift_y, x2 + shift_x, y2 + shift_y
+
+    def __repr__(self):
+        return (f"Alignment(dx={self.dx:.2f}, dy={self.dy:.2f}, angle={math.degrees(self.angle):.3f}°, "
+                f"response={self.response:.3f}, dpi={self.dpi})")
+
+
+def encode_reference(image, dpi=config.ALIGNMENT_DPI):
+    """Strona wzorcowa (obraz PIL w rozdzielczości `dpi`) zapisana jako PNG w skali szarości do kolumny szablonu."""
+    buffer = io.BytesIO()
+    image.convert("L").save(buffer, format="PNG", optimize=True, dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+def decode_reference(data):
+    """Odczyt strony wzorcowej z encode_reference - zwraca (tablica numpy uint8, dpi)."""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        dpi = round(image.info.get('dpi', (config.ALIGNMENT_DPI,))[0])
+        return np.asarray(image.convert("L")), dpi
+
+
+def fit_to_reference(page, reference):
+    """Obraz strony (tablica uint8 w skali szarości) przeskalowany do rozmiaru strony wzorcowej.
+
+    Zwraca None, gdy strona ma inne proporcje (inny format papieru) - wtedy
+    wyrównanie nie ma sensu.
+    """
+    import cv2
+
+    height, width = reference.shape
+    page_height, page_width = page.shape
+    if abs(page_width / page_height - width / height) > _MAX_ASPECT_DIFFERENCE * width / height:
+        return None
+    if page.shape == reference.shape:
+        return page
+    return cv2.resize(page, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def _correlate(reference, page):
+    """Przesunięcie `page` względem `reference` (korelacja fazowa) i siła piku korelacji."""
+    import cv2
+    import numpy as np
+
+    def prepare(pixels):
+        # Tusz jasny na ciemnym tle - puste marginesy nie wnoszą energii do widma
+        inverted = 255.0 - pixels.astype(np.float32)
+        return inverted - inverted.mean()
+
+    (shift_x, shift_y), response = cv2.phaseCorrelate(prepare(reference), prepare(page))
+    return shift_x, shift_y, response
+
+
+def _boxes_region(boxes, width, height, dpi, source_dpi):
+    """Otoczenie prostokątów `boxes` (piksele obrazu `source_dpi`) w pikselach obrazu wyrównania."""
+    if not boxes:
+        return 0, 0, width, height
+    scale = dpi / source_dpi
+    margin = config.ALIGNMENT_MARGIN_MM / 25.4 * dpi
+    return (max(0, int(min(box[0] for box in boxes) * scale - margin)),
+            max(0, int(min(box[1] for box in boxes) * scale - margin)),
+            min(width, int(max(box[2] for box in boxes) * scale + margin)),
+            min(height, int(max(box[3] for box in boxes) * scale + margin)))
+
+
+def estimate_alignment(reference, page, boxes=(), dpi=config.ALIGNMENT_DPI, source_dpi=config.PDF_RENDER_DPI):
+    """Przesunięcie i skos strony względem strony wzorcowej (tablice uint8 tego samego rozmiaru).
+
+    Porównywane jest otoczenie prostokątów ROI `boxes` (w pikselach obrazu
+    `source_dpi`) z marginesem config.ALIGNMENT_MARGIN_MM - powtarzalne
+    linie tabel w dalszej części strony dawałyby fałszywe piki korelacji
+    przesunięte o wysokość wiersza. Skos wynika z różnicy przesunięć
+    pionowych lewej i prawej połowy obszaru; po jego usunięciu korelacja
+    fazowa całego obszaru daje przesunięcie. Zwraca Alignment albo None,
+    gdy wynik jest niewiarygodny (słaby pik korelacji lub przesunięcie
+    większe niż config.ALIGNMENT_MAX_SHIFT_MM).
+    """
+    import cv2
+
+    height, width = reference.shape
+    x1, y1, x2, y2 = _boxes_region(boxes, width, height, dpi, source_dpi)
+    half = (x2 - x1) // 2
+    _, left_y, left_response = _correlate(reference[y1:y2, x1:x1 + half], page[y1:y2, x1:x1 + half])
+    _, right_y, right_response = _correlate(reference[y1:y2, x1 + half:x1 + 2 * half],
+                                            page[y1:y2, x1 + half:x1 + 2 * half])
+    angle = 0.0
+    if min(left_response, right_response) >= config.ALIGNMENT_MIN_RESPONSE:
+        # Środki połówek są odległe o `half` pikseli
+        angle = math.atan2(right_y - left_y, half)
+        if abs(math.degrees(angle)) > config.ALIGNMENT_MAX_ANGLE:
+            angle = 0.0
+    if angle:
+        # Usunięcie skosu wokół środka strony przed pomiarem przesunięcia
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), math.degrees(angle), 1.0)
+        page = cv2.warpAffine(page, matrix, (width, height), flags=cv2.INTER_LINEAR, borderValue=255)
+
+    shift_x, shift_y, response = _correlate(reference[y1:y2, x1:x2], page[y1:y2, x1:x2])
+    max_shift = config.ALIGNMENT_MAX_SHIFT_MM / 25.4 * dpi
+    if response < config.ALIGNMENT_MIN_RESPONSE or math.hypot(shift_x, shift_y) > max_shift:
+        return None
+    return Alignment(shift_x, shift_y, angle, response, width, height, dpi)
+
+
+__all__ = ['Alignment', 'encode_reference', 'decode_reference', 'fit_to_reference', 'estimate_alignment']
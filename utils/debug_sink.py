@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import re
+import queue
+import random
+import atexit
+import threading
+from datetime import datetime
+
+import config
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Tryby zapisu artefaktów diagnostycznych
+DEBUG_MODE_OFF = 'off'                # brak zapisu
+DEBUG_MODE_ON_FAILURE = 'on_failure'  # tylko nieudane lub niepewne rozpoznania
+DEBUG_MODE_SAMPLED = 'sampled'        # losowa próbka dokumentów
+
+
+class DebugBundle:
+    """Artefakty diagnostyczne jednego dokumentu, zbierane w pamięci do czasu decyzji o zapisie."""
+    def __init__(self, document_id):
+        self.document_id = document_id
+        self.artifacts = []
+        self.min_confidence = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Paczka może trafić do procesu etapu potoku - blokada nie jest przenoszona
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, name, image):
+        """Dodanie obrazu (PIL Image lub tablica numpy) do paczki."""
+        with self._lock:
+            self.artifacts.append((name, image))
+
+    def note_confidence(self, confidence):
+        """Zapamiętanie pewności rozpoznania - paczka przechowuje najniższą."""
+        with self._lock:
+            if self.min_confidence is None or confidence < self.min_confidence:
+                self.min_confidence = confidence
+
+
+class DebugSink:
+    """Asynchroniczny zapis artefaktów diagnostycznych.
+
+    Obrazy pośrednie są zbierane w pamięci dla każdego dokumentu, a po jego
+    przetworzeniu - w zależności od trybu - odrzucane albo kodowane do PNG
+    i pakowane do jednego archiwum ZIP na wątku w tle. Dzięki temu kodowanie
+    nie spowalnia przetwarzania, a równoległe importy nie nadpisują
+    wzajemnie swoich plików.
+    """
+    def __init__(self, mode=config.DEBUG_MODE, directory=config.DEBUG_DIR,
+                 sample_rate=config.DEBUG_SAMPLE_RATE,
+                 low_confidence=config.DEBUG_LOW_CONFIDENCE,
+                 max_pending=config.DEBUG_MAX_PENDING):
+        self.mode = mode
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.low_confidence = low_confidence
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def begin_document(self, document_id):
+        """Rozpoczęcie zbierania artefaktów dokumentu. Zwraca None, gdy nic nie będzie zapisane."""
+        if self.mode == DEBUG_MODE_OFF:
+            return None
+        if self.mode == DEBUG_MODE_SAMPLED and random.random() >= self.sample_rate:
+            return None
+        return DebugBundle(document_id)
+
+    def finish_document(self, bundle, failed=False):
+        """Zakończenie dokumentu - przekazanie paczki do zapisu, jeśli spełnia warunki trybu."""
+        if bundle is None or not bundle.artifacts:
+            return
+
+        if self.mode == DEBUG_MODE_ON_FAILURE:
+            low_confidence = (bundle.min_confidence is not None
+                              and bundle.min_confidence < self.low_confidence)
+            if not (failed or low_confidence):
+                return
+
+        self._ensure_thread()
+        try:
+            # Nie blokujemy przetwarzania - przy przepełnieniu kolejki paczka jest pomijana
+            self._queue.put_nowait(bundle)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Oczekiwanie na zapisanie wszystkich paczek z kolejki."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_thread(self):
+        """Uruchomienie wątku zapisującego przy pierwszej paczce."""
+        with self._thread_lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._writer_loop, name="debug-sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _writer_loop(self):
+        """Pętla wątku zapisującego paczki na dysk."""
+        while True:
+            bundle = self._queue.get()
+            try:
+                self._write_bundle(bundle)
+            except Exception as e:
+                log.error("Błąd podczas zapisu artefaktów diagnostycznych: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def _write_bundle(self, bundle):
+        """Zapis wszystkich artefaktów dokumentu do jednego archiwum ZIP."""
+        import zipfile
+
+        safe_id = re.sub(r'[^0-9A-Za-z_.-]', '_', os.path.splitext(os.path.basename(bundle.document_id))[0])
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.directory, f"{timestamp}_{safe_id}.zip")
+        tmp_path = path + ".tmp"
+
+        # PNG jest już skompresowany, więc wpisy archiwum nie są kompresowane ponownie
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for name, image in bundle.artifacts:
+                archive.writestr(f"{name}.png", self._encode_png(image))
+            if bundle.min_confidence is not None:
+                archive.writestr("confidence.txt", f"{bundle.min_confidence:.4f}\n")
+        os.replace(tmp_path, path)
+
+    def _encode_png(self, image):
+        """Kodowanie obrazu PIL lub tablicy numpy do PNG."""
+        if hasattr(image, 'save'):
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+            return buffer.getvalue()
+
+        import cv2
+        ok, encoded = cv2.imencode('.png', image)
+        if not ok:
+            raise ValueError("Nie udało się zakodować obrazu do PNG")
+        return encoded.tobytes()
+
+
+_shared_sink = None
+_shared_sink_lock = threading.Lock()
+
+
+def get_debug_sink():
+    """Wspólny dla całego procesu zapis artefaktów diagnostycznych."""
+    global _shared_sink
+    with _shared_sink_lock:
+        if _shared_sink is None:
+            _shared_sink = DebugSink()
+        return _shared_sink
+
+
+__all__ = ['DebugSink', 'DebugBundle', 'get_debug_sink',
+           'DEBUG_MODE_OFF', 'DEBUG_MODE_ON_FAILURE', 'DEBUG_MODE_SAMPLED']
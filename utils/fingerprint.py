@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import config
+
+# Minimalna różnica jasności (0-255) sąsiednich komórek siatki, przy której bit odcisku jest ustawiany
+EDGE_MARGIN = 5
+
+
+def page_fingerprint(image, hash_size=config.TEMPLATE_FINGERPRINT_SIZE):
+    """Odcisk strony (dHash w poziomie i w pionie) - 2 * `hash_size` ** 2 bitów jako liczba całkowita.
+
+    Obraz w skali szarości jest zmniejszany do siatki hash_size x hash_size
+    (z dodatkową kolumną lub wierszem), a bit mówi, czy komórka jest
+    wyraźnie jaśniejsza od sąsiadki z prawej (lub poniżej). Porównania
+    w obu kierunkach obejmują zarówno pionowe, jak i poziome linie
+    formularza, a próg EDGE_MARGIN sprawia, że na jednolitym tle szum skanu
+    nie zmienia bitów - odcisk zależy od układu formularza, a nie od
+    jasności skanu ani od treści wpisanej w pola.
+    """
+    from PIL import Image, ImageOps
+
+    gray = ImageOps.autocontrast(image.convert("L"))
+    rows = gray.resize((hash_size + 1, hash_size), Image.BOX).load()
+    columns = gray.resize((hash_size, hash_size + 1), Image.BOX).load()
+    value = 0
+    for y in range(hash_size):
+        for x in range(hash_size):
+            value = (value << 1) | (rows[x, y] - rows[x + 1, y] > EDGE_MARGIN)
+            value = (value << 1) | (columns[x, y] - columns[x, y + 1] > EDGE_MARGIN)
+    return value
+
+
+def _text_length(hash_size):
+    return 2 * hash_size * hash_size // 4
+
+
+def fingerprint_to_text(fingerprint, hash_size=config.TEMPLATE_FINGERPRINT_SIZE):
+    """Zapis odcisku w bazie - tekst szesnastkowy o stałej długości."""
+    return f"{fingerprint:0{_text_length(hash_size)}x}"
+
+
+def hamming_distance(first, second):
+    """Liczba różniących się bitów dwóch odcisków."""
+    return bin(first ^ second).count("1")
+
+
+def nearest_fingerprint(fingerprint, candidates, hash_size=config.TEMPLATE_FINGERPRINT_SIZE):
+    """Najbliższy odcisk spośród par (klucz, odcisk_tekst) - zwraca (klucz, odległość) lub (None, None).
+
+    Pomijane są odciski innej długości (obliczone przy innym
+    TEMPLATE_FINGERPRINT_SIZE). Przy równej odległości wygrywa
+    kandydat wymieniony wcześniej.
+    """
+    length = _text_length(hash_size)
+    best_key, best_distance = None, None
+    for key, text in candidates:
+        if not text or len(text) != length:
+            continue
+        distance = hamming_distance(fingerprint, int(text, 16))
+        if best_distance is None or distance < best_distance:
+            best_key, best_distance = key, distance
+    return best_key, best_distance
+
+
+__all__ = ['page_fingerprint', 'fingerprint_to_text', 'hamming_distance', 'nearest_fingerprint']
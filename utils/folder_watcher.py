@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+import config
+
+# Sposoby wykrywania nowych plików
+WATCH_BACKEND_AUTO = 'auto'
+WATCH_BACKEND_INOTIFY = 'inotify'
+WATCH_BACKEND_POLLING = 'polling'
+
+# Flagi zdarzeń inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# Nagłówek zdarzenia inotify: wd, mask, cookie, len (za nim nazwa pliku o długości len)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Liczba końcowych bajtów pliku, w których szukany jest znacznik końca PDF
+PDF_TAIL_BYTES = 1024
+
+
+def iter_pdf_files(directory, recursive=False):
+    """Pliki PDF w katalogu (opcjonalnie także w podkatalogach)."""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError as e:
+        print(f"Nie można odczytać katalogu {directory}: {e}")
+        return
+
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from iter_pdf_files(entry.path, recursive)
+            elif entry.name.lower().endswith('.pdf') and entry.is_file():
+                yield entry.path
+        except OSError:
+            continue
+
+
+def _file_signature(path):
+    """Rozmiar i czas modyfikacji pliku lub None, gdy plik nie istnieje."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def is_pdf_complete(path, size):
+    """Sprawdzenie, czy plik PDF kończy się znacznikiem %%EOF (skaner zakończył zapis)."""
+    if size == 0:
+        return False
+    try:
+        with open(path, 'rb') as f:
+            f.seek(max(0, size - PDF_TAIL_BYTES))
+            return b'%%EOF' in f.read(PDF_TAIL_BYTES)
+    except OSError:
+        # Np. plik wciąż otwarty na wyłączność przez program zapisujący
+        return False
+
+
+class _InotifyBackend:
+    """Zdarzenia inotify z jądra Linuksa (przez ctypes, bez dodatkowych zależności).
+
+    Zapisy wykonywane przez inne komputery w udziałach sieciowych (NFS, SMB)
+    nie generują zdarzeń - dla takich katalogów należy użyć odpytywania.
+    """
+    # Usunięcia i przeniesienia poza katalog zgłaszane są jak zmiany - FolderWatcher zapomina wtedy plik
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF
+
+    def __init__(self, directories, recursive):
+        library = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "Biblioteka C bez obsługi inotify")
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            self._raise_errno("inotify_init1")
+
+        self.recursive = recursive
+        self._watches = {}  # deskryptor obserwacji -> katalog
+        try:
+            for directory in directories:
+                self._watch_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _raise_errno(self, operation, path=None):
+        error = ctypes.get_errno()
+        raise OSError(error, f"{operation}: {os.strerror(error)}", path)
+
+    def _watch_tree(self, directory):
+        """Obserwacja katalogu (i jego podkatalogów w trybie rekurencyjnym)."""
+        watch = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK | IN_ONLYDIR)
+        if watch < 0:
+            self._raise_errno("inotify_add_watch", directory)
+        self._watches[watch] = directory
+
+        if self.recursive:
+            for entry in os.scandir(directory):
+                if entry.is_dir(follow_symlinks=False):
+                    self._watch_tree(entry.path)
+
+    def wait(self, timeout):
+        """Ścieżki zgłoszone przez jądro w ciągu `timeout` sekund lub None, gdy potrzebny jest pełny przegląd."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                watch, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Kolejka jądra przepełniona (np. podczas przeciążenia) - zdarzenia utracone
+                    return None
+                if mask & IN_IGNORED:
+                    self._watches.pop(watch, None)
+                    continue
+
+                directory = self._watches.get(watch)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+
+                if mask & IN_ISDIR:
+                    if self.recursive:
+                        # Pliki mogły pojawić się w nowym katalogu przed dodaniem obserwacji
+                        try:
+                            self._watch_tree(path)
+                        except OSError as e:
+                            print(f"Nie można obserwować katalogu {path}: {e}")
+                        changed.update(iter_pdf_files(path, recursive=True))
+                else:
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingBackend:
+    """Okresowe porównywanie zawartości katalogów - działa na każdym systemie i udziale sieciowym."""
+    def __init__(self, directories, recursive, interval):
+        self.directories = directories
+        self.recursive = recursive
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._next_scan = time.monotonic() + interval
+
+    def _scan(self):
+        return {
+            path: _file_signature(path)
+            for directory in self.directories
+            for path in iter_pdf_files(directory, self.recursive)
+        }
+
+    def wait(self, timeout):
+        """Ścieżki nowych, zmienionych i usuniętych plików (pusty zbiór, gdy nie minął jeszcze czas przeglądu)."""
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        if delay > 0:
+            time.sleep(delay)
+
+        snapshot = self._scan()
+        self._next_scan = time.monotonic() + self.interval
+        changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+        changed.update(self._snapshot.keys() - snapshot.keys())
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """Obserwacja katalogów i zgłaszanie w pełni zapisanych plików PDF.
+
+    Nowe lub zmienione pliki są najpierw kandydatami - plik zgłaszany jest
+    dopiero wtedy, gdy jego rozmiar i data modyfikacji nie zmieniły się przez
+    `stable_seconds` i kończy się znacznikiem %%EOF (albo od jego pojawienia
+    się minęło `incomplete_timeout` sekund). Pliki obecne w katalogach w
+    chwili uruchomienia również są zgłaszane. Plik zgłoszony raz nie jest
+    zgłaszany ponownie, dopóki się nie zmieni; po usunięciu lub przeniesieniu
+    pliku poza obserwowane katalogi watcher o nim zapomina.
+    """
+    def __init__(self, directories, recursive=False, backend=config.WATCH_BACKEND,
+                 poll_interval=config.WATCH_POLL_INTERVAL, stable_seconds=config.WATCH_STABLE_SECONDS,
+                 incomplete_timeout=config.WATCH_INCOMPLETE_TIMEOUT):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.recursive = recursive
+        self.stable_seconds = stable_seconds
+        self.incomplete_timeout = incomplete_timeout
+        self._candidates = {}  # ścieżka -> (sygnatura, od kiedy bez zmian, od kiedy obserwowany)
+        self._reported = {}  # ścieżka -> sygnatura w chwili zgłoszenia
+        self._backend = self._create_backend(backend, poll_interval)
+        self.backend = (WATCH_BACKEND_INOTIFY if isinstance(self._backend, _InotifyBackend)
+                        else WATCH_BACKEND_POLLING)
+        self._rescan()
+
+    def _create_backend(self, backend, poll_interval):
+        if backend not in (WATCH_BACKEND_AUTO, WATCH_BACKEND_INOTIFY, WATCH_BACKEND_POLLING):
+            raise ValueError(f"Nieznany sposób obserwacji katalogów: {backend}")
+
+        if backend == WATCH_BACKEND_INOTIFY or (backend == WATCH_BACKEND_AUTO and sys.platform.startswith('linux')):
+            try:
+                return _InotifyBackend(self.directories, self.recursive)
+            except (OSError, AttributeError) as e:
+                if backend == WATCH_BACKEND_INOTIFY:
+                    raise
+                print(f"inotify niedostępne ({e}) - katalogi będą odpytywane co {poll_interval}s")
+        return _PollingBackend(self.directories, self.recursive, poll_interval)
+
+    def _rescan(self):
+        """Dodanie wszystkich plików PDF z obserwowanych katalogów jako kandydatów.
+
+        Zgłoszone wcześniej pliki, których już nie ma, są zapominane.
+        """
+        present = set()
+        for directory in self.directories:
+            for path in iter_pdf_files(directory, self.recursive):
+                present.add(path)
+                self._candidates.setdefault(path, None)
+        for path in self._reported.keys() - present:
+            del self._reported[path]
+
+    def poll(self, timeout=0.5):
+        """Oczekiwanie (najwyżej `timeout` sekund) na zmiany. Zwraca listę plików gotowych do importu."""
+        changed = self._backend.wait(timeout)
+        if changed is None:
+            self._rescan()
+        else:
+            for path in changed:
+                if path.lower().endswith('.pdf'):
+                    self._candidates.setdefault(path, None)
+        return self._ready_files()
+
+    def _ready_files(self):
+        """Kandydaci, których zapis się zakończył."""
+        now = time.monotonic()
+        ready = []
+
+        for path, state in list(self._candidates.items()):
+            signature = _file_signature(path)
+            if signature is None:
+                # Plik usunięty lub przeniesiony (także przed zakończeniem zapisu)
+                del self._candidates[path]
+                self._reported.pop(path, None)
+                continue
+
+            if state is None or state[0] != signature:
+                first_seen = now if state is None else state[2]
+                self._candidates[path] = (signature, now, first_seen)
+                continue
+
+            _, stable_since, first_seen = state
+            if now - stable_since < self.stable_seconds:
+                continue
+
+            if self._reported.get(path) == signature:
+                # Plik już zgłoszony i od tego czasu niezmieniony (np. po ponownym przeglądzie)
+                del self._candidates[path]
+            elif is_pdf_complete(path, signature[0]) or now - first_seen >= self.incomplete_timeout:
+                del self._candidates[path]
+                self._reported[path] = signature
+                ready.append(path)
+
+        return ready
+
+    def pending_count(self):
+        """Liczba plików oczekujących na zakończenie zapisu."""
+        return len(self._candidates)
+
+    def close(self):
+        self._backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+__all__ = ['FolderWatcher', 'iter_pdf_files', 'is_pdf_complete',
+           'WATCH_BACKEND_AUTO', 'WATCH_BACKEND_INOTIFY', 'WATCH_BACKEND_POLLING']
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+# Rozmiar bloku przy strumieniowym czytaniu pliku
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path, chunk_size=HASH_CHUNK_SIZE):
+    """Obliczenie skrótu SHA-256 zawartości pliku bez wczytywania go w całości do pamięci."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+__all__ = ['file_sha256']
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+import threading
+from contextlib import contextmanager
+
+import config
+
+# Wspólny przedrostek loggerów aplikacji - poziom i wyjście ustawiane są raz dla wszystkich
+LOGGER_NAME = "raporty"
+
+# Poziom wyłączający wszystkie komunikaty
+LOG_OFF = logging.CRITICAL + 10
+
+_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'off': LOG_OFF,
+}
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Wypisywanie na bieżący sys.stdout (jak print) - także po jego podmianie w procesie roboczym."""
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _configure():
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root = logging.getLogger(LOGGER_NAME)
+        root.addHandler(handler)
+        root.propagate = False
+        root.setLevel(_level_value(config.LOG_LEVEL))
+        _configured = True
+
+
+def _level_value(level):
+    if isinstance(level, str):
+        if level.lower() not in _LEVELS:
+            raise ValueError(f"Nieznany poziom komunikatów: {level}")
+        return _LEVELS[level.lower()]
+    return level
+
+
+def set_log_level(level):
+    """Poziom komunikatów wszystkich loggerów aplikacji: nazwa z config.LOG_LEVEL lub poziom modułu logging."""
+    _configure()
+    logging.getLogger(LOGGER_NAME).setLevel(_level_value(level))
+
+
+@contextmanager
+def log_level(level):
+    """Tymczasowa zmiana poziomu komunikatów (jak set_log_level) na czas bloku `with`."""
+    _configure()
+    logger = logging.getLogger(LOGGER_NAME)
+    previous = logger.level
+    logger.setLevel(_level_value(level))
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+
+def get_logger(name):
+    """Logger modułu aplikacji (np. get_logger(__name__)).
+
+    Komunikaty należy przekazywać z argumentami (log.debug("OCR %s: %r", roi, text)),
+    a nie jako gotowy f-string - poniżej ustawionego poziomu wywołanie kończy się
+    na porównaniu poziomów, bez formatowania tekstu.
+    """
+    if not _configured:
+        _configure()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+__all__ = ['LOG_OFF', 'get_logger', 'set_log_level', 'log_level']
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+
+import config
+
+# Poziomy szczegółowości metryk (config.METRICS_LEVEL)
+METRICS_OFF = 'off'            # brak pomiarów
+METRICS_BASIC = 'basic'        # etapy dokumentu (renderowanie, OCR, formatowanie, zapis) i liczniki
+METRICS_DETAILED = 'detailed'  # dodatkowo każde ROI i każde wywołanie silnika OCR
+_LEVELS = {METRICS_OFF: 0, METRICS_BASIC: 1, METRICS_DETAILED: 2}
+
+# Granice przedziałów histogramów czasu (sekundy)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Przedrostek nazw metryk w formacie Prometheus
+PREFIX = "raporty_"
+
+# Pliki eksportu w katalogu metryk
+PROMETHEUS_FILE = "metrics.prom"
+SUMMARY_FILE = "metrics.json"
+
+# Pomiar pominięty na bieżącym poziomie - wspólny, wielokrotnego użytku obiekt bez kosztu
+_NULL_SPAN = nullcontext()
+
+
+class _Histogram:
+    """Liczby pomiarów w przedziałach, suma, liczba i maksimum."""
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class _Span:
+    """Pomiar czasu bloku `with` zapisywany do histogramu."""
+    __slots__ = ('metrics', 'key', 'start')
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """Liczniki i histogramy czasu przetwarzania dokumentów.
+
+    Pomiar ma poziom szczegółowości - span(), observe() i inc() poniżej
+    bieżącego poziomu nic nie robią (span() zwraca wspólny pusty kontekst),
+    więc przy wyłączonych metrykach koszt ogranicza się do porównania liczb.
+    Wyniki można zapisać w formacie tekstowym Prometheus (np. dla
+    node_exporter --collector.textfile) i jako podsumowanie JSON z
+    przybliżonymi percentylami. Procesy robocze przekazują swoje pomiary
+    procesowi głównemu przez snapshot() i merge().
+    """
+    def __init__(self, level=config.METRICS_LEVEL, buckets=DEFAULT_BUCKETS):
+        if level not in _LEVELS:
+            raise ValueError(f"Nieznany poziom metryk: {level}")
+        self.buckets = tuple(buckets)
+        self._level = _LEVELS[level]
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @property
+    def level(self):
+        return next(name for name, value in _LEVELS.items() if value == self._level)
+
+    def set_level(self, level):
+        if level not in _LEVELS:
+            raise ValueError(f"Nieznany poziom metryk: {level}")
+        self._level = _LEVELS[level]
+
+    def enabled(self, level=METRICS_BASIC):
+        """Czy pomiary danego poziomu są zbierane."""
+        return self._level >= _LEVELS[level]
+
+    def span(self, name, level=METRICS_BASIC, **labels):
+        """Kontekst mierzący czas bloku (histogram `name` z etykietami)."""
+        if self._level < _LEVELS[level]:
+            return _NULL_SPAN
+        return _Span(self, _key(name, labels))
+
+    def observe(self, name, seconds, level=METRICS_BASIC, **labels):
+        """Dodanie zmierzonego czasu do histogramu."""
+        if self._level >= _LEVELS[level]:
+            self._observe(_key(name, labels), seconds)
+
+    def inc(self, name, amount=1, level=METRICS_BASIC, **labels):
+        """Zwiększenie licznika."""
+        if self._level < _LEVELS[level]:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, key, seconds):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram.counts[index] += 1
+                    break
+            histogram.sum += seconds
+            histogram.count += 1
+            histogram.max = max(histogram.max, seconds)
+
+    def snapshot(self, reset=False):
+        """Pomiary jako dane dające się serializować (pickle, JSON) - np. do przekazania z procesu roboczego."""
+        with self._lock:
+            snapshot = {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, list(labels), list(histogram.counts), histogram.sum, histogram.count, histogram.max]
+                    for (name, labels), histogram in self._histograms.items()
+                ],
+            }
+            if reset:
+                self._counters.clear()
+                self._histograms.clear()
+        return snapshot
+
+    def merge(self, snapshot):
+        """Dodanie pomiarów z snapshot() innego procesu."""
+        if not snapshot:
+            return
+        with self._lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, counts, total, count, maximum in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = _Histogram(len(self.buckets))
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+                histogram.max = max(histogram.max, maximum)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        """Pomiary w formacie tekstowym Prometheus (histogramy skumulowane z przedziałem +Inf)."""
+        snapshot = self.snapshot()
+        lines = []
+
+        counters = {}
+        for name, labels, value in snapshot['counters']:
+            counters.setdefault(name, []).append((labels, value))
+        for name in sorted(counters):
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            for labels, value in sorted(counters[name]):
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+
+        histograms = {}
+        for name, labels, counts, total, count, _ in snapshot['histograms']:
+            histograms.setdefault(name, []).append((labels, counts, total, count))
+        for name in sorted(histograms):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for labels, counts, total, count in sorted(histograms[name]):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _quantile(self, counts, count, maximum, quantile):
+        """Przybliżony kwantyl - interpolacja liniowa w przedziale histogramu (jak histogram_quantile)."""
+        rank = quantile * count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                return min(maximum, lower + (bound - lower) * (rank - cumulative) / bucket_count)
+            cumulative += bucket_count
+            lower = bound
+        return maximum
+
+    def summary(self):
+        """Podsumowanie pomiarów: liczniki oraz dla histogramów liczba, suma, średnia, p50, p95 i maksimum."""
+        snapshot = self.snapshot()
+        return {
+            'poziom': self.level,
+            'liczniki': [
+                {'nazwa': name, 'etykiety': dict(labels), 'wartosc': value}
+                for name, labels, value in sorted(snapshot['counters'])
+            ],
+            'histogramy': [
+                {
+                    'nazwa': name,
+                    'etykiety': dict(labels),
+                    'liczba': count,
+                    'suma': total,
+                    'srednia': total / count if count else 0.0,
+                    'p50': self._quantile(counts, count, maximum, 0.5),
+                    'p95': self._quantile(counts, count, maximum, 0.95),
+                    'max': maximum,
+                }
+                for name, labels, counts, total, count, maximum in sorted(snapshot['histograms'])
+            ],
+        }
+
+    def export(self, directory=config.METRICS_DIR):
+        """Zapis pliku Prometheus i podsumowania JSON (podmiana atomowa - czytelnik nie widzi połowy pliku)."""
+        os.makedirs(directory, exist_ok=True)
+        outputs = (
+            (PROMETHEUS_FILE, self.to_prometheus()),
+            (SUMMARY_FILE, json.dumps(self.summary(), indent=2, ensure_ascii=False)),
+        )
+        for name, content in outputs:
+            path = os.path.join(directory, name)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temporary, path)
+        return directory
+
+
+def format_metrics_summary(summary):
+    """Tabela czasów etapów i liczników do wypisania w konsoli."""
+    lines = ["", "Metryki:"]
+    for histogram in summary['histogramy']:
+        labels = ",".join(f"{name}={value}" for name, value in histogram['etykiety'].items())
+        lines.append(
+            f"  {histogram['nazwa']:<30} {labels:<34} {histogram['liczba']:>7} "
+            f"śr. {histogram['srednia'] * 1000:9.1f} ms  p95 {histogram['p95'] * 1000:9.1f} ms  "
+            f"max {histogram['max'] * 1000:9.1f} ms"
+        )
+    for counter in summary['liczniki']:
+        labels = ",".join(f"{name}={value}" for name, value in counter['etykiety'].items())
+        lines.append(f"  {counter['nazwa']:<30} {labels:<34} {counter['wartosc']:>7}")
+    return "\n".join(lines)
+
+
+_shared_metrics = None
+_shared_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Wspólne dla całego procesu metryki (poziom z config.METRICS_LEVEL)."""
+    global _shared_metrics
+    with _shared_metrics_lock:
+        if _shared_metrics is None:
+            _shared_metrics = Metrics()
+        return _shared_metrics
+
+
+__all__ = ['Metrics', 'get_metrics', 'format_metrics_summary', 'DEFAULT_BUCKETS',
+           'METRICS_OFF', 'METRICS_BASIC', 'METRICS_DETAILED']
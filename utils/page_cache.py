@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import config
+from utils.metrics import get_metrics
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+
+class PageCache:
+    """Dyskowa pamięć podręczna zrasteryzowanych stron PDF.
+
+    Kluczem jest skrót zawartości pliku, rozdzielczość i przestrzeń barw,
+    więc ten sam dokument pod inną nazwą lub w innym katalogu trafia w tę samą
+    pozycję. Strony zapisywane są jako surowe tablice .npy, które można
+    mapować do pamięci. Łączny rozmiar jest ograniczony - przy przekroczeniu
+    usuwane są pozycje najdawniej używane (LRU według czasu modyfikacji,
+    odświeżanego przy każdym trafieniu).
+    """
+    def __init__(self, cache_dir=config.PAGE_CACHE_DIR, max_bytes=config.PAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, file_hash, dpi, colorspace):
+        """Ścieżka pliku pamięci podręcznej dla danego klucza."""
+        return os.path.join(self.cache_dir, f"{file_hash}_{int(dpi)}_{colorspace}.npy")
+
+    def get(self, file_hash, dpi, colorspace):
+        """Pobranie strony jako tablicy mapowanej do pamięci (tylko do odczytu) lub None."""
+        import numpy as np
+
+        path = self._path(file_hash, dpi, colorspace)
+        try:
+            array = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError, OSError):
+            get_metrics().inc("pamiec_podreczna_stron_total", wynik="brak")
+            return None
+        get_metrics().inc("pamiec_podreczna_stron_total", wynik="trafienie")
+
+        # Odświeżenie czasu ostatniego użycia dla polityki LRU
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return array
+
+    def put(self, file_hash, dpi, colorspace, array):
+        """Zapisanie strony w pamięci podręcznej i usunięcie najstarszych pozycji ponad limit."""
+        import numpy as np
+
+        path = self._path(file_hash, dpi, colorspace)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            # Atomowa podmiana - inne procesy nigdy nie widzą niepełnego pliku
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("Nie udało się zapisać strony w pamięci podręcznej: %s", e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Usuwanie najdawniej używanych pozycji, dopóki rozmiar przekracza limit."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith('.npy'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    # Plik mógł zostać usunięty przez inny proces lub jest otwarty (Windows)
+                    pass
+
+    def clear(self):
+        """Usunięcie wszystkich pozycji z pamięci podręcznej."""
+        with self._lock:
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.npy'):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+
+__all__ = ['PageCache']
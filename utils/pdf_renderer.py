@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import importlib.util
+import config
+
+# Sprawdzenie, czy PyMuPDF jest zainstalowany (import następuje przy pierwszym renderowaniu)
+PYMUPDF_AVAILABLE = (importlib.util.find_spec("pymupdf") is not None
+                     or importlib.util.find_spec("fitz") is not None)
+
+
+def _import_fitz():
+    """Import PyMuPDF (nowsze wersje udostępniają moduł 'pymupdf', starsze tylko 'fitz')."""
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz
+    return fitz
+
+
+class PDFRenderer:
+    """Renderowanie pierwszej strony PDF lub wybranych obszarów tej strony.
+
+    Domyślnie używa PyMuPDF, który otwiera dokument raz i rasteryzuje tylko
+    pierwszą stronę (albo tylko prostokąty ROI). Gdy PyMuPDF nie jest dostępny,
+    używany jest poppler (pdf2image) ograniczony do pierwszej strony.
+    Współrzędne obszarów podawane są w pikselach obrazu o rozdzielczości `dpi`
+    - tak samo jak ROI zapisywane przez kreator szablonu.
+    """
+    def __init__(self, dpi=config.PDF_RENDER_DPI, backend=config.PDF_RENDER_BACKEND):
+        self.dpi = dpi
+        self.backend = backend if (backend != 'pymupdf' or PYMUPDF_AVAILABLE) else 'poppler'
+
+    def render_page(self, pdf_path, dpi=None, grayscale=False):
+        """Renderowanie pierwszej strony PDF do obrazu PIL."""
+        dpi = dpi or self.dpi
+        if self.backend == 'pymupdf':
+            fitz = _import_fitz()
+            with fitz.open(pdf_path) as doc:
+                if doc.page_count == 0:
+                    return None
+                return self._render_pymupdf(doc[0], dpi, grayscale)
+        return self._render_poppler(pdf_path, dpi, grayscale)
+
+    def render_regions(self, pdf_path, regions, dpi=None, grayscale=False):
+        """Renderowanie tylko wskazanych obszarów pierwszej strony.
+
+        `regions` to słownik nazwa -> (x1, y1, x2, y2). Zwraca słownik
+        nazwa -> obraz PIL (lub None, jeśli dokument nie ma stron).
+        """
+        dpi = dpi or self.dpi
+        if self.backend == 'pymupdf':
+            fitz = _import_fitz()
+            with fitz.open(pdf_path) as doc:
+                if doc.page_count == 0:
+                    return {name: None for name in regions}
+                page = doc[0]
+                scale = 72.0 / dpi
+                return {
+                    name: self._render_pymupdf(page, dpi, grayscale,
+                                               clip=fitz.Rect(*[v * scale for v in box]))
+                    for name, box in regions.items()
+                }
+
+        # Poppler nie obsługuje wycinków - renderujemy stronę raz i przycinamy
+        page_image = self._render_poppler(pdf_path, dpi, grayscale)
+        if page_image is None:
+            return {name: None for name in regions}
+        return {name: page_image.crop(tuple(box)) for name, box in regions.items()}
+
+    def _render_pymupdf(self, page, dpi, grayscale, clip=None):
+        """Rasteryzacja strony (lub jej fragmentu) za pomocą PyMuPDF."""
+        from PIL import Image
+
+        fitz = _import_fitz()
+        zoom = dpi / 72.0
+        colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip,
+                                 colorspace=colorspace, alpha=False)
+        mode = "L" if grayscale else "RGB"
+        return Image.frombytes(mode, (pixmap.width, pixmap.height), pixmap.samples)
+
+    def _render_poppler(self, pdf_path, dpi, grayscale):
+        """Rasteryzacja pierwszej strony za pomocą popplera (pdf2image)."""
+        from pdf2image import convert_from_path
+
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=1, last_page=1,
+                                   grayscale=grayscale)
+        if not images:
+            return None
+        return images[0]
+
+
+__all__ = ['PDFRenderer', 'PYMUPDF_AVAILABLE']
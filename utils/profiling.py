@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import random
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import config
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Pliki profilu zapisywane dla każdego dokumentu (przedrostek: znacznik czasu i identyfikator dokumentu)
+PROFILE_SUFFIX = ".prof"            # cProfile (pstats, snakeviz)
+COLLAPSED_SUFFIX = ".collapsed"     # stosy w formacie flamegraph.pl / speedscope
+ALLOCATIONS_SUFFIX = ".alloc.txt"   # największe alokacje (tracemalloc)
+
+# Wierzchołki stosu oznaczające bezczynny wątek (oczekiwanie w puli lub kolejce)
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+_IDLE_FUNCTIONS = (("thread.py", "_worker"),)  # concurrent.futures czeka na zadanie w kodzie C
+
+# Dokument niewybrany do profilowania - wspólny, pusty kontekst
+_NULL_PROFILE = nullcontext()
+
+
+class _StackSampler(threading.Thread):
+    """Próbkowanie stosów wszystkich wątków procesu w stałych odstępach.
+
+    cProfile mierzy tylko wątek, który go włączył, a rozpoznawanie ROI działa
+    w puli wątków - próbki obejmują więc wszystkie zajęte wątki (nazwa wątku
+    jest korzeniem stosu). Przy okazji zapamiętywana jest migawka tracemalloc
+    z chwili największego zajęcia pamięci.
+    """
+    def __init__(self, interval, target_id, trace_memory):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.target_id = target_id
+        self.trace_memory = trace_memory
+        self.stacks = Counter()
+        self.peak_snapshot = None
+        self.peak_size = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample_stacks()
+            if self.trace_memory:
+                self._sample_memory()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def _sample_stacks(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self.ident:
+                continue
+            if thread_id != self.target_id and self._idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(label.replace(";", ","))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)).replace(";", ","))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def _idle(self, frame):
+        filename = os.path.basename(frame.f_code.co_filename)
+        return filename in _IDLE_FILES or (filename, frame.f_code.co_name) in _IDLE_FUNCTIONS
+
+    def _sample_memory(self):
+        # Nowa migawka dopiero przy wyraźnie większym zajęciu - take_snapshot() jest kosztowne
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.peak_size * 1.1:
+            self.peak_size = current
+            self.peak_snapshot = tracemalloc.take_snapshot()
+
+
+class DocumentProfiler:
+    """Profilowanie wybranego odsetka dokumentów.
+
+    Dla dokumentu wybranego do profilowania zapisywane są trzy pliki:
+    zrzut cProfile, stosy zebrane próbkowaniem w formacie "collapsed"
+    (gotowe do flamegraph.pl lub speedscope) i raport tracemalloc
+    z największymi miejscami alokacji - w chwili szczytowego zajęcia
+    pamięci i jako przyrost po dokumencie. W procesie profilowany jest
+    najwyżej jeden dokument naraz; dokumenty wybrane w tym czasie
+    przetwarzane są zwyczajnie.
+    """
+    def __init__(self, sample_rate=config.PROFILE_SAMPLE_RATE, directory=config.PROFILE_DIR,
+                 interval=config.PROFILE_SAMPLE_INTERVAL, top_allocations=config.PROFILE_TOP_ALLOCATIONS):
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.interval = interval
+        self.top_allocations = top_allocations
+        self._busy = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def select(self):
+        """Losowanie, czy kolejny dokument ma być profilowany."""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def document(self, document_id):
+        """Kontekst profilujący dokument, jeśli został wylosowany (w przeciwnym razie pusty)."""
+        if not self.select():
+            return _NULL_PROFILE
+        return self.profile(document_id)
+
+    @contextmanager
+    def profile(self, document_id):
+        """Profilowanie bloku `with` i zapis plików profilu dokumentu."""
+        if not self._busy.acquire(blocking=False):
+            yield
+            return
+
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+
+            sampler = _StackSampler(self.interval, threading.get_ident(), trace_memory=True)
+            profiler = cProfile.Profile()
+            sampler.start()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                sampler.stop()
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+                try:
+                    path = self._write(document_id, profiler, sampler, before, after, peak)
+                    log.info("Profil dokumentu zapisano: %s.*", path)
+                except OSError as e:
+                    log.error("Błąd podczas zapisu profilu dokumentu: %s", e)
+        finally:
+            self._busy.release()
+
+    def _write(self, document_id, profiler, sampler, before, after, peak):
+        """Zapis plików profilu - zwraca wspólny przedrostek ścieżek."""
+        os.makedirs(self.directory, exist_ok=True)
+        safe_id = re.sub(r'[^0-9A-Za-z_.-]', '_', os.path.splitext(os.path.basename(document_id))[0])
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.directory, f"{timestamp}_{safe_id}")
+
+        profiler.dump_stats(path + PROFILE_SUFFIX)
+
+        with open(path + COLLAPSED_SUFFIX, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(sampler.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        with open(path + ALLOCATIONS_SUFFIX, 'w', encoding='utf-8') as f:
+            f.write(f"Dokument: {document_id}\n")
+            f.write(f"Szczytowe zajęcie pamięci (tracemalloc): {peak / 1024 ** 2:.1f} MB\n")
+            if sampler.peak_snapshot is not None:
+                f.write(f"\nNajwiększe alokacje przy szczytowym zajęciu ({sampler.peak_size / 1024 ** 2:.1f} MB):\n")
+                for statistic in self._filter(sampler.peak_snapshot).statistics('lineno')[:self.top_allocations]:
+                    f.write(f"  {statistic}\n")
+            f.write("\nPrzyrost pamięci po dokumencie:\n")
+            growth = self._filter(after).compare_to(self._filter(before), 'lineno')
+            for statistic in growth[:self.top_allocations]:
+                f.write(f"  {statistic}\n")
+        return path
+
+    def _filter(self, snapshot):
+        """Pominięcie alokacji samego profilowania."""
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+
+_shared_profiler = None
+_shared_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """Wspólne dla całego procesu profilowanie dokumentów (odsetek z config.PROFILE_SAMPLE_RATE)."""
+    global _shared_profiler
+    with _shared_profiler_lock:
+        if _shared_profiler is None:
+            _shared_profiler = DocumentProfiler()
+        return _shared_profiler
+
+
+__all__ = ['DocumentProfiler', 'get_profiler']
@@ -11,11 +11,16 @@ from controllers.pdf_processor import PDFProcessor
 
 
 class TemplateCreatorDialog(QDialog):
-    """Dialog do tworzenia szablonu rozpoznawania dokumentów."""
-    def __init__(self, pdf_path, db_manager, parent=None):
+    """Dialog do tworzenia szablonu rozpoznawania dokumentów.
+    
+    Z `replace_template` (wiersz jak z DatabaseManager.get_templates) dialog
+    zastępuje istniejący szablon zamiast dodawać kolejny.
+    """
+    def __init__(self, pdf_path, db_manager, parent=None, replace_template=None):
         super().__init__(parent)
         self.pdf_path = pdf_path
         self.db_manager = db_manager
+        self.replace_template = replace_template
         self.roi = {"numer_zlecenia": None, "numer_operatora": None, "data": None}
         self.current_roi_type = None
         self.selection_start = None
@@ -28,7 +33,10 @@ class TemplateCreatorDialog(QDialog):
         
     def init_ui(self):
         """Inicjalizacja interfejsu użytkownika."""
-        self.setWindowTitle("Kreator szablonu rozpoznawania")
+        if self.replace_template:
+            self.setWindowTitle(f"Zastąpienie szablonu rozpoznawania (ID={self.replace_template[0]})")
+        else:
+            self.setWindowTitle("Kreator szablonu rozpoznawania")
         self.setMinimumSize(800, 600)
         
         layout = QVBoxLayout()
@@ -72,7 +80,7 @@ class TemplateCreatorDialog(QDialog):
         # Nazwa szablonu
         name_layout = QHBoxLayout()
         name_layout.addWidget(QLabel("Nazwa szablonu:"))
-        self.template_name = QLineEdit("Domyślny szablon")
+        self.template_name = QLineEdit(self.replace_template[1] if self.replace_template else "Domyślny szablon")
         name_layout.addWidget(self.template_name)
         layout.addLayout(name_layout)
         
@@ -242,11 +250,18 @@ class TemplateCreatorDialog(QDialog):
             if not template_name:
                 template_name = "Domyślny szablon"
             
+            # Odcisk strony wzorcowej - przy kilku szablonach dokument trafia do najbliższego,
+            # oraz sama strona w niskiej rozdzielczości - do niej wyrównywane są ROI dokumentów
+            odcisk, strona_wzorcowa = PDFProcessor(self.db_manager).template_reference(self.pdf_path)
+            
             self.db_manager.save_template(
                 template_name,
                 self.roi["numer_zlecenia"],
                 self.roi["numer_operatora"],
-                self.roi["data"]
+                self.roi["data"],
+                odcisk,
+                strona_wzorcowa,
+                replace_id=self.replace_template[0] if self.replace_template else None
             )
             
             QMessageBox.information(self, "Sukces", "Szablon został pomyślnie zapisany.")
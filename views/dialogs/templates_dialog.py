@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget,
+                            QTableWidgetItem, QHeaderView, QAbstractItemView, QDialogButtonBox,
+                            QMessageBox, QFileDialog)
+
+from controllers.pdf_processor import PDFProcessor
+
+
+class TemplateManagerDialog(QDialog):
+    """Dialog do przeglądania, zastępowania i usuwania szablonów rozpoznawania.
+
+    Przy kilku szablonach dokument trafia do szablonu o najbliższym odcisku
+    strony, a szablony bez odcisku (zapisane przed jego wprowadzeniem) są
+    rezerwowe - odcisk można im uzupełnić z przykładowego PDF.
+    """
+    COLUMNS = ("ID", "Nazwa", "Odcisk strony", "Strona wzorcowa")
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.templates = []
+        self.init_ui()
+        self.load_templates()
+
+    def init_ui(self):
+        """Inicjalizacja interfejsu dialogu."""
+        self.setWindowTitle("Szablony rozpoznawania")
+        self.setMinimumSize(600, 300)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Szablony od ostatnio zapisanego:"))
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+
+        self.replace_btn = QPushButton("Zastąp (nowe obszary ROI)...")
+        self.replace_btn.clicked.connect(self.replace_template)
+        button_layout.addWidget(self.replace_btn)
+
+        self.reference_btn = QPushButton("Uzupełnij odcisk z PDF...")
+        self.reference_btn.clicked.connect(self.update_reference)
+        button_layout.addWidget(self.reference_btn)
+
+        self.delete_btn = QPushButton("Usuń")
+        self.delete_btn.clicked.connect(self.delete_template)
+        button_layout.addWidget(self.delete_btn)
+
+        layout.addLayout(button_layout)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.Close)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+        self.setLayout(layout)
+
+    def load_templates(self):
+        """Wczytanie listy szablonów z bazy."""
+        self.templates = self.db_manager.get_templates()
+        self.table.setRowCount(len(self.templates))
+        for row, template in enumerate(self.templates):
+            values = (str(template[0]), template[1], "tak" if template[5] else "brak",
+                      "tak" if template[6] else "brak")
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+    def selected_template(self):
+        """Wiersz zaznaczonego szablonu (lub None z komunikatem dla użytkownika)."""
+        row = self.table.currentRow()
+        if row < 0 or row >= len(self.templates):
+            QMessageBox.warning(self, "Ostrzeżenie", "Nie wybrano szablonu.")
+            return None
+        return self.templates[row]
+
+    def choose_pdf(self):
+        """Wybór przykładowego PDF formularza."""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Wybierz przykładowy PDF", "", "Pliki PDF (*.pdf)"
+        )
+        return file_path
+
+    def replace_template(self):
+        """Ponowne zaznaczenie obszarów ROI szablonu na przykładowym PDF (szablon zachowuje ID)."""
+        # Import lokalny, jak w oknie głównym
+        from views.dialogs.template_dialog import TemplateCreatorDialog
+
+        template = self.selected_template()
+        if template is None:
+            return
+        file_path = self.choose_pdf()
+        if file_path:
+            dialog = TemplateCreatorDialog(file_path, self.db_manager, self, replace_template=template)
+            if dialog.exec_() == QDialog.Accepted:
+                self.load_templates()
+
+    def update_reference(self):
+        """Uzupełnienie odcisku i strony wzorcowej szablonu z przykładowego PDF (bez zmiany obszarów ROI)."""
+        template = self.selected_template()
+        if template is None:
+            return
+        file_path = self.choose_pdf()
+        if not file_path:
+            return
+
+        try:
+            odcisk, strona_wzorcowa = PDFProcessor(self.db_manager).template_reference(file_path)
+            if odcisk is None:
+                QMessageBox.warning(self, "Ostrzeżenie", "Wybrany PDF nie zawiera stron.")
+                return
+            self.db_manager.update_template_reference(template[0], odcisk, strona_wzorcowa)
+        except Exception as e:
+            QMessageBox.critical(self, "Błąd", f"Nie można uzupełnić odcisku szablonu:\n{str(e)}")
+            return
+        self.load_templates()
+
+    def delete_template(self):
+        """Usunięcie zaznaczonego szablonu po potwierdzeniu."""
+        template = self.selected_template()
+        if template is None:
+            return
+
+        result = QMessageBox.question(
+            self, "Potwierdzenie usunięcia",
+            f"Czy na pewno chcesz usunąć szablon {template[1]} (ID={template[0]})?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if result == QMessageBox.Yes:
+            self.db_manager.delete_template(template[0])
+            self.load_templates()
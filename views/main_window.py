@@ -4,14 +4,17 @@ import os
 import re
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QPushButton, QFileDialog, QTableView, QHeaderView, QMessageBox,
-                            QLabel, QLineEdit, QComboBox, QGroupBox, QFormLayout)
-from PyQt5.QtCore import Qt
+                            QLabel, QLineEdit, QComboBox, QGroupBox, QFormLayout,
+                            QDateEdit, QCheckBox)
+from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QDesktopServices
 from PyQt5.QtCore import QUrl
 
-from database.db_manager import DatabaseManager
+from database.db_manager import DatabaseManager, QUERY_ALL, QUERY_DATE_RANGE
 from controllers.pdf_processor import PDFProcessor
+from controllers.search_controller import SearchController
 from models.reports_model import ReportsTableModel
+from utils.hashing import file_sha256
 # Importy dialogów są wywołane w metodach, aby uniknąć cyklicznych importów
 
 
@@ -23,6 +26,11 @@ class MainWindow(QMainWindow):
         self.db_manager = DatabaseManager()
         self.pdf_processor = PDFProcessor(self.db_manager)
         
+        # Wyszukiwanie w tle - zapytania nie blokują interfejsu podczas pisania
+        self.search_controller = SearchController(self.db_manager.db_name, parent=self)
+        self.search_controller.results_ready.connect(self.update_table_model)
+        self.search_controller.search_failed.connect(self.show_search_error)
+        
         # Inicjalizacja interfejsu użytkownika
         self.init_ui()
         
@@ -56,6 +64,10 @@ class MainWindow(QMainWindow):
         self.create_template_btn.clicked.connect(self.create_template)
         button_layout.addWidget(self.create_template_btn)
         
+        self.manage_templates_btn = QPushButton("Szablony...")
+        self.manage_templates_btn.clicked.connect(self.manage_templates)
+        button_layout.addWidget(self.manage_templates_btn)
+        
         # Wyszukiwanie i filtrowanie
         search_filter_layout = QHBoxLayout()
         
@@ -85,6 +97,29 @@ class MainWindow(QMainWindow):
         filter_group.setLayout(filter_form)
         search_filter_layout.addWidget(filter_group)
         
+        # Grupa filtrowania po dacie raportu
+        date_group = QGroupBox("Filtrowanie po dacie raportu")
+        date_form = QFormLayout()
+        
+        self.date_filter_check = QCheckBox("Filtruj po dacie")
+        self.date_filter_check.toggled.connect(self.toggle_date_filter)
+        date_form.addRow(self.date_filter_check)
+        
+        today = QDate.currentDate()
+        self.date_from_edit = QDateEdit(today.addMonths(-1))
+        self.date_to_edit = QDateEdit(today)
+        for date_edit in (self.date_from_edit, self.date_to_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("dd.MM.yyyy")
+            date_edit.dateChanged.connect(self.filter_by_date)
+        # Zapytanie sprzed włączenia filtra dat - przywracane po jego wyłączeniu
+        self._query_before_date_filter = None
+        date_form.addRow("Od:", self.date_from_edit)
+        date_form.addRow("Do:", self.date_to_edit)
+        
+        date_group.setLayout(date_form)
+        search_filter_layout.addWidget(date_group)
+        
         # Tabela raportów
         self.table_view = QTableView()
         self.table_view.setSortingEnabled(True)
@@ -92,6 +127,18 @@ class MainWindow(QMainWindow):
         self.table_view.setEditTriggers(QTableView.NoEditTriggers)
         self.table_view.doubleClicked.connect(self.open_pdf)
         
+        # Model doczytuje wiersze stronami - jest tworzony raz, a wyszukiwanie zmienia jego zapytanie
+        self.table_model = ReportsTableModel(self.db_manager)
+        self.table_view.setModel(self.table_model)
+        # Kliknięcie nagłówka sortuje w bazie, w wątku wyszukiwania, razem z aktywnym filtrem
+        self.table_model.sort_requested.connect(self.search_controller.set_sort)
+        # Kolejne strony wyników pobierane w wątku wyszukiwania
+        self.table_model.page_requested.connect(self.search_controller.fetch_page)
+        self.search_controller.page_ready.connect(self.table_model.page_fetched)
+        
+        # Ukrycie kolumny z pełną ścieżką do pliku PDF (ale zachowanie danych)
+        self.table_view.setColumnHidden(4, True)
+        
         # Dostosowanie szerokości kolumn
         header = self.table_view.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
@@ -130,8 +177,16 @@ class MainWindow(QMainWindow):
                         return
             
             try:
+                # Plik już zaimportowany (także pod inną nazwą) - bez ponownego rozpoznawania
+                file_hash = file_sha256(file_path)
+                existing = self.db_manager.find_report_by_hash(file_hash)
+                if existing:
+                    self.handle_duplicate_pdf(file_path, existing)
+                    return
+                
                 # Przetwarzanie pliku PDF
-                numer_zlecenia, numer_operatora, data_raportu = self.pdf_processor.extract_data_from_pdf(file_path)
+                numer_zlecenia, numer_operatora, data_raportu = self.pdf_processor.extract_data_from_pdf(
+                    file_path, file_hash)
                 
                 # Jeśli użytkownik anulował import, zakończ
                 if numer_zlecenia is None:
@@ -143,10 +198,12 @@ class MainWindow(QMainWindow):
                     pdf_path = self.current_pdf_path
                 
                 # Zapisanie danych w bazie
-                self.db_manager.insert_report(numer_zlecenia, numer_operatora, data_raportu, pdf_path)
+                # Skrót dotyczy wybranego pliku - ścieżka zmieniona w dialogu może wskazywać inny plik
+                report = self.db_manager.insert_report(numer_zlecenia, numer_operatora, data_raportu, pdf_path,
+                                                       file_hash if pdf_path == file_path else None)
                 
-                # Odświeżenie widoku
-                self.load_reports()
+                # Dodanie wiersza do tabeli (bez ponownego wczytywania wyników)
+                self.table_model.report_inserted(report[0])
                 
                 QMessageBox.information(
                     self, "Sukces", f"Pomyślnie zaimportowano raport:\nNumer zlecenia: {numer_zlecenia}\nOperator: {numer_operatora}\nData: {data_raportu}"
@@ -157,6 +214,30 @@ class MainWindow(QMainWindow):
                     self, "Błąd", f"Wystąpił błąd podczas importowania pliku:\n{str(e)}"
                 )
 
+    def handle_duplicate_pdf(self, file_path, existing):
+        """Obsługa pliku, którego zawartość jest już w bazie - pominięcie lub powiązanie z raportem."""
+        report_id, numer_zlecenia, numer_operatora, data_raportu, sciezka_pdf, _ = existing
+        
+        if os.path.normcase(os.path.abspath(sciezka_pdf)) == os.path.normcase(os.path.abspath(file_path)):
+            QMessageBox.information(
+                self, "Plik już zaimportowany",
+                f"Ten plik został już zaimportowany (raport ID {report_id}, numer zlecenia {numer_zlecenia})."
+            )
+            return
+        
+        result = QMessageBox.question(
+            self, "Plik już zaimportowany",
+            f"Plik o tej samej zawartości został już zaimportowany:\n"
+            f"Raport ID: {report_id}\nNumer zlecenia: {numer_zlecenia}\nOperator: {numer_operatora}\n"
+            f"Data: {data_raportu}\nŚcieżka: {sciezka_pdf}\n\n"
+            f"Czy powiązać istniejący raport z nową lokalizacją pliku?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        
+        if result == QMessageBox.Yes:
+            self.db_manager.link_report_path(report_id, file_path)
+            self.table_model.report_updated(report_id)
+
     def create_template(self):
         """Tworzenie szablonu rozpoznawania dokumentów."""
         # Import dialogu lokalnie aby uniknąć cyklicznych importów
@@ -171,45 +252,62 @@ class MainWindow(QMainWindow):
             dialog = TemplateCreatorDialog(file_path, self.db_manager, self)
             dialog.exec_()
 
+    def manage_templates(self):
+        """Przegląd, zastępowanie i usuwanie szablonów rozpoznawania."""
+        # Import dialogu lokalnie aby uniknąć cyklicznych importów
+        from views.dialogs.templates_dialog import TemplateManagerDialog
+        
+        TemplateManagerDialog(self.db_manager, self).exec_()
+
     def load_reports(self):
         """Ładowanie wszystkich raportów do tabeli."""
-        reports = self.db_manager.get_all_reports()
-        self.update_table_model(reports)
+        self.search_controller.load_all()
 
     def search_reports(self):
-        """Wyszukiwanie raportów."""
-        search_text = self.search_edit.text()
-        if search_text:
-            reports = self.db_manager.search_reports(search_text)
-        else:
-            reports = self.db_manager.get_all_reports()
-        self.update_table_model(reports)
+        """Wyszukiwanie raportów (wynik trafia do tabeli po zakończeniu zapytania w tle)."""
+        self.search_controller.search(self.search_edit.text())
 
     def filter_reports(self):
         """Filtrowanie raportów według segmentu numeru zlecenia."""
         segment_index = self.segment_combo.currentIndex() + 1  # Indeksowanie od 1
-        filter_value = self.filter_edit.text()
-        
-        if filter_value:
-            reports = self.db_manager.filter_by_segment(segment_index, filter_value)
-        else:
-            reports = self.db_manager.get_all_reports()
+        self.search_controller.filter_segment(segment_index, self.filter_edit.text())
+
+    def filter_by_date(self):
+        """Filtrowanie raportów według przedziału dat raportu (obie daty włącznie).
         
-        self.update_table_model(reports)
+        Zmiana dat przy wyłączonym filtrze nie wpływa na wyświetlane raporty.
+        """
+        if not self.date_filter_check.isChecked():
+            return
+        self.search_controller.filter_date_range(
+            self.date_from_edit.date().toPyDate(), self.date_to_edit.date().toPyDate()
+        )
 
-    def update_table_model(self, data):
-        """Aktualizacja modelu danych tabeli."""
-        self.table_model = ReportsTableModel(data)
-        self.table_view.setModel(self.table_model)
+    def toggle_date_filter(self, checked):
+        """Włączenie filtra dat lub powrót do wyszukiwania albo filtra sprzed jego włączenia."""
+        if checked:
+            self._query_before_date_filter = self.search_controller.query
+            self.filter_by_date()
+            return
         
-        # Ukrycie kolumny z pełną ścieżką do pliku PDF (ale zachowanie danych)
-        self.table_view.setColumnHidden(4, True)
+        # Przywracane tylko wtedy, gdy od włączenia filtra nie zlecono innego zapytania
+        if self.search_controller.query[0] == QUERY_DATE_RANGE:
+            self.search_controller.restore(self._query_before_date_filter or (QUERY_ALL, ()))
+        self._query_before_date_filter = None
+
+    def show_search_error(self, message):
+        """Informacja o błędzie zapytania wyszukiwania."""
+        QMessageBox.warning(self, "Ostrzeżenie", f"Wyszukiwanie nie powiodło się:\n{message}")
+
+    def update_table_model(self, query, sort, first_page):
+        """Aktualizacja modelu danych tabeli wynikiem zapytania."""
+        self.table_model.set_query(query, first_page, sort)
 
     def open_pdf(self, index):
         """Otwieranie pliku PDF po dwukrotnym kliknięciu w wiersz."""
         row = index.row()
         # Pobranie ścieżki do pliku z kolumny 4 (ukryta)
-        pdf_path = self.table_model._data[row][4]
+        pdf_path = self.table_model.get_row_data(row)[4]
         
         if os.path.exists(pdf_path):
             QDesktopServices.openUrl(QUrl.fromLocalFile(pdf_path))
@@ -231,7 +329,7 @@ class MainWindow(QMainWindow):
         
         # Pobranie ID wybranego raportu
         row = selection.currentIndex().row()
-        report_id = self.table_model._data[row][0]  # ID znajduje się w pierwszej kolumnie
+        report_id = self.table_model.report_id(row)
         
         # Pobranie danych raportu
         report_data = self.db_manager.get_report_by_id(report_id)
@@ -264,8 +362,8 @@ class MainWindow(QMainWindow):
                     edited_data['sciezka_pdf']
                 )
                 
-                # Odświeżenie widoku
-                self.load_reports()
+                # Odświeżenie wiersza w tabeli
+                self.table_model.report_updated(report_id)
                 
                 QMessageBox.information(self, "Sukces", "Pomyślnie zaktualizowano dane raportu.")
                 
@@ -282,8 +380,7 @@ class MainWindow(QMainWindow):
         
         # Pobranie ID wybranego raportu
         row = selection.currentIndex().row()
-        report_id = self.table_model._data[row][0]  # ID znajduje się w pierwszej kolumnie
-        numer_zlecenia = self.table_model._data[row][1]  # Numer zlecenia
+        report_id, numer_zlecenia = self.table_model.get_row_data(row)[:2]
         
         # Potwierdzenie usunięcia
         result = QMessageBox.question(
@@ -298,8 +395,8 @@ class MainWindow(QMainWindow):
                 success = self.db_manager.delete_report(report_id)
                 
                 if success:
-                    # Odświeżenie widoku
-                    self.load_reports()
+                    # Usunięcie wiersza z tabeli
+                    self.table_model.report_removed(report_id)
                     
                     QMessageBox.information(self, "Sukces", "Pomyślnie usunięto raport.")
                 else:
@@ -310,5 +407,19 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Obsługa zdarzenia zamknięcia okna."""
+        self.search_controller.shutdown()
         self.db_manager.close()
+        
+        # Zapis metryk czasu przetwarzania zebranych w tej sesji (gdy są włączone)
+        from utils.metrics import get_metrics
+        metrics = get_metrics()
+        if metrics.enabled():
+            try:
+                metrics.export()
+            except OSError as e:
+                print(f"Nie udało się zapisać metryk: {e}")
+        
+        # Zwolnienie modeli OCR współdzielonych w procesie
+        from controllers.ocr_engines import get_engine_registry
+        get_engine_registry().release()
         event.accept()
\ No newline at end of file
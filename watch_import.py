@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import signal
+import argparse
+
+# Dodanie katalogu głównego projektu do ścieżki Pythona
+# Aby moduły mogły być importowane prawidłowo
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+import config
+from database.db_manager import DatabaseManager
+from controllers.ingest_service import IngestService
+from utils.metrics import get_metrics
+
+
+def parse_args(argv=None):
+    """Parsowanie argumentów linii poleceń."""
+    parser = argparse.ArgumentParser(
+        description="Usługa automatycznego importu raportów PDF zapisywanych przez skanery do katalogów."
+    )
+    parser.add_argument(
+        "directories", nargs="+",
+        help="Obserwowane katalogi"
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true",
+        help="Obserwowanie także podkatalogów"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count() or 1,
+        help="Liczba procesów roboczych (domyślnie: liczba rdzeni)"
+    )
+    parser.add_argument(
+        "-b", "--ocr-batch", type=int, default=config.BATCH_OCR_DOCUMENTS,
+        help=f"Najwięcej dokumentów rozpoznawanych jednym wsadowym wywołaniem OCR (domyślnie: {config.BATCH_OCR_DOCUMENTS})"
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=config.WATCH_QUEUE_SIZE,
+        help=f"Limit plików oczekujących na rozpoznawanie (domyślnie: {config.WATCH_QUEUE_SIZE})"
+    )
+    parser.add_argument(
+        "--backend", choices=["auto", "inotify", "polling"], default=config.WATCH_BACKEND,
+        help="Wykrywanie nowych plików; dla udziałów sieciowych zapisywanych z innych komputerów "
+             f"należy użyć 'polling' (domyślnie: {config.WATCH_BACKEND})"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=config.WATCH_POLL_INTERVAL,
+        help=f"Odstęp między przeglądami katalogów w trybie 'polling' w sekundach (domyślnie: {config.WATCH_POLL_INTERVAL})"
+    )
+    parser.add_argument(
+        "--stable-seconds", type=float, default=config.WATCH_STABLE_SECONDS,
+        help=f"Czas bez zmian pliku, po którym uznaje się go za zapisany (domyślnie: {config.WATCH_STABLE_SECONDS})"
+    )
+    parser.add_argument(
+        "--db", default=config.DB_NAME,
+        help=f"Ścieżka do bazy danych (domyślnie: {config.DB_NAME})"
+    )
+    parser.add_argument(
+        "--save-uncertain", action="store_true",
+        help="Zapisz także raporty z nierozpoznanym numerem zlecenia"
+    )
+    parser.add_argument(
+        "--duplicates", choices=["skip", "link"], default=config.DUPLICATE_POLICY,
+        help="Pliki już zaimportowane (ta sama zawartość): pomiń lub przypisz nową ścieżkę "
+             f"istniejącemu raportowi (domyślnie: {config.DUPLICATE_POLICY})"
+    )
+    parser.add_argument(
+        "--metrics", choices=["off", "basic", "detailed"], default=config.METRICS_LEVEL,
+        help="Pomiar czasu etapów: 'basic' - etapy dokumentu i liczniki, 'detailed' - także każde ROI "
+             f"i wywołanie OCR (domyślnie: {config.METRICS_LEVEL})"
+    )
+    parser.add_argument(
+        "--metrics-dir", default=config.METRICS_DIR,
+        help="Katalog pliku Prometheus (metrics.prom) i podsumowania JSON (metrics.json) "
+             f"(domyślnie: {config.METRICS_DIR})"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Pokaż komunikaty diagnostyczne procesów roboczych"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Główna funkcja usługi importu."""
+    args = parse_args(argv)
+
+    missing = [directory for directory in args.directories if not os.path.isdir(directory)]
+    if missing:
+        print(f"Katalog nie istnieje: {', '.join(missing)}")
+        return 1
+
+    get_metrics().set_level(args.metrics)
+
+    db_manager = DatabaseManager(args.db)
+    try:
+        service = IngestService(
+            db_manager,
+            args.directories,
+            db_name=args.db,
+            recursive=args.recursive,
+            workers=args.workers,
+            ocr_batch=args.ocr_batch,
+            queue_size=args.queue_size,
+            save_uncertain=args.save_uncertain,
+            duplicates=args.duplicates,
+            quiet=not args.verbose,
+            watcher_options={
+                'backend': args.backend,
+                'poll_interval': args.poll_interval,
+                'stable_seconds': args.stable_seconds
+            },
+            metrics_dir=args.metrics_dir
+        )
+
+        # Ctrl+C lub zatrzymanie usługi - dokończenie rozpoznawanych plików i zapis wyników
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: service.stop())
+
+        stats = service.run()
+    except RuntimeError as e:
+        print(f"Błąd: {e}")
+        return 1
+    finally:
+        db_manager.close()
+
+    print(f"Zakończono: plików {stats['plikow']}, zapisanych {stats['zapisanych']}, "
+          f"do weryfikacji {stats['do_weryfikacji']}, już w bazie {stats['juz_w_bazie']}, "
+          f"błędów {stats['bledow']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())